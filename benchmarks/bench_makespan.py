@@ -0,0 +1,146 @@
+"""
+Makespan benchmark for the order in which files are handed to the workers.
+
+Generates a mixed-size corpus (mostly small files plus a few of 16-64 MB,
+see create_dummy_files.size_sampler), then copies it with --workers threads
+once per ordering and reports the wall time of each copy:
+
+- listing: the order the directory was scanned in (what a normal run does);
+- smallest_first: the worst case, every large file starts last;
+- largest_first: io_scheduler.largest_first, as used by --largest-first.
+
+Each ordering is run --repeat times into a fresh destination; the best time
+counts. Caches are not dropped between runs, so use a tmpfs or a corpus
+larger than memory for stable numbers. When the copies are CPU-bound (a
+tmpfs on a machine with few cores) workers only share the CPU and the
+order matters little, so the copy time of every file is also measured in a
+sequential pass, and "simulated_makespan_seconds" replays each ordering on
+--workers independent workers (each takes the next file as soon as it is
+free), as on storage where every stream has its own bandwidth.
+
+    python3 benchmarks/bench_makespan.py --files 2000 --workers 4 --root /dev/shm
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from create_dummy_files import generate_corpus
+from classifier import CategoryClassifier
+from events import COPIED
+from folder_utils import load_categories, execute_operations, new_stats
+from io_scheduler import largest_first
+from plan import PlannedOperation, COPY
+from scanner import scan_directory, entry_size
+
+ORDERINGS = ("listing", "smallest_first", "largest_first")
+
+def ordered(operations, ordering):
+    if ordering == "smallest_first":
+        return sorted(operations, key=lambda operation: operation.size)
+    if ordering == "largest_first":
+        return list(largest_first(iter(operations)))
+    return list(operations)
+
+def simulate(operations, costs, workers):
+    """Makespan of handing `operations` in order to `workers` workers that each take the next one when free."""
+    free_at = [0.0] * workers
+    for operation in operations:
+        heapq.heappush(free_at, heapq.heappop(free_at) + costs[operation.source])
+    return max(free_at)
+
+def measure_costs(operations):
+    """Copies the operations one at a time and returns the seconds each took, by source."""
+    costs = {}
+    last = [time.perf_counter()]
+    def on_event(event):
+        if event.kind == COPIED:
+            now = time.perf_counter()
+            costs[event.operation.source] = now - last[0]
+            last[0] = now
+    last[0] = time.perf_counter()
+    execute_operations(operations, workers=1, stats=new_stats(), on_event=on_event)
+    return costs
+
+def run_benchmark(work_dir, files=2000, sizes="mixed", workers=4, repeat=3, seed=0):
+    work_dir = Path(work_dir)
+    source = work_dir / "source"
+    corpus = generate_corpus(source, files, sizes=sizes, seed=seed)
+    classifier = CategoryClassifier(load_categories())
+    entries = list(scan_directory(source))
+
+    def operations_into(dest):
+        return [
+            PlannedOperation(entry.path, os.path.join(dest, category, entry.name), COPY, entry_size(entry), category)
+            for entry in entries
+            for category in (classifier.classify(entry.name),)
+        ]
+
+    results = {
+        "corpus": corpus,
+        "settings": {"workers": workers, "repeat": repeat},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "largest_files_mb": sorted((round(entry_size(entry) / (1024 * 1024), 1) for entry in entries), reverse=True)[:5],
+        "makespan_seconds": {},
+        "simulated_makespan_seconds": {},
+    }
+    costs = measure_costs(operations_into(work_dir / "dest-sequential"))
+    shutil.rmtree(work_dir / "dest-sequential")
+    results["sequential_seconds"] = round(sum(costs.values()), 4)
+    for ordering in ORDERINGS:
+        best = None
+        for run in range(repeat):
+            dest = work_dir / f"dest-{ordering}-{run}"
+            operations = ordered(operations_into(dest), ordering)
+            start = time.perf_counter()
+            execute_operations(operations, workers=workers, stats=new_stats(), on_event=lambda event: None)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+            shutil.rmtree(dest)
+        results["makespan_seconds"][ordering] = round(best, 4)
+        results["simulated_makespan_seconds"][ordering] = round(simulate(operations, costs, workers), 4)
+
+    for key in ("makespan_seconds", "simulated_makespan_seconds"):
+        makespan = results[key]
+        results[key]["largest_first_speedup"] = {
+            ordering: round(makespan[ordering] / makespan["largest_first"], 2) for ordering in ("listing", "smallest_first")
+        }
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the makespan of copying a mixed corpus in different orders.")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--sizes", default="mixed")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", help="directory for the temporary corpus, e.g. /dev/shm")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="organizer-makespan-", dir=args.root)
+    try:
+        results = run_benchmark(work_dir, files=args.files, sizes=args.sizes, workers=args.workers,
+                                repeat=args.repeat, seed=args.seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
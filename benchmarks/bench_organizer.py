@@ -0,0 +1,119 @@
+"""
+Benchmark harness for the file organizer.
+
+Generates a synthetic corpus (see create_dummy_files.generate_corpus), then
+runs organize_files_in_destination on it with a profiling.RunProfiler as
+observer, and writes the time of each phase it reports (scan, stat,
+classify, mkdir, transfer) and of the whole run as JSON. Phase times are
+summed over worker threads, so with --workers above 1 only "total" is wall
+time. Point --root at a tmpfs (e.g. /dev/shm) to measure the organizer rather
+than the disk. With --baseline, the run fails when a phase is slower than the
+stored results by more than --tolerance.
+
+    python3 benchmarks/bench_organizer.py --files 20000 --root /dev/shm --output bench.json
+    python3 benchmarks/bench_organizer.py --files 20000 --root /dev/shm --baseline bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+from create_dummy_files import generate_corpus
+from folder_utils import load_categories, organize_files_in_destination
+from profiling import RunProfiler
+
+def _phase(seconds, files, size=None):
+    result = {"seconds": round(seconds, 6), "files_per_s": round(files / seconds, 1) if seconds else None}
+    if size is not None:
+        result["mb_per_s"] = round(size / (1024 * 1024) / seconds, 2) if seconds else None
+    return result
+
+def run_benchmark(work_dir, files=10000, sizes="lognormal:4K:1.5", depth=0, duplicate_ratio=0.0,
+                  workers=1, move=False, seed=0):
+    work_dir = Path(work_dir)
+    source = work_dir / "source"
+    dest = source if move else work_dir / "dest"
+    corpus = generate_corpus(source, files, sizes=sizes, depth=depth, duplicate_ratio=duplicate_ratio, seed=seed)
+    recursive = depth > 0
+
+    profiler = RunProfiler(max_trace_events=0)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        stats = organize_files_in_destination(source, dest, load_categories(), same_place=move, workers=workers,
+                                              recursive=recursive, observer=profiler)
+    summary = profiler.summary()
+    total_files = stats["total_files"]
+    total_size = stats["total_size"]
+
+    phases = {name: _phase(seconds, total_files, total_size if name == "transfer" else None)
+              for name, seconds in summary["phases"].items()}
+    phases["total"] = _phase(summary["wall_seconds"], total_files, total_size)
+    return {
+        "corpus": corpus,
+        "settings": {"workers": workers, "mode": "move" if move else "copy", "recursive": recursive},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "phases": phases,
+        "counters": summary["counters"],
+        "strategies": {**stats.get("copy_strategies", {}), **stats.get("move_strategies", {})},
+    }
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a list of messages for phases whose files/s dropped more than tolerance."""
+    regressions = []
+    for phase, current in results["phases"].items():
+        previous = baseline.get("phases", {}).get(phase)
+        if not previous or not previous.get("files_per_s") or not current.get("files_per_s"):
+            continue
+        ratio = current["files_per_s"] / previous["files_per_s"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{phase}: {current['files_per_s']} files/s vs baseline {previous['files_per_s']} ({ratio:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the file organizer phases.")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--sizes", default="lognormal:4K:1.5")
+    parser.add_argument("--depth", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--move", action="store_true", help="benchmark in-place moves instead of copies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", help="directory for the temporary corpus, e.g. /dev/shm")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown per phase (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="organizer-bench-", dir=args.root)
+    try:
+        results = run_benchmark(work_dir, files=args.files, sizes=args.sizes, depth=args.depth,
+                                duplicate_ratio=args.duplicates, workers=args.workers, move=args.move,
+                                seed=args.seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nPerformance regressions:", file=sys.stderr)
+            for message in regressions:
+                print(f"- {message}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
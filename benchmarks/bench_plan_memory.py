@@ -0,0 +1,84 @@
+"""
+Memory benchmark for organization plans.
+
+Builds an OrganizationPlan of synthetic operations (no files are created) and
+reports the memory it holds per operation (OperationTable.nbytes(), which
+counts allocated capacity). For comparison, the cost of the same operations as
+a plain list of PlannedOperation tuples is measured with tracemalloc on a
+sample of --sample files. Exits with status 1 when the plan needs more than
+--limit bytes per file.
+
+    python3 benchmarks/bench_plan_memory.py --files 10000000 --limit 100
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from plan import OrganizationPlan, PlannedOperation, COPY
+
+EXTENSIONS = ((".jpg", "Images"), (".pdf", "Documents"), (".zip", "Archives"), (".mp4", "Videos"), (".txt", "Others"))
+
+def synthetic_operations(files, directories=1000, source_root="/data/inbox", dest_root="/data/organized"):
+    """Yields operations shaped like a recursive run: many files spread over `directories` folders."""
+    for number in range(files):
+        extension, category = EXTENSIONS[number % len(EXTENSIONS)]
+        name = f"IMG_{number:08d}{extension}"
+        source = os.path.join(source_root, f"dir{number % directories:05d}", name)
+        target = os.path.join(dest_root, category, name)
+        yield PlannedOperation(source, target, COPY, 4096 + number % 65536, category)
+
+def list_bytes_per_file(files, directories):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        operations = list(synthetic_operations(files, directories))
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del operations
+    return current / files
+
+def run_benchmark(files=1000000, directories=1000, sample=100000):
+    start = time.perf_counter()
+    plan = OrganizationPlan("/data/inbox", "/data/organized")
+    for operation in synthetic_operations(files, directories):
+        plan.append(operation)
+    build_seconds = time.perf_counter() - start
+    plan_bytes = plan.operations.nbytes()
+
+    results = {
+        "files": files,
+        "build_seconds": round(build_seconds, 3),
+        "plan_bytes": plan_bytes,
+        "plan_bytes_per_file": round(plan_bytes / files, 1) if files else None,
+    }
+    del plan
+    if sample and files:
+        results["list_bytes_per_file"] = round(list_bytes_per_file(min(files, sample), directories), 1)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory an organization plan needs per file.")
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--directories", type=int, default=1000)
+    parser.add_argument("--limit", type=float, default=100, help="maximum bytes per file")
+    parser.add_argument("--sample", type=int, default=100000, help="files in the list-of-tuples comparison (0 skips it)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.files, args.directories, args.sample)
+    print(json.dumps(results, indent=2))
+    if results["plan_bytes_per_file"] is not None and results["plan_bytes_per_file"] > args.limit:
+        print(f"\nThe plan needs {results['plan_bytes_per_file']} bytes per file, more than {args.limit}.", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
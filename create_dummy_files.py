@@ -1,4 +1,7 @@
-import os
+import argparse
+import json
+import math
+import random
 from pathlib import Path
 
 def create_dummy_files(source_dir="test_source", dest_dir="test_destination"):
@@ -41,5 +44,142 @@ def create_dummy_files(source_dir="test_source", dest_dir="test_destination"):
     print(f"You can now run the file organizer: python3 src/main.py {source_dir} {dest_dir}")
     print(f"Or run the GUI: python3 src/main.py -ui")
 
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+def parse_size(text):
+    """Parses sizes such as 512, 4K, 1.5M or 2G into bytes."""
+    text = text.strip().upper()
+    unit = text[-1] if text and text[-1] in _SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    return int(float(number) * _SIZE_UNITS[unit])
+
+def size_sampler(spec, rng):
+    """
+    Returns a function producing file sizes for a distribution spec.
+
+    Supported specs: "fixed:SIZE", "uniform:MIN:MAX", "lognormal:MEDIAN:SIGMA"
+    and "mixed" (mostly small files plus a few very large ones).
+    """
+    kind, _, args = spec.partition(":")
+    parts = args.split(":") if args else []
+    if kind == "fixed" and len(parts) == 1:
+        size = parse_size(parts[0])
+        return lambda: size
+    if kind == "uniform" and len(parts) == 2:
+        low, high = parse_size(parts[0]), parse_size(parts[1])
+        return lambda: rng.randint(low, high)
+    if kind == "lognormal" and len(parts) == 2:
+        median, sigma = parse_size(parts[0]), float(parts[1])
+        return lambda: max(0, int(rng.lognormvariate(math.log(max(median, 1)), sigma)))
+    if kind == "mixed" and not parts:
+        def mixed():
+            roll = rng.random()
+            if roll < 0.90:
+                return rng.randint(0, 64 * 1024)
+            if roll < 0.99:
+                return rng.randint(64 * 1024, 4 * 1024 ** 2)
+            return rng.randint(16 * 1024 ** 2, 64 * 1024 ** 2)
+        return mixed
+    raise ValueError(f"Unknown size distribution: {spec}")
+
+def load_extensions(config_path=None):
+    if config_path is None:
+        config_path = Path(__file__).parent / "config.json"
+    with open(config_path, "r") as f:
+        categories = json.load(f)["categories"]
+    extensions = []
+    for rule in categories.values():
+        # A category is either a list of extensions or a rule object with an optional "extensions" list.
+        extensions.extend(rule.get("extensions", []) if isinstance(rule, dict) else rule)
+    return extensions
+
+def _write_content(path, size, rng):
+    # A random block repeated up to the requested size keeps generation fast
+    # while every file (except intended duplicates) still has distinct content.
+    block = rng.getrandbits(8 * min(max(size, 1), 64 * 1024)).to_bytes(min(max(size, 1), 64 * 1024), "little")
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            chunk = block[:remaining]
+            f.write(chunk)
+            remaining -= len(chunk)
+
+def generate_corpus(source_dir, file_count=1000, sizes="lognormal:4K:1.5", depth=0, fanout=4,
+                    duplicate_ratio=0.0, unknown_ratio=0.05, config_path=None, seed=0):
+    """
+    Creates a synthetic corpus for benchmarking the organizer and returns a summary dict.
+
+    Extensions are drawn from config.json (plus `unknown_ratio` of unknown or
+    extensionless names). With depth > 0, files are spread over a tree of
+    `fanout` subdirectories per level. `duplicate_ratio` of the files are byte
+    copies of earlier files under a different name.
+    """
+    rng = random.Random(seed)
+    sample_size = size_sampler(sizes, rng)
+    extensions = load_extensions(config_path)
+    source_path = Path(source_dir)
+    source_path.mkdir(parents=True, exist_ok=True)
+
+    directories = [source_path]
+    for level in range(depth):
+        directories += [parent / f"dir{level}_{i}" for parent in directories if len(parent.parts) - len(source_path.parts) == level for i in range(fanout)]
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    created = []
+    total_size = 0
+    duplicates = 0
+    for number in range(file_count):
+        directory = rng.choice(directories)
+        if created and rng.random() < duplicate_ratio:
+            original, size = rng.choice(created)
+            path = directory / f"copy{number}{original.suffix}"
+            path.write_bytes(original.read_bytes())
+            duplicates += 1
+        else:
+            roll = rng.random()
+            if roll < unknown_ratio / 2:
+                suffix = ""
+            elif roll < unknown_ratio:
+                suffix = ".xyz"
+            else:
+                suffix = rng.choice(extensions)
+            size = sample_size()
+            path = directory / f"file{number}{suffix}"
+            _write_content(path, size, rng)
+            created.append((path, size))
+        total_size += size
+
+    return {
+        "files": file_count,
+        "total_size": total_size,
+        "duplicates": duplicates,
+        "directories": len(directories),
+        "sizes": sizes,
+        "depth": depth,
+        "seed": seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Create test files for the file organizer.")
+    parser.add_argument("source_dir", nargs="?", default="test_source")
+    parser.add_argument("dest_dir", nargs="?", default="test_destination")
+    parser.add_argument("--count", type=int, help="generate a synthetic corpus with this many files instead of the 13 sample files")
+    parser.add_argument("--sizes", default="lognormal:4K:1.5", help="fixed:SIZE, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA or mixed")
+    parser.add_argument("--depth", type=int, default=0, help="levels of nested subdirectories")
+    parser.add_argument("--fanout", type=int, default=4, help="subdirectories per directory")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of files that duplicate an earlier file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.count is None:
+        create_dummy_files(args.source_dir, args.dest_dir)
+        return
+
+    summary = generate_corpus(args.source_dir, args.count, sizes=args.sizes, depth=args.depth, fanout=args.fanout,
+                              duplicate_ratio=args.duplicates, seed=args.seed)
+    Path(args.dest_dir).mkdir(parents=True, exist_ok=True)
+    print(json.dumps(summary, indent=2))
+
 if __name__ == "__main__":
-    create_dummy_files()
+    main()
@@ -0,0 +1,200 @@
+import gzip
+import json
+import os
+import shutil
+import stat
+import tarfile
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+from classifier import compile_categories
+from copy_backend import partial_name, publish
+from events import COPIED, MOVED, LINKED
+from output import get_output
+from scanner import ORGANIZER_FILE_PREFIX
+from transfer import FolderCreator, NameClaims
+
+ARCHIVE_MODES = ("manifest", "extract")
+
+MANIFEST_SUFFIX = ".manifest.jsonl"
+ZIP_EXTENSIONS = (".zip",)
+# A plain .gz holds a single compressed file, not a listing, so only tarballs count.
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Read size when streaming a member out of an archive.
+_COPY_BUFFER = 1024 * 1024
+
+# Errors that mean "this archive cannot be read", as opposed to problems with the destination.
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, gzip.BadGzipFile, zlib.error, EOFError, RuntimeError,
+                  NotImplementedError)
+try:
+    import lzma
+    ARCHIVE_ERRORS += (lzma.LZMAError,)
+except ImportError:
+    pass
+
+ArchiveMember = namedtuple("ArchiveMember", ["name", "size", "mtime"])
+
+def validate_archive_mode(mode):
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"Unknown archive mode '{mode}'. Choose one of: {', '.join(ARCHIVE_MODES)}")
+
+def is_archive(name):
+    lowered = name.lower()
+    return lowered.endswith(ZIP_EXTENSIONS) or lowered.endswith(TAR_EXTENSIONS)
+
+def archive_members(path):
+    """
+    Yields (ArchiveMember, open_member) for every regular file in a zip or tar archive.
+
+    For zip files only the central directory at the end of the file is read;
+    tar files are read in stream mode, from start to end, without seeking.
+    open_member() returns a file object streaming that member's data; for tar
+    files it must be called before the next member is taken.
+    """
+    if path.lower().endswith(ZIP_EXTENSIONS):
+        return _zip_members(path)
+    return _tar_members(path)
+
+def _zip_members(path):
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or stat.S_ISLNK(info.external_attr >> 16):
+                continue
+            try:
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+            except (OverflowError, ValueError):
+                mtime = None
+            yield ArchiveMember(info.filename, info.file_size, mtime), lambda info=info: archive.open(info)
+
+def _tar_members(path):
+    with tarfile.open(path, "r|*") as archive:
+        for info in archive:
+            if info.isfile():
+                yield ArchiveMember(info.name, info.size, info.mtime), lambda info=info: archive.extractfile(info)
+            # Even in stream mode tarfile remembers every member; forget them so memory stays flat.
+            archive.members = []
+
+def member_file_name(name):
+    """The file name a member is filed under: its last path component, or None when it has none usable."""
+    name = name.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1]
+    if name in ("", ".", "..") or name.startswith(ORGANIZER_FILE_PREFIX):
+        return None
+    return name
+
+class ArchiveCollector:
+    """Event sink wrapper that passes events on and remembers where archives were copied or moved to."""
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.paths = []
+
+    def __call__(self, event):
+        if event.kind in (COPIED, MOVED, LINKED) and is_archive(event.operation.target):
+            self.paths.append(event.operation.target)
+        self.on_event(event)
+
+def process_archive(path, dest_dir, classifier, mode="manifest", folders=None, claims=None):
+    """
+    Classifies the members of one archive and returns counts for it.
+
+    In "manifest" mode, <archive>.manifest.jsonl is written next to the
+    archive: one JSON object per member (name, size, mtime, category),
+    then a summary object with the counts per category. In "extract" mode
+    every member is streamed straight into dest_dir/<category>/<file name>;
+    a name that already exists there is skipped, as in a normal run.
+    """
+    result = {"members": 0, "extracted": 0, "skipped": 0, "categories": {}}
+    categories = result["categories"]
+    manifest_path = path + MANIFEST_SUFFIX
+    manifest = None
+    if mode == "manifest":
+        temporary = partial_name(manifest_path)
+        manifest = open(temporary, "x", encoding="utf-8")
+    try:
+        for member, open_member in archive_members(path):
+            name = member_file_name(member.name)
+            if name is None:
+                continue
+            category = classifier.classify(name, member.size, member.mtime)
+            result["members"] += 1
+            categories[category] = categories.get(category, 0) + 1
+            if manifest is not None:
+                manifest.write(json.dumps({"name": member.name, "size": member.size, "mtime": member.mtime,
+                                           "category": category}) + "\n")
+            elif _extract(member, open_member, os.path.join(dest_dir, category), name, folders, claims):
+                result["extracted"] += 1
+            else:
+                result["skipped"] += 1
+        if manifest is not None:
+            manifest.write(json.dumps({"archive": os.path.basename(path), "members": result["members"],
+                                       "categories": categories}) + "\n")
+            manifest.close()
+            # A manifest from an earlier run describes the same archive name; replace it.
+            os.replace(temporary, manifest_path)
+    except BaseException:
+        if manifest is not None:
+            manifest.close()
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+        raise
+    return result
+
+def _extract(member, open_member, folder, name, folders, claims):
+    folders.ensure(folder)
+    if not claims.claim(folder, name):
+        return False
+    target = os.path.join(folder, name)
+    temporary = partial_name(target)
+    try:
+        with open_member() as source, open(temporary, "xb") as destination:
+            shutil.copyfileobj(source, destination, _COPY_BUFFER)
+        if member.mtime is not None:
+            os.utime(temporary, (member.mtime, member.mtime))
+        publish(temporary, target)
+    except FileExistsError:
+        # Another process created the name in the meantime.
+        os.unlink(temporary)
+        return False
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+    return True
+
+def process_archives(paths, dest_dir, categories, stats, mode="manifest", workers=4):
+    """
+    Runs process_archive() on several archives in parallel and adds the totals to stats["archives"].
+
+    Archives that cannot be read (corrupt, encrypted) are counted
+    as errors and reported as warnings; the run goes on with the others.
+    """
+    validate_archive_mode(mode)
+    classifier = compile_categories(categories)
+    totals = stats.setdefault("archives", {"archives": 0, "members": 0, "extracted": 0, "skipped": 0, "errors": 0,
+                                           "categories": {}})
+    if not paths:
+        return totals
+    folders = FolderCreator()
+    claims = NameClaims()
+    # Imported here like in TransferPool: single-file runs never need it.
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+        futures = [executor.submit(process_archive, path, dest_dir, classifier, mode, folders, claims) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                result = future.result()
+            except ARCHIVE_ERRORS as error:
+                totals["errors"] += 1
+                get_output().warning(f"Could not read archive {path}: {error}")
+                continue
+            totals["archives"] += 1
+            for key in ("members", "extracted", "skipped"):
+                totals[key] += result[key]
+            for category, count in result["categories"].items():
+                totals["categories"][category] = totals["categories"].get(category, 0) + count
+    return totals
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from folder_utils import plan_operations, new_stats, record_backend_usage
+from transfer import TransferPool, transfer_file
+from copy_backend import CopyBackend, MoveBackend
+from plan import LINK
+from events import OrganizerEvent, SCAN_COMPLETE
+
+_DONE = object()
+
+def _ignore_event(event):
+    pass
+
+def _next_batch(operations, batch_size):
+    return list(islice(operations, batch_size))
+
+async def organize_files_async(source_dir, dest_dir, categories, same_place=False, concurrency=8,
+                               recursive=False, max_depth=None, follow_symlinks=False, walkers=4,
+                               dedup=None, hardlink=False, stats=None, batch_size=256):
+    """
+    Async counterpart of organize_files_in_destination, as an async iterator of OrganizerEvents.
+
+    Planning and classification are the same plan_operations code the CLI uses,
+    run in batches on a helper thread; each transfer is the same transfer_file
+    call, offloaded to a thread while holding one of `concurrency` semaphore
+    slots. A slot is only released once its event has been handed to the
+    consumer, so a slow consumer pauses transfers and scanning (backpressure).
+    Pass a dict as `stats` to receive the same statistics the CLI reports.
+    Cancelling the consuming task, or closing the iterator early, lets the
+    running transfers finish, starts no new ones and sets stats["cancelled"].
+    """
+    if stats is None:
+        stats = {}
+    stats.update(new_stats(recursive))
+    loop = asyncio.get_running_loop()
+    planner = ThreadPoolExecutor(max_workers=1)
+    transfers = ThreadPoolExecutor(max_workers=concurrency)
+    copier = CopyBackend(allow_hardlink=hardlink)
+    mover = MoveBackend(copier)
+    cancel = threading.Event()
+    context = TransferPool(1, copier=copier, mover=mover, on_event=_ignore_event, cancel=cancel)
+    slots = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue(maxsize=concurrency)
+    pending = set()
+
+    operations = plan_operations(source_dir, dest_dir, categories, stats, same_place=same_place,
+                                 recursive=recursive, max_depth=max_depth,
+                                 follow_symlinks=follow_symlinks, walkers=walkers)
+
+    async def transfer(operation):
+        try:
+            try:
+                event = await loop.run_in_executor(transfers, transfer_file, operation, context)
+            except Exception as error:
+                event = error
+            if event is not None:
+                await results.put(event)
+        finally:
+            slots.release()
+
+    async def start(operation):
+        await slots.acquire()
+        task = asyncio.create_task(transfer(operation))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    async def produce():
+        nonlocal operations
+        try:
+            if dedup is not None:
+                from dedup import deduplicate
+                operations = await loop.run_in_executor(planner, deduplicate, operations, stats, dedup, max(concurrency, 4))
+            remaining = iter(operations)
+            # Hard links point at files other operations create, so they run last.
+            links = []
+            submitted = 0
+            submitted_size = 0
+            while True:
+                batch = await loop.run_in_executor(planner, _next_batch, remaining, batch_size)
+                if not batch:
+                    break
+                for operation in batch:
+                    submitted += 1
+                    submitted_size += operation.size
+                    if operation.op == LINK:
+                        links.append(operation)
+                    else:
+                        await start(operation)
+            await results.put(OrganizerEvent(SCAN_COMPLETE, total_files=submitted, total_size=submitted_size))
+            await asyncio.gather(*pending)
+            for operation in links:
+                await start(operation)
+            await asyncio.gather(*pending)
+            await results.put(_DONE)
+        except Exception as error:
+            await results.put(error)
+
+    producer = asyncio.create_task(produce())
+    finished = False
+    try:
+        while True:
+            item = await results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        finished = True
+    finally:
+        if not finished:
+            cancel.set()
+            producer.cancel()
+            for task in list(pending):
+                task.cancel()
+        await asyncio.gather(producer, *pending, return_exceptions=True)
+        # Threads may still be inside a transfer or a scan batch; wait for them
+        # without blocking the event loop before closing what they use.
+        await loop.run_in_executor(None, _shutdown, planner, transfers)
+        if hasattr(operations, "close"):
+            operations.close()
+        mover.close()
+        record_backend_usage(stats, copier, mover)
+        if not finished:
+            stats["cancelled"] = True
+
+def _shutdown(*executors):
+    for executor in executors:
+        executor.shutdown(wait=True)
@@ -0,0 +1,119 @@
+from rules import RuleTable
+
+DEFAULT_CATEGORY = "Others"
+
+class CategoryClassifier:
+    """
+    Compiled extension -> category lookup built once from load_categories() output.
+
+    Extensions are matched case-insensitively and may span several suffixes
+    (e.g. ".tar.gz"); the longest configured suffix of a file name wins.
+    When the same extension is listed under more than one category, the
+    category that appears first in the configuration keeps it.
+
+    Categories given as a rule (a dict, see rules.py) instead of an extension
+    list are compiled into a RuleTable. Rules are checked first, in config
+    order, by classify(); lookup() only ever uses the extension lists.
+    """
+
+    def __init__(self, categories, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.categories = list(categories)
+        self.conflicts = {}
+        self._index = {}
+        self._max_parts = 1
+        self.rules = None
+
+        rules = []
+        for category, extensions in categories.items():
+            if isinstance(extensions, dict):
+                rules.append((category, extensions))
+                continue
+            for ext in extensions:
+                ext = self.normalize_extension(ext)
+                if not ext:
+                    continue
+                owner = self._index.get(ext)
+                if owner is None:
+                    self._index[ext] = category
+                    self._max_parts = max(self._max_parts, ext.count("."))
+                elif owner != category:
+                    self.conflicts.setdefault(ext, [owner]).append(category)
+        if rules:
+            self.rules = RuleTable(rules)
+
+    @staticmethod
+    def normalize_extension(ext):
+        ext = ext.strip().lower()
+        if ext and not ext.startswith("."):
+            ext = "." + ext
+        return ext
+
+    def lookup(self, name):
+        """Returns the configured category for a file name, or None when no extension matches."""
+        lowered = name.lower()
+        # Leading dots mark hidden files (".bashrc"), not extensions.
+        start = len(lowered) - len(lowered.lstrip("."))
+        index = self._index
+        found = None
+        pos = len(lowered)
+        for _ in range(self._max_parts):
+            pos = lowered.rfind(".", start + 1, pos)
+            if pos == -1:
+                break
+            category = index.get(lowered[pos:])
+            if category is not None:
+                found = category
+        return found
+
+    def classify(self, name, size=None, mtime=None):
+        """Returns the folder for a file; rules that need a size or mtime are skipped without one."""
+        if self.rules is not None:
+            category = self.rules.match(name, size, mtime)
+            if category is not None:
+                return category
+        category = self.lookup(name)
+        if category is None:
+            return self.default
+        return category
+
+    def compiled(self):
+        """Returns the compiled lookup as plain data, for caching (see from_compiled)."""
+        return {
+            "default": self.default,
+            "categories": self.categories,
+            "conflicts": self.conflicts,
+            "index": self._index,
+            "max_parts": self._max_parts,
+            "rules": self.rules.specs if self.rules is not None else None,
+        }
+
+    @classmethod
+    def from_compiled(cls, data):
+        classifier = cls.__new__(cls)
+        classifier.default = data["default"]
+        classifier.categories = list(data["categories"])
+        classifier.conflicts = data["conflicts"]
+        classifier._index = data["index"]
+        classifier._max_parts = data["max_parts"]
+        classifier.rules = RuleTable(data["rules"]) if data["rules"] else None
+        return classifier
+
+    def folders(self):
+        """Top-level folders this classifier can file into."""
+        folders = {category for category in self.categories if "/" not in category and "{" not in category}
+        if self.rules is not None:
+            folders |= self.rules.folders()
+        folders.add(self.default)
+        return folders
+
+    def __contains__(self, ext):
+        return self.normalize_extension(ext) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+def compile_categories(categories):
+    if isinstance(categories, CategoryClassifier):
+        return categories
+    return CategoryClassifier(categories)
@@ -0,0 +1,78 @@
+import marshal
+import os
+import sys
+from hashlib import blake2b
+from pathlib import Path
+from classifier import CategoryClassifier
+from folder_utils import DEFAULT_CONFIG_PATH, load_categories
+
+# Bump when the cached layout or CategoryClassifier.compiled() changes.
+CACHE_VERSION = 2
+
+def default_cache_path(config_path):
+    config_path = Path(config_path)
+    return config_path.with_name(f".{config_path.name}.cache")
+
+def load_classifier(config_path=None, cache_path=None):
+    """
+    Returns the CategoryClassifier for a config file, reusing a compiled copy when possible.
+
+    The compiled classifier is stored next to the config (".config.json.cache").
+    It is reused without reading config.json when the file's mtime and size are
+    unchanged, or when only the mtime changed but the content hash is the same.
+    Otherwise the config is loaded and validated with load_categories() as
+    usual, and the cache is rewritten. A missing or unwritable cache is not an
+    error; it only costs the normal load.
+    """
+    config_path = Path(config_path) if config_path is not None else DEFAULT_CONFIG_PATH
+    cache_path = Path(cache_path) if cache_path is not None else default_cache_path(config_path)
+
+    try:
+        info = os.stat(config_path)
+    except OSError:
+        # Let load_categories report the problem the usual way.
+        return CategoryClassifier(load_categories(config_path))
+
+    cached = _read_cache(cache_path)
+    if cached is not None and cached["mtime_ns"] == info.st_mtime_ns and cached["size"] == info.st_size:
+        return CategoryClassifier.from_compiled(cached["classifier"])
+
+    with open(config_path, "rb") as f:
+        digest = blake2b(f.read(), digest_size=16).digest()
+    if cached is not None and cached["digest"] == digest:
+        classifier = CategoryClassifier.from_compiled(cached["classifier"])
+    else:
+        classifier = CategoryClassifier(load_categories(config_path))
+
+    _write_cache(cache_path, {
+        "version": CACHE_VERSION,
+        "python": sys.implementation.cache_tag,
+        "mtime_ns": info.st_mtime_ns,
+        "size": info.st_size,
+        "digest": digest,
+        "classifier": classifier.compiled(),
+    })
+    return classifier
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    # marshal data is only portable within one Python version.
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION or cached.get("python") != sys.implementation.cache_tag:
+        return None
+    return cached
+
+def _write_cache(cache_path, data):
+    temporary = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temporary, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(temporary, cache_path)
+    except OSError:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
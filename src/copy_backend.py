@@ -0,0 +1,434 @@
+import errno
+import itertools
+import os
+import shutil
+import sys
+import threading
+from scanner import ORGANIZER_FILE_PREFIX
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+READ_WRITE = "read_write"
+COPY2 = "copy2"
+
+# ioctl request number of FICLONE (linux/fs.h): share all extents of the source on CoW filesystems.
+FICLONE = 0x40049409
+
+_IS_LINUX = sys.platform.startswith("linux")
+
+# Errors meaning "this strategy does not work between these two filesystems", not "the copy failed".
+_UNSUPPORTED = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EBADF, errno.EPERM, errno.EMLINK,
+    getattr(errno, "ENOTSUP", errno.EINVAL), getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTTY", errno.EINVAL),
+}
+
+_CHUNK_SIZE = 64 * 1024 * 1024
+# Files from this size on are copied in _LARGE_CHUNK pieces with page cache hints and progress callbacks.
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+# A multiple of every common page size, so cache hints cover whole pages.
+_LARGE_CHUNK = 8 * 1024 * 1024
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+# Copies are written under this name and only appear under their real name once complete.
+PARTIAL_PREFIX = ORGANIZER_FILE_PREFIX + "partial."
+_partial_numbers = itertools.count()
+
+def partial_name(target):
+    return os.path.join(os.path.dirname(target), f"{PARTIAL_PREFIX}{os.getpid()}.{next(_partial_numbers)}")
+
+def publish(temporary, target):
+    """Gives a finished temporary file its real name atomically, never replacing an existing file."""
+    try:
+        os.link(temporary, target)
+    except OSError as error:
+        if error.errno == errno.EEXIST or error.errno not in _UNSUPPORTED:
+            raise
+        # No hard links on this filesystem (e.g. FAT, some network shares): rename instead.
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+        os.rename(temporary, target)
+        return
+    os.unlink(temporary)
+
+# renameat2() flag (linux/fs.h): fail with EEXIST instead of replacing the target.
+RENAME_NOREPLACE = 1
+_AT_FDCWD = -100
+_renameat2 = None
+_LINK_KEEPS_SYMLINKS = os.link in os.supports_follow_symlinks
+
+def _load_renameat2():
+    # Loaded on first use: ctypes is only needed for moves, and only on Linux.
+    global _renameat2
+    if _renameat2 is None:
+        _renameat2 = False
+        if _IS_LINUX:
+            try:
+                import ctypes
+                import ctypes.util
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                function = libc.renameat2
+            except (OSError, AttributeError):
+                # glibc before 2.28 has no wrapper for it.
+                return False
+            function.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+            function.restype = ctypes.c_int
+            _renameat2 = (function, ctypes.get_errno)
+    return _renameat2
+
+def rename_noreplace(source, target, src_dir_fd=None, dst_dir_fd=None):
+    """
+    Renames source to target, raising FileExistsError instead of replacing an existing target.
+
+    Uses renameat2(RENAME_NOREPLACE) where the kernel and filesystem support
+    it, otherwise a hard link to the new name followed by an unlink of the old
+    one (like publish()); without hard links the target is checked just
+    before a plain rename. Names that differ only in case count as the same
+    name on case-insensitive filesystems.
+    """
+    renameat2 = _load_renameat2()
+    if renameat2:
+        function, get_errno = renameat2
+        result = function(_AT_FDCWD if src_dir_fd is None else src_dir_fd, os.fsencode(source),
+                          _AT_FDCWD if dst_dir_fd is None else dst_dir_fd, os.fsencode(target), RENAME_NOREPLACE)
+        if result == 0:
+            return
+        error = get_errno()
+        # ENOSYS: kernel without renameat2; EINVAL: the filesystem does not support the flag.
+        if error not in (errno.ENOSYS, errno.EINVAL):
+            raise OSError(error, os.strerror(error), source, None, target)
+
+    link_options = {"follow_symlinks": False} if _LINK_KEEPS_SYMLINKS else {}
+    try:
+        os.link(source, target, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd, **link_options)
+    except OSError as error:
+        if error.errno in (errno.EEXIST, errno.EXDEV) or error.errno not in _UNSUPPORTED:
+            raise
+        # No hard links on this filesystem: only a concurrent writer can slip in between check and rename.
+        try:
+            os.stat(target, dir_fd=dst_dir_fd, follow_symlinks=False)
+        except FileNotFoundError:
+            os.rename(source, target, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+            return
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+    os.unlink(source, dir_fd=src_dir_fd)
+
+def _reflink(src_fd, dst_fd, size):
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+def _copy_file_range_chunk(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+def _sendfile_chunk(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+def _read_write_chunk(src_fd, dst_fd, offset, count):
+    data = memoryview(os.pread(src_fd, count, offset))
+    copied = len(data)
+    while data:
+        data = data[os.write(dst_fd, data):]
+    return copied
+
+def _advise(fd, offset, length, advice):
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+def _copy_chunks(copy_chunk, src_fd, dst_fd, chunk_size, progress=None, drop_cache=False):
+    """
+    Calls copy_chunk(src_fd, dst_fd, offset, count) until it copies nothing and returns the bytes copied.
+
+    With drop_cache the source is read with a sequential hint, and pages of
+    both files are dropped from the page cache behind the copy, so one huge
+    file does not push everything else out. For the target, the first hint on
+    a chunk only starts writing it back; the next chunk's hint drops it.
+    """
+    if drop_cache and _HAS_FADVISE:
+        _advise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    offset = 0
+    while True:
+        copied = copy_chunk(src_fd, dst_fd, offset, chunk_size)
+        if copied == 0:
+            break
+        if drop_cache and _HAS_FADVISE:
+            _advise(src_fd, offset, copied, os.POSIX_FADV_DONTNEED)
+            start = max(0, offset - chunk_size)
+            _advise(dst_fd, start, offset + copied - start, os.POSIX_FADV_DONTNEED)
+        offset += copied
+        if progress is not None:
+            progress(offset)
+    return offset
+
+def _copy_file_range(src_fd, dst_fd, size):
+    if _copy_chunks(_copy_file_range_chunk, src_fd, dst_fd, _CHUNK_SIZE) == 0 and size:
+        # Some filesystems report success but copy nothing (e.g. procfs-like sources).
+        raise OSError(errno.EINVAL, "copy_file_range copied no data")
+
+def _sendfile(src_fd, dst_fd, size):
+    _copy_chunks(_sendfile_chunk, src_fd, dst_fd, _CHUNK_SIZE)
+
+# Chunk-by-chunk versions of the strategies, used for large files.
+_CHUNKED = {COPY_FILE_RANGE: _copy_file_range_chunk, SENDFILE: _sendfile_chunk}
+
+def _available_strategies():
+    strategies = []
+    if _IS_LINUX and fcntl is not None:
+        strategies.append((REFLINK, _reflink))
+    if hasattr(os, "copy_file_range"):
+        strategies.append((COPY_FILE_RANGE, _copy_file_range))
+    if _IS_LINUX and hasattr(os, "sendfile"):
+        strategies.append((SENDFILE, _sendfile))
+    return strategies
+
+class CopyBackend:
+    """
+    Copies a file using the cheapest mechanism the two filesystems support.
+
+    The order is: hard link (only when allow_hardlink is set, since the copy
+    then shares its data with the source), reflink via FICLONE on copy-on-write
+    filesystems, os.copy_file_range, os.sendfile, and finally shutil.copy2.
+    Files of at least large_file_size bytes are copied in chunks that are
+    dropped from the page cache behind the copy (see _copy_chunks), calling
+    progress(bytes_copied) after each; if no kernel strategy works for them,
+    they are copied with pread/write chunks (READ_WRITE). throttle(size), when
+    given, is called once before data is actually copied, not for hard links
+    or reflinks. With atomic (the default) data is written to a temporary name
+    in the target folder and published once complete, so an interrupted run never
+    leaves a partial file under the real name. A strategy that fails as
+    unsupported for a pair of devices is not tried again for that pair. usage
+    maps each strategy to the files and bytes it handled.
+    """
+
+    def __init__(self, allow_hardlink=False, atomic=True, large_file_size=LARGE_FILE_SIZE):
+        self.allow_hardlink = allow_hardlink
+        self.atomic = atomic
+        self.large_file_size = large_file_size
+        self.usage = {}
+        self._strategies = _available_strategies()
+        self._unsupported = set()
+        self._lock = threading.Lock()
+
+    def _record(self, strategy, size):
+        with self._lock:
+            entry = self.usage.setdefault(strategy, {"files": 0, "bytes": 0})
+            entry["files"] += 1
+            entry["bytes"] += size
+
+    def _mark_unsupported(self, key):
+        with self._lock:
+            self._unsupported.add(key)
+
+    def copy(self, source, target, progress=None, throttle=None):
+        """Copies source to target (which must not exist yet) and returns the strategy used."""
+        source_info = os.stat(source)
+        size = source_info.st_size
+        large = size >= self.large_file_size
+        charged = []
+
+        def charge():
+            if throttle is not None and not charged:
+                charged.append(size)
+                throttle(size)
+
+        if self.allow_hardlink:
+            target_dev = os.stat(os.path.dirname(target) or ".").st_dev
+            key = (HARDLINK, source_info.st_dev, target_dev)
+            if key not in self._unsupported:
+                try:
+                    os.link(source, target)
+                    self._record(HARDLINK, size)
+                    if progress is not None and large:
+                        progress(size)
+                    return HARDLINK
+                except OSError as error:
+                    if error.errno not in _UNSUPPORTED:
+                        raise
+                    self._mark_unsupported(key)
+
+        destination = partial_name(target) if self.atomic else target
+        try:
+            strategy = self._copy_in_kernel(source, destination, source_info, progress if large else None, large,
+                                            charge)
+            if strategy is None:
+                charge()
+                shutil.copy2(source, destination)
+                strategy = COPY2
+                if progress is not None and large:
+                    progress(size)
+            if self.atomic:
+                publish(destination, target)
+        except BaseException:
+            if self.atomic:
+                try:
+                    os.unlink(destination)
+                except OSError:
+                    pass
+            raise
+        self._record(strategy, size)
+        return strategy
+
+    def _copy_in_kernel(self, source, target, source_info, progress=None, large=False, charge=None):
+        chunked = large and hasattr(os, "pread")
+        if not self._strategies and not chunked:
+            return None
+        size = source_info.st_size
+        with open(source, "rb") as src, open(target, "xb") as dst:
+            src_fd = src.fileno()
+            dst_fd = dst.fileno()
+            target_dev = os.fstat(dst_fd).st_dev
+            for strategy, copy_function in self._strategies:
+                key = (strategy, source_info.st_dev, target_dev)
+                if key in self._unsupported:
+                    continue
+                if strategy != REFLINK and charge is not None:
+                    charge()
+                try:
+                    copy_chunk = _CHUNKED.get(strategy) if large else None
+                    if copy_chunk is None:
+                        copy_function(src_fd, dst_fd, size)
+                        if progress is not None:
+                            progress(size)
+                    elif _copy_chunks(copy_chunk, src_fd, dst_fd, _LARGE_CHUNK, progress, drop_cache=True) == 0:
+                        raise OSError(errno.EINVAL, f"{strategy} copied no data")
+                except OSError as error:
+                    if error.errno not in _UNSUPPORTED:
+                        raise
+                    self._mark_unsupported(key)
+                    os.ftruncate(dst_fd, 0)
+                    continue
+                os.chmod(dst_fd, source_info.st_mode & 0o7777)
+                return strategy
+            if chunked:
+                if charge is not None:
+                    charge()
+                _copy_chunks(_read_write_chunk, src_fd, dst_fd, _LARGE_CHUNK, progress, drop_cache=True)
+                shutil.copystat(source, target)
+                return READ_WRITE
+        # Nothing worked in the kernel; shutil.copy2 rewrites the (empty) target.
+        return None
+
+RENAME = "rename"
+COPY_DELETE = "copy+delete"
+
+_RENAME_WITH_DIR_FD = os.rename in os.supports_dir_fd and hasattr(os, "O_DIRECTORY")
+
+class MoveBackend:
+    """
+    Moves files with a bare rename whenever source and target share a device.
+
+    Directories are opened once and renames are issued relative to those
+    descriptors (renameat), so the kernel does not resolve the full paths of
+    both sides for every file. Whether a source/target directory pair is on the
+    same device is decided once from st_dev. Renames never replace an existing
+    target (see rename_noreplace); a taken name raises FileExistsError, as a
+    copy through publish() does. Only moves that really cross devices are done
+    as a streamed copy through `copier` followed by a delete; only those are
+    passed throttle, which the copier calls before copying.
+    usage maps RENAME / COPY_DELETE to the files and bytes they handled.
+    """
+
+    def __init__(self, copier=None, max_open_dirs=256):
+        self.copier = copier if copier is not None else CopyBackend()
+        self.usage = {}
+        self._max_open_dirs = max_open_dirs
+        self._dirs = {}
+        self._same_device = {}
+        self._lock = threading.Lock()
+
+    def _record(self, strategy, size):
+        with self._lock:
+            entry = self.usage.setdefault(strategy, {"files": 0, "bytes": 0})
+            entry["files"] += 1
+            entry["bytes"] += size
+
+    def _directory(self, path):
+        # Returns (fd, device, cached). Uncached descriptors must be closed by the caller.
+        handle = self._dirs.get(path)
+        if handle is not None:
+            return handle[0], handle[1], True
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        device = os.fstat(fd).st_dev
+        with self._lock:
+            if path in self._dirs:
+                os.close(fd)
+                fd, device = self._dirs[path]
+                return fd, device, True
+            if len(self._dirs) < self._max_open_dirs:
+                self._dirs[path] = (fd, device)
+                return fd, device, True
+        return fd, device, False
+
+    def move(self, source, target, size=0, progress=None, throttle=None):
+        """Moves source to target (which must not exist yet) and returns the strategy used."""
+        source_dir, source_name = os.path.split(source)
+        target_dir, target_name = os.path.split(target)
+        source_dir = source_dir or "."
+        target_dir = target_dir or "."
+
+        if _RENAME_WITH_DIR_FD:
+            strategy = self._rename_at(source_dir, source_name, target_dir, target_name)
+        else:
+            strategy = self._rename_paths(source, target, source_dir, target_dir)
+
+        if strategy is None:
+            self.copier.copy(source, target, progress, throttle)
+            shutil.copystat(source, target)
+            os.unlink(source)
+            strategy = COPY_DELETE
+        self._record(strategy, size)
+        return strategy
+
+    def _rename_at(self, source_dir, source_name, target_dir, target_name):
+        source_fd, source_dev, source_cached = self._directory(source_dir)
+        try:
+            target_fd, target_dev, target_cached = self._directory(target_dir)
+            try:
+                if source_dev != target_dev or self._same_device.get((source_dir, target_dir)) is False:
+                    return None
+                try:
+                    rename_noreplace(source_name, target_name, src_dir_fd=source_fd, dst_dir_fd=target_fd)
+                except OSError as error:
+                    if error.errno != errno.EXDEV:
+                        raise
+                    # Same st_dev but different mounts (e.g. bind mounts).
+                    self._same_device[(source_dir, target_dir)] = False
+                    return None
+                return RENAME
+            finally:
+                if not target_cached:
+                    os.close(target_fd)
+        finally:
+            if not source_cached:
+                os.close(source_fd)
+
+    def _rename_paths(self, source, target, source_dir, target_dir):
+        key = (source_dir, target_dir)
+        same_device = self._same_device.get(key)
+        if same_device is None:
+            same_device = os.stat(source_dir).st_dev == os.stat(target_dir).st_dev
+            self._same_device[key] = same_device
+        if not same_device:
+            return None
+        try:
+            rename_noreplace(source, target)
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+            self._same_device[key] = False
+            return None
+        return RENAME
+
+    def close(self):
+        with self._lock:
+            for fd, _ in self._dirs.values():
+                os.close(fd)
+            self._dirs.clear()
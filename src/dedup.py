@@ -0,0 +1,142 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from plan import COPY, LINK, OperationTable
+
+DEDUP_POLICIES = ("report", "skip", "hardlink")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.digest()
+
+def _existing_files(folders):
+    existing = {}
+    for folder in folders:
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            existing[entry.path] = entry.stat().st_size
+                    except OSError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return existing
+
+def _hash_all(paths, workers):
+    def safe_digest(path):
+        try:
+            return file_digest(path)
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(zip(paths, executor.map(safe_digest, paths)))
+
+def deduplicate(operations, stats, policy="report", workers=4):
+    """
+    Finds planned files whose content already exists and applies a policy to them.
+
+    Files are first grouped by size; only sizes shared by two or more files
+    (planned ones or files already in the target category folders) are hashed,
+    chunk by chunk and in parallel. A planned file is a duplicate when an
+    identical file is already in the destination or appears earlier in the plan.
+    Policies: "report" only counts duplicates, "skip" drops them from the plan,
+    "hardlink" replaces their copy by a hard link to the identical file. Moves
+    are never turned into links because a rename does not duplicate any data.
+    Empty files are ignored.
+
+    Operations are held in OperationTables rather than lists, so a plan of
+    millions of files stays small. Returns the new operations and adds
+    duplicates, duplicate_bytes and name_conflicts (same name, different
+    content) to stats.
+    """
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{policy}'. Choose one of: {', '.join(DEDUP_POLICIES)}")
+
+    planned = OperationTable()
+    for operation in operations:
+        planned.append(operation)
+    operations = planned
+    existing = _existing_files({os.path.dirname(operation.target) for operation in operations})
+
+    by_size = {}
+    for path, size in existing.items():
+        if size:
+            by_size.setdefault(size, []).append(path)
+    for operation in operations:
+        if operation.size:
+            by_size.setdefault(operation.size, []).append(operation.source)
+
+    to_hash = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+    digests = _hash_all(to_hash, workers)
+
+    # Content already present in the destination, then claimed by earlier planned files.
+    owners = {}
+    for path, size in existing.items():
+        digest = digests.get(path)
+        if digest is not None:
+            owners.setdefault((size, digest), path)
+
+    duplicates = 0
+    duplicate_bytes = 0
+    name_conflicts = 0
+    # Targets planned earlier in this pass, with the content that will end up there.
+    claimed = {}
+    result = OperationTable()
+    for operation in operations:
+        target_size = existing.get(operation.target)
+        digest = digests.get(operation.source)
+        key = (operation.size, digest)
+
+        if target_size is not None:
+            # Same name already in the destination: the executor skips it either way.
+            if target_size == operation.size and digest is not None and digests.get(operation.target) == digest:
+                duplicates += 1
+                duplicate_bytes += operation.size
+            else:
+                name_conflicts += 1
+            result.append(operation)
+            continue
+
+        if operation.target in claimed:
+            # Same name as an earlier planned file (e.g. x.jpg in two subfolders of a recursive
+            # run): the executor skips this one, so its content never reaches the target.
+            if claimed[operation.target] == key and digest is not None:
+                duplicates += 1
+                duplicate_bytes += operation.size
+            else:
+                name_conflicts += 1
+            result.append(operation)
+            continue
+        claimed[operation.target] = key
+
+        owner = owners.get(key) if digest is not None else None
+        if owner is None:
+            if digest is not None:
+                owners[key] = operation.target
+            result.append(operation)
+            continue
+
+        duplicates += 1
+        duplicate_bytes += operation.size
+        if policy == "skip":
+            continue
+        if policy == "hardlink" and operation.op == COPY:
+            result.append(operation._replace(source=owner, op=LINK))
+        else:
+            result.append(operation)
+
+    stats["duplicates"] = duplicates
+    stats["duplicate_bytes"] = duplicate_bytes
+    stats["name_conflicts"] = name_conflicts
+    return result
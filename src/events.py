@@ -0,0 +1,41 @@
+import os
+from collections import namedtuple
+
+# Per-file outcomes reported by the executor.
+COPIED = "copied"
+MOVED = "moved"
+LINKED = "linked"
+SKIPPED = "skipped"
+# The source disappeared between planning and its transfer (e.g. a saved plan applied later).
+MISSING = "missing"
+# Bytes copied so far of a large file (bytes_done), sent while it is being copied.
+PROGRESS = "progress"
+# Run-level notifications.
+SCAN_COMPLETE = "scan_complete"
+CANCELLED = "cancelled"
+
+OrganizerEvent = namedtuple("OrganizerEvent", ["kind", "operation", "total_files", "total_size", "bytes_done"])
+OrganizerEvent.__new__.__defaults__ = (None, None, None, None)
+
+def describe_event(event):
+    """The message the organizer has always shown for an event, or None for silent ones."""
+    operation = event.operation
+    if event.kind == COPIED:
+        return f"Copying {operation.source} to {_folder(operation)}"
+    if event.kind == MOVED:
+        return f"Moving {operation.source} to {_folder(operation)}"
+    if event.kind == LINKED:
+        return f"Linking {_name(operation)} in {_folder(operation)} to duplicate {operation.source}"
+    if event.kind == SKIPPED:
+        return f"Skipping {_name(operation)} as it already exists in {_folder(operation)}"
+    if event.kind == MISSING:
+        return f"Skipping {operation.source} as it no longer exists"
+    if event.kind == CANCELLED:
+        return "Organization cancelled."
+    return None
+
+def _folder(operation):
+    return os.path.dirname(operation.target)
+
+def _name(operation):
+    return os.path.basename(operation.target)
@@ -1,12 +1,21 @@
 import json
 from pathlib import Path
 import os
-import shutil
+from classifier import compile_categories
+from rules import validate_rule
+from scanner import scan_directory, walk_files, entry_size, FileEntry
+from transfer import TransferPool
+from copy_backend import CopyBackend, MoveBackend
+from profiling import PhaseTimer
+from plan import COPY, MOVE, LINK, OrganizationPlan, PlannedOperation
+from events import OrganizerEvent, SCAN_COMPLETE, CANCELLED, MISSING
+from output import get_output
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config.json"
 
 def load_categories(config_path=None):
     if config_path is None:
-        project_root = Path(__file__).parent.parent
-        config_path = project_root / "config.json"
+        config_path = DEFAULT_CONFIG_PATH
     else:
         config_path = Path(config_path)
 
@@ -27,6 +36,9 @@ def load_categories(config_path=None):
         raise ValueError("The 'categories' value must be a dictionary.")
 
     for category, extensions in categories.items():
+        if isinstance(extensions, dict):
+            validate_rule(category, extensions)
+            continue
         if not isinstance(extensions, list):
             raise ValueError(f"The value for category '{category}' must be a list of extensions.")
         if not all(isinstance(ext, str) for ext in extensions):
@@ -34,84 +46,416 @@ def load_categories(config_path=None):
 
     return categories
 
-def organize_files_in_destination(source_dir, dest_dir, categories, same_place=False, dry_run=False):
-    print("\n--- Organizing Files ---")
-    source_path = Path(source_dir)
-    dest_path = Path(dest_dir)
+def category_folders_to_skip(source_path, dest_path, classifier):
+    # When the destination lives inside the source tree, a recursive walk must
+    # not descend into the folders it is filling.
+    source_real = os.path.realpath(source_path)
+    dest_real = os.path.realpath(dest_path)
+    if dest_real == source_real:
+        return [os.path.join(source_path, folder) for folder in classifier.folders()]
+    if dest_real.startswith(source_real + os.sep):
+        return [os.path.join(source_path, os.path.relpath(dest_real, source_real))]
+    return []
 
+def new_stats(recursive=False):
     stats = {
         "total_files": 0,
         "total_size": 0,
         "files_per_category": {}
     }
+    if recursive:
+        stats["files_per_directory"] = {}
+    return stats
+
+def plan_operations(source_dir, dest_dir, categories, stats, same_place=False,
+                    recursive=False, max_depth=None, follow_symlinks=False, walkers=4,
+                    index=None, observer=None):
+    """
+    Planning phase: lazily yields one PlannedOperation per file and fills in stats.
+
+    Nothing is touched on disk. Operations are produced while the source is still
+    being scanned, so an executor can start on the first files right away.
+    With a ScanIndex, files recorded with the same size and mtime are skipped
+    and counted in stats["unchanged_files"]; planned files are recorded in it.
+    An observer (see profiling.RunProfiler) receives the time spent scanning,
+    stat-ing and classifying.
+    """
+    source_path = Path(source_dir)
+    dest_path = Path(dest_dir)
+    classifier = compile_categories(categories)
+    op = MOVE if same_place else COPY
+
+    sources = source_entries(source_path, dest_path, classifier, recursive=recursive, max_depth=max_depth,
+                             follow_symlinks=follow_symlinks, walkers=walkers)
+    files_per_directory = stats.setdefault("files_per_directory", {}) if recursive else None
+
+    if index is not None:
+        stats.setdefault("unchanged_files", 0)
+
+    classify = classifier.classify
+    size_of = entry_size
+    timers = ()
+    if observer is not None:
+        timers = scan_timer, stat_timer, classify_timer = [PhaseTimer(observer, name) for name in ("scan", "stat", "classify")]
+        sources = scan_timer.iterate(sources)
+        size_of = stat_timer.wrap(entry_size)
+        classify = classify_timer.wrap(classify)
 
-    if dry_run:
-        print("\n--- Starting Dry Run (no files will be moved) ---")
-
-    for item in os.listdir(source_path):
-        source_item = source_path / item
-        if source_item.is_file():
-            stats["total_files"] += 1
-            try:
-                file_size = source_item.stat().st_size
-                stats["total_size"] += file_size
-            except FileNotFoundError:
+    try:
+        yield from _plan_entries(sources, dest_path, classify, size_of, op, stats, files_per_directory, index,
+                                 classifier.rules is not None)
+    finally:
+        for timer in timers:
+            timer.flush()
+
+def source_entries(source_path, dest_path, classifier, recursive=False, max_depth=None, follow_symlinks=False, walkers=4):
+    """Yields (relative_dir, entry) for every file to organize in source_path."""
+    if recursive:
+        exclude_dirs = category_folders_to_skip(source_path, dest_path, classifier)
+        return walk_files(source_path, workers=walkers, max_depth=max_depth,
+                          follow_symlinks=follow_symlinks, exclude_dirs=exclude_dirs)
+    return ((".", entry) for entry in scan_directory(source_path))
+
+def plan_files(paths, dest_dir, categories, stats, same_place=False):
+    """Yields a PlannedOperation for each given file path, classified exactly like plan_operations."""
+    return plan_entries(((".", FileEntry(path)) for path in paths), dest_dir, categories, stats, same_place)
+
+def plan_entries(sources, dest_dir, categories, stats, same_place=False):
+    """
+    Like plan_files, for (relative_dir, entry) pairs as produced by source_entries().
+
+    Files are counted per directory when stats has a files_per_directory key.
+    """
+    classifier = compile_categories(categories)
+    op = MOVE if same_place else COPY
+    return _plan_entries(sources, Path(dest_dir), classifier.classify, entry_size, op, stats,
+                         stats.get("files_per_directory"), None, classifier.rules is not None)
+
+def _plan_entries(sources, dest_path, classify, size_of, op, stats, files_per_directory, index, uses_rules=False):
+    dest_folders = {}
+    for relative_dir, entry in sources:
+        file_size = size_of(entry)
+        if index is not None and file_size is not None:
+            mtime_ns = entry.stat().st_mtime_ns
+            if index.is_unchanged(entry.path, file_size, mtime_ns):
+                stats["unchanged_files"] += 1
                 continue
 
-            file_extension = source_item.suffix.lower()
-            
-            target_category = "Others" #default
-            for category, extensions in categories.items():
-                if file_extension in extensions:
-                    target_category = category
+        stats["total_files"] += 1
+        if files_per_directory is not None:
+            files_per_directory[relative_dir] = files_per_directory.get(relative_dir, 0) + 1
+        if file_size is None:
+            continue
+        stats["total_size"] += file_size
+
+        if uses_rules:
+            # Rules may look at size and age; entry.stat() is already cached by size_of.
+            target_category = classify(entry.name, file_size, entry.stat().st_mtime)
+        else:
+            target_category = classify(entry.name)
+
+        if target_category not in stats["files_per_category"]:
+            stats["files_per_category"][target_category] = 0
+        stats["files_per_category"][target_category] += 1
+
+        dest_folder = dest_folders.get(target_category)
+        if dest_folder is None:
+            dest_folder = dest_folders[target_category] = os.path.join(dest_path, target_category)
+
+        operation = PlannedOperation(entry.path, os.path.join(dest_folder, entry.name), op, file_size, target_category)
+        if index is not None:
+            index.record(operation, mtime_ns)
+        yield operation
+
+def execute_operations(operations, workers=1, stats=None, hardlink=False, observer=None,
+                       on_event=None, cancel=None, journal=None, scheduler=None, largest_first=False):
+    """
+    Runs operations on a TransferPool, reporting each finished file to on_event.
+
+    Once every operation has been handed to the pool, a SCAN_COMPLETE event
+    carries the number and total size of the files, so progress displays can
+    switch from "counting" to a real percentage. Setting `cancel` stops the
+    run cleanly between files; stats["cancelled"] is then True. With a
+    journal (see journal.py), operations are journaled in batches before they
+    are handed to the pool and every result is journaled as it comes in.
+    A scheduler (see io_scheduler.py) may reorder the operations and limits
+    how many transfers each device handles at once. With largest_first the
+    biggest files are handed to the pool first (see io_scheduler.largest_first).
+    A source deleted since it was planned is reported as MISSING, counted in
+    stats["missing_files"], and the run goes on.
+    """
+    default_sink = on_event is None
+    if default_sink:
+        on_event = get_output()
+    emit = on_event
+    if scheduler is not None:
+        operations = scheduler.order(operations)
+    if largest_first:
+        from io_scheduler import largest_first as by_size
+        operations = by_size(operations)
+    if journal is not None:
+        on_event = _journaled(emit, journal)
+        operations = _journal_batches(operations, journal)
+    missing = []
+    on_event = _counting_missing(on_event, missing)
+    copier = CopyBackend(allow_hardlink=hardlink)
+    mover = MoveBackend(copier)
+    # Hard links point at files other operations create, so they run last.
+    links = []
+    submitted = 0
+    submitted_size = 0
+    try:
+        with TransferPool(workers, copier=copier, mover=mover, observer=observer, on_event=on_event, cancel=cancel,
+                          scheduler=scheduler) as pool:
+            for operation in operations:
+                if pool.cancelled():
                     break
-            
-            if target_category not in stats["files_per_category"]:
-                stats["files_per_category"][target_category] = 0
-            stats["files_per_category"][target_category] += 1
-
-            dest_folder = dest_path / target_category
-            
-            if dry_run:
-                print(f"DRY-RUN: Would {'move' if same_place else 'copy'} '{source_item.name}' to '{dest_folder}'")
-                continue
+                submitted += 1
+                submitted_size += operation.size
+                if operation.op == LINK:
+                    links.append(operation)
+                else:
+                    pool.submit(operation)
+            if hasattr(operations, "close"):
+                operations.close()
+            if not pool.cancelled():
+                if journal is not None:
+                    journal.scan_complete()
+                emit(OrganizerEvent(SCAN_COMPLETE, total_files=submitted, total_size=submitted_size))
+        if links:
+            with TransferPool(workers, copier=copier, mover=mover, observer=observer, on_event=on_event, cancel=cancel,
+                              scheduler=scheduler) as pool:
+                for operation in links:
+                    pool.submit(operation)
+    finally:
+        mover.close()
+        if default_sink:
+            emit.flush()
+    cancelled = cancel is not None and cancel.is_set()
+    if journal is not None and not cancelled:
+        journal.complete()
+    if cancelled:
+        emit(OrganizerEvent(CANCELLED))
+    if stats is not None:
+        record_backend_usage(stats, copier, mover)
+        if scheduler is not None and scheduler.throttled_seconds:
+            stats["throttled_seconds"] = round(scheduler.throttled_seconds, 3)
+        if cancelled:
+            stats["cancelled"] = True
+        if missing:
+            stats["missing_files"] = len(missing)
 
-            dest_folder.mkdir(parents=True, exist_ok=True)
-            
-            dest_file = dest_folder / source_item.name
+def _counting_missing(on_event, missing):
+    def counted(event):
+        if event.kind == MISSING:
+            # list.append is atomic, so workers need no lock here.
+            missing.append(event.operation)
+        on_event(event)
+    return counted
 
-            if dest_file.exists():
-                print(f"Skipping {source_item.name} as it already exists in {dest_folder}")
-                continue
+def _journaled(emit, journal):
+    def on_event(event):
+        journal.record_result(event)
+        emit(event)
+    return on_event
+
+def _journal_batches(operations, journal):
+    batch = []
+    try:
+        for operation in operations:
+            batch.append(operation)
+            if len(batch) >= journal.batch_size:
+                journal.log_planned(batch)
+                yield from batch
+                batch = []
+        if batch:
+            journal.log_planned(batch)
+            yield from batch
+    finally:
+        if hasattr(operations, "close"):
+            operations.close()
+
+def record_backend_usage(stats, copier, mover):
+    if copier.usage:
+        stats["copy_strategies"] = copier.usage
+    if mover.usage:
+        stats["move_strategies"] = mover.usage
+
+def execute_plan(plan, workers=1, hardlink=False, observer=None, on_event=None, cancel=None, largest_first=False):
+    """Execution phase: performs every operation of a (possibly loaded) plan and returns its stats."""
+    get_output().info("\n--- Organizing Files ---")
+    if observer is not None:
+        observer.start()
+    execute_operations(plan, workers=workers, stats=plan.stats, hardlink=hardlink, observer=observer,
+                       on_event=on_event, cancel=cancel, largest_first=largest_first)
+    if observer is not None:
+        observer.stop()
+        plan.stats["profile"] = observer.summary()
+    return plan.stats
+
+def organize_files_in_destination(source_dir, dest_dir, categories, same_place=False, dry_run=False, workers=1,
+                                  recursive=False, max_depth=None, follow_symlinks=False, walkers=4,
+                                  plan_path=None, index=None, dedup=None, hardlink=False, observer=None,
+                                  on_event=None, cancel=None, sniff=None, journal=False, journal_sync=None,
+                                  scheduler=None, largest_first=False, archives=None):
+    get_output().info("\n--- Organizing Files ---")
+    # Planned paths are stored in plans and journals, which may be applied from another directory.
+    source_dir = Path(os.path.abspath(source_dir))
+    dest_dir = Path(os.path.abspath(dest_dir))
+    collector = None
+    if archives is not None:
+        from archives import ArchiveCollector, validate_archive_mode
+        validate_archive_mode(archives)
+        collector = on_event = ArchiveCollector(on_event if on_event is not None else get_output())
+    if observer is not None:
+        observer.start()
+
+    stats = new_stats(recursive)
+    operations = plan_operations(source_dir, dest_dir, categories, stats, same_place=same_place,
+                                 recursive=recursive, max_depth=max_depth,
+                                 follow_symlinks=follow_symlinks, walkers=walkers, index=index,
+                                 observer=observer)
+    sniffer = None
+    if sniff is not None:
+        from sniffer import ContentSniffer, sniff_operations, SNIFF_CACHE_NAME
+        sniffer = ContentSniffer(os.path.join(dest_dir, SNIFF_CACHE_NAME), workers=max(workers, 8))
+        operations = sniff_operations(operations, dest_dir, categories, stats, mode=sniff, sniffer=sniffer, index=index)
+    if dedup is not None:
+        from dedup import deduplicate
+        if observer is not None:
+            with observer.phase("dedup"):
+                operations = deduplicate(operations, stats, policy=dedup, workers=max(workers, 4))
+        else:
+            operations = deduplicate(operations, stats, policy=dedup, workers=max(workers, 4))
+
+    if dry_run or plan_path is not None:
+        plan = OrganizationPlan(source_dir, dest_dir, same_place, stats)
+        for operation in operations:
+            plan.append(operation)
+        if plan_path is not None:
+            plan.save(plan_path)
+        if sniffer is not None:
+            sniffer.save()
+        if dry_run:
+            get_output().info("\n--- Starting Dry Run (no files will be moved) ---")
+            if len(plan):
+                get_output().info(plan.describe())
+            if index is not None:
+                index.rollback()
+            if observer is not None:
+                observer.stop()
+                stats["profile"] = observer.summary()
+            return dict(stats, plan=plan)
+        operations = plan
+
+    run_journal = None
+    if journal:
+        from journal import Journal, JOURNAL_SYNC_EVERY
+        run_journal = Journal.create(dest_dir, source_dir, same_place=same_place,
+                                     sync_every=journal_sync or JOURNAL_SYNC_EVERY)
+    try:
+        execute_operations(operations, workers=workers, stats=stats, hardlink=hardlink, observer=observer,
+                           on_event=on_event, cancel=cancel, journal=run_journal, scheduler=scheduler,
+                           largest_first=largest_first)
+    except BaseException:
+        if index is not None:
+            index.rollback()
+        raise
+    finally:
+        if run_journal is not None:
+            run_journal.close()
+    if sniffer is not None:
+        sniffer.save()
+    if collector is not None and not stats.get("cancelled"):
+        from archives import process_archives
+        if observer is not None:
+            with observer.phase("archives"):
+                process_archives(collector.paths, dest_dir, categories, stats, mode=archives, workers=max(workers, 4))
+        else:
+            process_archives(collector.paths, dest_dir, categories, stats, mode=archives, workers=max(workers, 4))
+    if index is not None:
+        # A cancelled run did not handle every recorded file; keep the index as it was.
+        if stats.get("cancelled"):
+            index.rollback()
+        else:
+            index.commit()
+    if observer is not None:
+        observer.stop()
+        stats["profile"] = observer.summary()
 
-            if same_place:
-                print(f"Moving {source_item} to {dest_folder}")
-                shutil.move(str(source_item), str(dest_folder))
-            else:
-                print(f"Copying {source_item} to {dest_folder}")
-                shutil.copy(str(source_item), str(dest_folder))
-    
     return stats
 
+def format_size(size):
+    size_kb = size / 1024
+    size_mb = size_kb / 1024
+    size_gb = size_mb / 1024
+
+    if size_gb >= 1:
+        return f"{size_gb:.2f} GB"
+    elif size_mb >= 1:
+        return f"{size_mb:.2f} MB"
+    elif size_kb >= 1:
+        return f"{size_kb:.2f} KB"
+    else:
+        return f"{size} bytes"
+
 def format_report(stats):
     report = "\n--- Organization Report ---\n"
+    if stats.get("cancelled"):
+        report += "The run was cancelled; some files were not organized.\n"
     report += f"Total files processed: {stats['total_files']}\n"
     
-    total_size_kb = stats['total_size'] / 1024
-    total_size_mb = total_size_kb / 1024
-    total_size_gb = total_size_mb / 1024
-    
-    if total_size_gb >= 1:
-        report += f"Total size of files: {total_size_gb:.2f} GB\n"
-    elif total_size_mb >= 1:
-        report += f"Total size of files: {total_size_mb:.2f} MB\n"
-    elif total_size_kb >= 1:
-        report += f"Total size of files: {total_size_kb:.2f} KB\n"
-    else:
-        report += f"Total size of files: {stats['total_size']} bytes\n"
+    report += f"Total size of files: {format_size(stats['total_size'])}\n"
+
+    if stats.get("failed_batches"):
+        report += f"Batches that failed (see the warnings above): {stats['failed_batches']}\n"
+    if stats.get("missing_files"):
+        report += f"Files no longer in the source (skipped): {stats['missing_files']}\n"
+    if "unchanged_files" in stats:
+        report += f"Unchanged files skipped: {stats['unchanged_files']}\n"
+    if "duplicates" in stats:
+        report += f"Duplicate files: {stats['duplicates']} ({format_size(stats['duplicate_bytes'])})\n"
+        report += f"Name conflicts with different content: {stats['name_conflicts']}\n"
+    if "identified_by_content" in stats:
+        report += f"Identified by content: {stats['identified_by_content']}\n"
+    if "mislabeled" in stats:
+        report += f"Mislabeled files re-filed by content: {stats['mislabeled']}\n"
+    if "throttled_seconds" in stats:
+        report += f"Time spent waiting for rate limits: {stats['throttled_seconds']:.1f} s\n"
+    if "archives" in stats:
+        archives = stats["archives"]
+        report += f"Archives read: {archives['archives']} ({archives['members']} files inside)\n"
+        if archives["extracted"] or archives["skipped"]:
+            report += f"Files extracted from archives: {archives['extracted']} ({archives['skipped']} already existed)\n"
+        if archives["errors"]:
+            report += f"Archives that could not be read: {archives['errors']}\n"
 
     report += "\nFiles per category:\n"
     for category, count in stats["files_per_category"].items():
         report += f"- {category}: {count}\n"
+    if stats.get("archives", {}).get("categories"):
+        report += "\nFiles inside archives per category:\n"
+        for category, count in stats["archives"]["categories"].items():
+            report += f"- {category}: {count}\n"
+    if stats.get("copy_strategies"):
+        report += "\nCopy strategies:\n"
+        for strategy, usage in stats["copy_strategies"].items():
+            report += f"- {strategy}: {usage['files']} files, {format_size(usage['bytes'])}\n"
+    if stats.get("move_strategies"):
+        report += "\nMove strategies:\n"
+        for strategy, usage in stats["move_strategies"].items():
+            report += f"- {strategy}: {usage['files']} files, {format_size(usage['bytes'])}\n"
+    if stats.get("profile"):
+        profile = stats["profile"]
+        report += "\nPerformance:\n"
+        report += f"- Wall time: {profile['wall_seconds']:.3f} s\n"
+        if profile["files_per_s"] is not None:
+            report += f"- Throughput: {profile['files_per_s']:.1f} files/s, {profile['mb_per_s']:.2f} MB/s\n"
+        for phase, seconds in profile["phases"].items():
+            report += f"- {phase}: {seconds:.3f} s\n"
+    if stats.get("files_per_directory"):
+        report += "\nFiles per directory:\n"
+        for directory, count in sorted(stats["files_per_directory"].items()):
+            report += f"- {directory}: {count}\n"
     report += "---------------------------\n"
     return report
@@ -1,19 +1,27 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
+import queue
 import sys
 import os
+import threading
+import time
 
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from os_config import validate_paths
 from folder_utils import organize_files_in_destination, format_report, load_categories
+from classifier import CategoryClassifier
+from events import OrganizerEvent, COPIED, MOVED, LINKED, SKIPPED, MISSING, SCAN_COMPLETE
+
+POLL_INTERVAL_MS = 100
+MAX_EVENTS_PER_POLL = 2000
 
 class FileOrganizerApp(tk.Tk):
     def __init__(self, dry_run_cli_state=False):
         super().__init__()
         self.title("File Organizer")
-        self.geometry("650x250")
+        self.geometry("650x360")
 
         self.columnconfigure(1, weight=1)
 
@@ -21,6 +29,19 @@ class FileOrganizerApp(tk.Tk):
         self.dest_path = tk.StringVar()
         self.same_place_var = tk.BooleanVar()
         self.dry_run_var = tk.BooleanVar(value=dry_run_cli_state)
+        self.workers_var = tk.IntVar(value=1)
+
+        self._categories = None
+        self._classifier = None
+
+        # Organization runs on a worker thread; its events are drained with after().
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = None
+        self._files_done = 0
+        self._bytes_done = 0
+        self._total_files = None
+        self._started_at = None
 
         self.create_widgets()
 
@@ -44,12 +65,25 @@ class FileOrganizerApp(tk.Tk):
         self.dry_run_checkbox = tk.Checkbutton(self, text="Dry-run (preview changes)", variable=self.dry_run_var)
         self.dry_run_checkbox.grid(row=2, column=2, padx=10, pady=10, sticky="w")
 
-        # Organize Button
-        tk.Button(self, text="Organize Files", command=self.organize_files).grid(row=3, column=1, padx=10, pady=20)
+        # Worker count
+        tk.Label(self, text="Parallel workers:").grid(row=3, column=0, padx=10, pady=10, sticky="w")
+        tk.Spinbox(self, from_=1, to=64, textvariable=self.workers_var, width=5).grid(row=3, column=1, padx=10, pady=10, sticky="w")
+
+        # Organize and Cancel Buttons
+        self.organize_button = tk.Button(self, text="Organize Files", command=self.organize_files)
+        self.organize_button.grid(row=4, column=1, padx=10, pady=20)
+        self.cancel_button = tk.Button(self, text="Cancel", command=self.cancel_organize, state="disabled")
+        self.cancel_button.grid(row=4, column=2, padx=10, pady=20)
+
+        # Progress
+        self.progress_bar = ttk.Progressbar(self, mode="determinate", maximum=1)
+        self.progress_bar.grid(row=5, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
+        self.progress_label = tk.Label(self, text="")
+        self.progress_label.grid(row=6, column=0, columnspan=3, padx=10)
 
         # Status Label
         self.status_label = tk.Label(self, text="", fg="green")
-        self.status_label.grid(row=4, column=0, columnspan=3, padx=10, pady=10)
+        self.status_label.grid(row=7, column=0, columnspan=3, padx=10, pady=10)
 
     def browse_source(self):
         path = filedialog.askdirectory()
@@ -75,11 +109,24 @@ class FileOrganizerApp(tk.Tk):
             dest_entry.config(state="normal")
             dest_browse_button.config(state="normal")
 
+    def get_classifier(self, categories):
+        # Recompile only when the configuration actually changed between runs.
+        if self._classifier is None or categories != self._categories:
+            self._classifier = CategoryClassifier(categories)
+            self._categories = categories
+        return self._classifier
+
     def organize_files(self):
         source = self.source_path.get()
         dest = self.dest_path.get()
         dry_run = self.dry_run_var.get()
 
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            messagebox.showerror("Error", "The number of workers must be a whole number.")
+            return
+
         if not source:
             messagebox.showerror("Error", "Please select a source directory.")
             return
@@ -91,25 +138,133 @@ class FileOrganizerApp(tk.Tk):
         source_path = Path(source)
         dest_path = Path(dest)
 
+        if self.worker is not None and self.worker.is_alive():
+            return
+
         try:
-            categories = load_categories()
+            classifier = self.get_classifier(load_categories())
             validate_paths(source_path, dest_path)
 
             same_place = source_path.resolve() == dest_path.resolve()
-            
-            stats = organize_files_in_destination(source_path, dest_path, categories, same_place=same_place, dry_run=dry_run)
+        except (FileNotFoundError, NotADirectoryError, ValueError) as e:
+            self.show_error(e)
+            return
+        except Exception as e:
+            self.show_unexpected_error(e)
+            return
 
-            self.status_label.config(text="File organization complete!")
-            report = format_report(stats)
-            messagebox.showinfo("Organization Report", report)
+        self.start_progress()
+        self.worker = threading.Thread(
+            target=self.run_worker,
+            args=(source_path, dest_path, classifier, same_place, dry_run, workers),
+            daemon=True,
+        )
+        self.worker.start()
+        self.after(POLL_INTERVAL_MS, self.poll_events)
 
-        except (FileNotFoundError, NotADirectoryError, ValueError) as e:
-            self.status_label.config(text=f"Error: {e}", fg="red")
-            messagebox.showerror("Error", str(e))
+    def run_worker(self, source_path, dest_path, classifier, same_place, dry_run, workers):
+        # Runs off the Tk thread: only talk to the UI through the event queue.
+        try:
+            stats = organize_files_in_destination(source_path, dest_path, classifier, same_place=same_place, dry_run=dry_run, workers=workers,
+                                                  on_event=self.events.put, cancel=self.cancel_event)
+            self.events.put(("done", stats))
         except Exception as e:
-            self.status_label.config(text=f"An unexpected error occurred: {e}", fg="red")
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+            self.events.put(("error", e))
+
+    def cancel_organize(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.cancel_event.set()
+            self.status_label.config(text="Cancelling after the current files...", fg="orange")
+
+    def start_progress(self):
+        self.cancel_event.clear()
+        self._files_done = 0
+        self._bytes_done = 0
+        self._total_files = None
+        self._started_at = time.monotonic()
+        self.status_label.config(text="Organizing files...", fg="green")
+        self.progress_label.config(text="Scanning...")
+        self.progress_bar.config(mode="indeterminate")
+        self.progress_bar.start()
+        self.organize_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+
+    def poll_events(self, reschedule=True):
+        """Handles a batch of queued worker events; returns True once the run has finished."""
+        for _ in range(MAX_EVENTS_PER_POLL):
+            try:
+                item = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, OrganizerEvent):
+                self.handle_event(item)
+            else:
+                self.update_progress()
+                self.finish(*item)
+                return True
+        self.update_progress()
+        if reschedule:
+            self.after(POLL_INTERVAL_MS, self.poll_events)
+        return False
+
+    def handle_event(self, event):
+        if event.kind in (COPIED, MOVED, LINKED, SKIPPED, MISSING):
+            self._files_done += 1
+            self._bytes_done += event.operation.size
+        elif event.kind == SCAN_COMPLETE:
+            self._total_files = event.total_files
+            self.progress_bar.stop()
+            self.progress_bar.config(mode="determinate", maximum=max(event.total_files, 1))
+
+    def update_progress(self):
+        elapsed = max(time.monotonic() - self._started_at, 1e-6) if self._started_at else 1e-6
+        rate = self._files_done / elapsed
+        text = f"{self._files_done} files, {self._bytes_done / (1024 * 1024):.1f} MB ({rate:.0f} files/s)"
+        if self._total_files is not None:
+            self.progress_bar.config(value=self._files_done)
+            remaining = self._total_files - self._files_done
+            if rate > 0 and remaining > 0:
+                text = f"{self._files_done}/{self._total_files} files ({rate:.0f} files/s, ETA {remaining / rate:.0f} s)"
+            else:
+                text = f"{self._files_done}/{self._total_files} files ({rate:.0f} files/s)"
+        self.progress_label.config(text=text)
+
+    def finish(self, kind, payload):
+        self.progress_bar.stop()
+        self.organize_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
+        if kind == "error":
+            if isinstance(payload, (FileNotFoundError, NotADirectoryError, ValueError)):
+                self.show_error(payload)
+            else:
+                self.show_unexpected_error(payload)
+            return
+
+        stats = payload
+        if self.cancel_event.is_set():
+            self.status_label.config(text="Organization cancelled.", fg="orange")
+        else:
+            self.status_label.config(text="File organization complete!", fg="green")
+        report = format_report(stats)
+        if "plan" in stats:
+            report += "\nPlanned operations:\n" + (stats["plan"].describe(limit=20) or "(nothing to do)")
+        messagebox.showinfo("Organization Report", report)
+
+    def wait_for_worker(self):
+        """Blocks until the current run finishes and handles its remaining events."""
+        if self.worker is not None:
+            self.worker.join()
+        while not self.poll_events(reschedule=False):
+            pass
+
+    def show_error(self, error):
+        self.status_label.config(text=f"Error: {error}", fg="red")
+        messagebox.showerror("Error", str(error))
 
+    def show_unexpected_error(self, error):
+        self.status_label.config(text=f"An unexpected error occurred: {error}", fg="red")
+        messagebox.showerror("Error", f"An unexpected error occurred: {error}")
 
 if __name__ == "__main__":
     app = FileOrganizerApp()
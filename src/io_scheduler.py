@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ORDER_WINDOW = 4096
+# Operations sorted at a time by largest_first(); at about 300 bytes each, under 20 MB.
+SIZE_WINDOW = 65536
+# Transfers smaller than this count as this size when judging latency, so tiny files do not look slow.
+_MIN_COST_BYTES = 64 * 1024
+# Latency this many times above the best observed level counts as congestion.
+_CONGESTION_FACTOR = 2.0
+_EWMA_WEIGHT = 0.2
+
+class RateLimiter:
+    """Token bucket: take(amount) sleeps as long as needed to stay under `rate` units per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else self.rate
+        self._available = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount=1):
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.burst, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going into debt lets a file larger than the burst through, paid for by waiting.
+            self._available -= amount
+            wait = -self._available / self.rate if self._available < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class DeviceGate:
+    """
+    Limits concurrent transfers touching one device, adapting the limit to latency.
+
+    The limit grows by one after `limit` consecutive transfers without
+    congestion and halves when the average cost per byte rises to
+    _CONGESTION_FACTOR times the best level seen (additive increase,
+    multiplicative decrease). It never exceeds `max_limit` nor drops below 1.
+    """
+
+    def __init__(self, max_limit, adaptive=True):
+        self.max_limit = max_limit
+        self.adaptive = adaptive
+        self.limit = min(2, max_limit) if adaptive else max_limit
+        self.active = 0
+        self._condition = threading.Condition()
+        self._average = None
+        self._best = None
+        self._calm = 0
+
+    def acquire(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+
+    def release(self, seconds=None, size=0):
+        with self._condition:
+            self.active -= 1
+            if self.adaptive and seconds is not None:
+                self._observe(seconds / max(size, _MIN_COST_BYTES))
+            self._condition.notify_all()
+
+    def _observe(self, cost):
+        self._average = cost if self._average is None else self._average + _EWMA_WEIGHT * (cost - self._average)
+        # The best level slowly forgets, so one lucky transfer does not pin it forever.
+        self._best = self._average if self._best is None else min(self._average, self._best * 1.01)
+        if self._average > self._best * _CONGESTION_FACTOR:
+            if self.limit > 1:
+                self.limit = max(1, self.limit // 2)
+            self._average = self._best * _CONGESTION_FACTOR / 2
+            self._calm = 0
+            return
+        self._calm += 1
+        if self._calm >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._calm = 0
+
+class IOScheduler:
+    """
+    Sits in front of the copy and move calls of a TransferPool.
+
+    Each transfer holds a slot on the gate of its source device and of its
+    target device (st_dev, looked up once per directory), so a slow disk gets
+    at most `device_limit` transfers at a time however many workers run; with
+    adaptive set, each gate adjusts its limit to the latency it observes.
+    Optional token buckets cap the data rate (max_mbps) and the number of
+    files per second (max_ops) for the whole run; the data rate is charged
+    through charge_bytes() only for bytes really copied, so renames and hard
+    links count against max_ops alone. order() sorts operations by
+    source device and inode within a window, which on spinning disks keeps
+    reads close to the order files were written in.
+    """
+
+    def __init__(self, device_limit=4, max_mbps=None, max_ops=None, adaptive=True, inode_order=False,
+                 order_window=ORDER_WINDOW):
+        self.device_limit = device_limit
+        self.adaptive = adaptive
+        self.inode_order = inode_order
+        self.order_window = order_window
+        self.bandwidth = RateLimiter(max_mbps * 1024 * 1024) if max_mbps else None
+        self.ops = RateLimiter(max_ops) if max_ops else None
+        self.throttled_seconds = 0.0
+        self._gates = {}
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def _device(self, directory):
+        device = self._devices.get(directory)
+        if device is None:
+            try:
+                device = os.stat(directory).st_dev
+            except OSError:
+                device = -1
+            with self._lock:
+                self._devices[directory] = device
+        return device
+
+    def gate(self, device):
+        gate = self._gates.get(device)
+        if gate is None:
+            with self._lock:
+                gate = self._gates.setdefault(device, DeviceGate(self.device_limit, self.adaptive))
+        return gate
+
+    @contextmanager
+    def transfer(self, operation):
+        """Waits for the ops limit and device slots, then runs the body of the with block as one transfer."""
+        if self.ops is not None:
+            self._add_throttled(self.ops.take(1))
+
+        devices = sorted({self._device(os.path.dirname(operation.source)),
+                          self._device(os.path.dirname(operation.target))})
+        # Always acquired in the same order, so two transfers between the same devices cannot deadlock.
+        gates = [self.gate(device) for device in devices]
+        for gate in gates:
+            gate.acquire()
+        started = time.perf_counter()
+        seconds = None
+        try:
+            yield
+            seconds = time.perf_counter() - started
+        finally:
+            for gate in reversed(gates):
+                gate.release(seconds, operation.size)
+
+    def charge_bytes(self, size):
+        """Waits as long as max_mbps requires before `size` bytes are copied."""
+        if self.bandwidth is not None and size:
+            self._add_throttled(self.bandwidth.take(size))
+
+    def _add_throttled(self, seconds):
+        if seconds:
+            with self._lock:
+                self.throttled_seconds += seconds
+
+    def order(self, operations):
+        """Returns the operations, sorted by (source device, inode) within each window when inode_order is set."""
+        if not self.inode_order:
+            return operations
+        return _windowed(operations, _inode_key, self.order_window)
+
+    def limits(self):
+        """Current concurrency limit per device, for reports."""
+        return {device: gate.limit for device, gate in self._gates.items()}
+
+def largest_first(operations, window=SIZE_WINDOW):
+    """
+    Yields the operations largest first, sorted within each window of `window` operations.
+
+    Workers take operations from the pool in this order, so big files start
+    early and the small ones fill the gaps around them, instead of one huge
+    file starting last and running on alone after everything else is done.
+    """
+    return _windowed(operations, _size_key, window)
+
+def _size_key(operation):
+    return -operation.size
+
+def _inode_key(operation):
+    try:
+        info = os.stat(operation.source)
+    except OSError:
+        return (0, 0)
+    return (info.st_dev, info.st_ino)
+
+def _windowed(operations, key, window_size):
+    window = []
+    try:
+        for operation in operations:
+            window.append(operation)
+            if len(window) >= window_size:
+                window.sort(key=key)
+                yield from window
+                window = []
+        if window:
+            window.sort(key=key)
+            yield from window
+    finally:
+        if hasattr(operations, "close"):
+            operations.close()
@@ -0,0 +1,337 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+from scanner import ORGANIZER_FILE_PREFIX
+from plan import OPERATIONS, COPY, MOVE, LINK, PlannedOperation, OperationTable
+from copy_backend import PARTIAL_PREFIX, rename_noreplace
+from events import OrganizerEvent, COPIED, MOVED, LINKED, SKIPPED, MISSING
+
+JOURNAL_NAME = ORGANIZER_FILE_PREFIX + "journal"
+JOURNAL_MAGIC = b"FOJRNL\x01\n"
+JOURNAL_SYNC_EVERY = 1000
+JOURNAL_BATCH_SIZE = 256
+
+# Record kinds. Every record is framed as length + CRC32 + payload, so a record
+# torn by a crash is detected and everything before it is still trusted.
+_PLANNED = ord("P")
+_DONE = ord("D")
+_SKIPPED = ord("K")
+_SCAN_COMPLETE = ord("S")
+_COMPLETE = ord("E")
+
+_FRAME = struct.Struct("<II")
+# kind, sequence number, op code, size, source length, target length, category length
+_PLANNED_RECORD = struct.Struct("<BIBQHHH")
+# kind, sequence number
+_RESULT_RECORD = struct.Struct("<BI")
+
+_DONE_EVENTS = {COPY: COPIED, MOVE: MOVED, LINK: LINKED}
+
+JournalState = namedtuple("JournalState", ["header", "operations", "results", "scan_complete", "complete"])
+
+def journal_path(dest_dir):
+    return os.path.join(dest_dir, JOURNAL_NAME)
+
+def _frame(payload):
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+def _key(operation):
+    return operation.source, operation.target
+
+def _fsync_path(path):
+    # Directories cannot be opened for fsync everywhere (Windows); their entries are then left to the OS.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class Journal:
+    """
+    Write-ahead journal of an organization run, kept in the destination.
+
+    Planned operations are appended in batches and made durable before any of
+    them runs; the results of finished operations are appended as they come in
+    and synced every `sync_every` records. Before each sync the files finished
+    since the last one are fsynced, then the directories their names were
+    added to or removed from, so a result on disk always describes data on
+    disk; nothing else on the machine is flushed. A journal without its
+    completion record belongs to an interrupted run: resume_run() finishes it
+    and undo_run() reverts it.
+    """
+
+    def __init__(self, path, header=None, sync_every=JOURNAL_SYNC_EVERY, batch_size=JOURNAL_BATCH_SIZE, state=None):
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._unsynced_files = []
+        self._unsynced_dirs = set()
+        self._outstanding = {}
+        self._next_seq = 0
+        if state is None:
+            self._file = open(path, "wb")
+            encoded = json.dumps(header).encode("utf-8")
+            self._file.write(JOURNAL_MAGIC + _FRAME.pack(len(encoded), zlib.crc32(encoded)) + encoded)
+            self._sync()
+        else:
+            self._file = open(path, "ab")
+            self._next_seq = len(state.operations)
+            for seq, operation in enumerate(state.operations):
+                if seq not in state.results:
+                    self._outstanding[_key(operation)] = seq
+
+    @classmethod
+    def create(cls, dest_dir, source_dir, same_place=False, sync_every=JOURNAL_SYNC_EVERY):
+        path = journal_path(dest_dir)
+        if os.path.exists(path):
+            state = read_journal(path)
+            if not state.complete:
+                raise ValueError(f"An interrupted run was found in {dest_dir}. Finish it with --resume or revert it with --undo first.")
+        os.makedirs(dest_dir, exist_ok=True)
+        header = {"source_dir": str(source_dir), "dest_dir": str(dest_dir), "same_place": same_place}
+        return cls(path, header, sync_every)
+
+    def _sync(self):
+        for path in self._unsynced_files:
+            _fsync_path(path)
+        for path in self._unsynced_dirs:
+            _fsync_path(path)
+        self._unsynced_files = []
+        self._unsynced_dirs = set()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def log_planned(self, operations):
+        """Appends planned operations and syncs, so they are on disk before they run."""
+        with self._lock:
+            for operation in operations:
+                key = _key(operation)
+                if key in self._outstanding:
+                    # Already journaled by the run being resumed.
+                    continue
+                seq = self._next_seq
+                self._next_seq += 1
+                self._outstanding[key] = seq
+                source = os.fsencode(operation.source)
+                target = os.fsencode(operation.target)
+                category = operation.category.encode("utf-8")
+                self._file.write(_frame(
+                    _PLANNED_RECORD.pack(_PLANNED, seq, OPERATIONS.index(operation.op), operation.size,
+                                         len(source), len(target), len(category)) + source + target + category
+                ))
+            self._sync()
+
+    def record_result(self, event):
+        if event.kind in (COPIED, MOVED, LINKED):
+            kind = _DONE
+        elif event.kind in (SKIPPED, MISSING):
+            kind = _SKIPPED
+        else:
+            return
+        with self._lock:
+            seq = self._outstanding.pop(_key(event.operation), None)
+            if seq is None:
+                return
+            self._file.write(_frame(_RESULT_RECORD.pack(kind, seq)))
+            if kind == _DONE:
+                self._unsynced_files.append(event.operation.target)
+                self._unsynced_dirs.add(os.path.dirname(event.operation.target))
+                if event.kind == MOVED:
+                    self._unsynced_dirs.add(os.path.dirname(event.operation.source))
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+
+    def scan_complete(self):
+        self._append_marker(_SCAN_COMPLETE)
+
+    def complete(self):
+        self._append_marker(_COMPLETE)
+
+    def _append_marker(self, kind):
+        with self._lock:
+            self._file.write(_frame(bytes([kind])))
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+def read_journal(path):
+    """Reads a journal up to its last intact record."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No journal found at: {path}")
+    if not data.startswith(JOURNAL_MAGIC):
+        raise ValueError(f"Not a file organizer journal: {path}")
+
+    records = []
+    offset = len(JOURNAL_MAGIC)
+    while offset + _FRAME.size <= len(data):
+        length, checksum = _FRAME.unpack_from(data, offset)
+        payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            # A torn write at the end of the file; nothing after it was committed.
+            break
+        records.append(payload)
+        offset += _FRAME.size + length
+    if not records:
+        raise ValueError(f"The journal is corrupted: {path}")
+
+    header = json.loads(records[0].decode("utf-8"))
+    operations = OperationTable()
+    results = {}
+    scan_complete = False
+    complete = False
+    for payload in records[1:]:
+        kind = payload[0]
+        if kind == _PLANNED:
+            _, seq, op_code, size, source_length, target_length, category_length = _PLANNED_RECORD.unpack_from(payload)
+            offset = _PLANNED_RECORD.size
+            source = os.fsdecode(payload[offset:offset + source_length])
+            offset += source_length
+            target = os.fsdecode(payload[offset:offset + target_length])
+            offset += target_length
+            category = payload[offset:offset + category_length].decode("utf-8")
+            operations.append(PlannedOperation(source, target, OPERATIONS[op_code], size, category))
+        elif kind in (_DONE, _SKIPPED):
+            _, seq = _RESULT_RECORD.unpack_from(payload)
+            results[seq] = kind
+        elif kind == _SCAN_COMPLETE:
+            scan_complete = True
+        elif kind == _COMPLETE:
+            complete = True
+    return JournalState(header, operations, results, scan_complete, complete)
+
+def _remove_partial_files(folders):
+    removed = 0
+    for folder in folders:
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            continue
+        for name in names:
+            if name.startswith(PARTIAL_PREFIX):
+                try:
+                    os.unlink(os.path.join(folder, name))
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+def _looks_done(operation):
+    """True when an operation without a journaled result evidently ran before the interruption."""
+    if operation.op == MOVE:
+        return not os.path.lexists(operation.source) and os.path.lexists(operation.target)
+    # Copies are published under their final name only once complete.
+    try:
+        return os.path.getsize(operation.target) == operation.size
+    except OSError:
+        return False
+
+def resume_run(dest_dir, workers=1, hardlink=False, sync_every=JOURNAL_SYNC_EVERY, on_event=None):
+    """
+    Finishes the interrupted run journaled in dest_dir without scanning the source again.
+
+    Leftover partial copies are deleted, then every journaled operation without
+    a result is executed, unless the file system shows it finished after its
+    result was last synced. Returns the stats of the resumed part;
+    stats["scan_incomplete"] is set when the original run stopped before it
+    had listed every file.
+    """
+    from folder_utils import new_stats, execute_operations
+
+    path = journal_path(dest_dir)
+    state = read_journal(path)
+    if state.complete:
+        raise ValueError(f"The last run in {dest_dir} already finished; there is nothing to resume.")
+
+    stats = new_stats()
+    stats["partial_files_removed"] = _remove_partial_files({os.path.dirname(operation.target) for operation in state.operations})
+    journal = Journal(path, sync_every=sync_every, state=state)
+    try:
+        pending = []
+        finished = []
+        for seq, operation in enumerate(state.operations):
+            if seq in state.results:
+                continue
+            if _looks_done(operation):
+                finished.append(operation)
+                continue
+            pending.append(operation)
+            stats["total_files"] += 1
+            stats["total_size"] += operation.size
+            stats["files_per_category"][operation.category] = stats["files_per_category"].get(operation.category, 0) + 1
+        for operation in finished:
+            journal.record_result(OrganizerEvent(_DONE_EVENTS[operation.op], operation))
+        stats["already_done"] = len(state.results) + len(finished)
+        execute_operations(pending, workers=workers, stats=stats, hardlink=hardlink, on_event=on_event, journal=journal)
+    finally:
+        journal.close()
+    if not state.scan_complete:
+        stats["scan_incomplete"] = True
+    return stats
+
+def undo_run(dest_dir):
+    """
+    Reverts the journaled run in dest_dir, newest operation first, and removes the journal.
+
+    Moves are renamed back, copies and links are deleted. Operations without a
+    recorded result are only reverted when that is unambiguous (a move whose
+    source is gone and whose target exists); other ones are counted as uncertain
+    and left alone. Category folders that end up empty are removed.
+    """
+    path = journal_path(dest_dir)
+    state = read_journal(path)
+    _remove_partial_files({os.path.dirname(operation.target) for operation in state.operations})
+
+    result = {"undone": 0, "uncertain": 0, "failed": 0}
+    folders = set()
+    for seq in range(len(state.operations) - 1, -1, -1):
+        operation = state.operations[seq]
+        outcome = state.results.get(seq)
+        if outcome == _SKIPPED:
+            continue
+        if outcome is None:
+            if not (operation.op == MOVE and _looks_done(operation)):
+                if os.path.lexists(operation.target):
+                    result["uncertain"] += 1
+                continue
+        try:
+            if operation.op == MOVE:
+                os.makedirs(os.path.dirname(operation.source), exist_ok=True)
+                # A file that took the original name since is left alone.
+                rename_noreplace(operation.target, operation.source)
+            else:
+                os.unlink(operation.target)
+        except OSError:
+            result["failed"] += 1
+            continue
+        result["undone"] += 1
+        folders.add(os.path.dirname(operation.target))
+
+    # Deepest folders first, so nested rule folders ("Archive/2020") are removed before their parents.
+    for folder in sorted(folders, key=len, reverse=True):
+        while os.path.normpath(folder) != os.path.normpath(dest_dir):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+    os.unlink(path)
+    return result
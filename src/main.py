@@ -1,47 +1,322 @@
 import sys
 from pathlib import Path
 from os_config import validate_paths
-from folder_utils import organize_files_in_destination, format_report, load_categories
-from gui import FileOrganizerApp
+from folder_utils import organize_files_in_destination, execute_plan, format_report
+from plan import OrganizationPlan
+from config_cache import load_classifier
+from output import Output, get_output, set_output, QUIET, NORMAL, VERBOSE
+
+def pop_option_value(arguments, option, convert=str):
+    if option not in arguments:
+        return None
+    index = arguments.index(option)
+    if index + 1 >= len(arguments):
+        raise ValueError(f"Option {option} requires a value.")
+    raw_value = arguments.pop(index + 1)
+    arguments.pop(index)
+    try:
+        return convert(raw_value)
+    except ValueError:
+        raise ValueError(f"Invalid value for {option}: {raw_value}")
+
+def parse_workers(raw_value):
+    workers = int(raw_value)
+    if workers < 1:
+        raise ValueError(raw_value)
+    return workers
+
+def parse_depth(raw_value):
+    depth = int(raw_value)
+    if depth < 0:
+        raise ValueError(raw_value)
+    return depth
+
+def parse_rate(raw_value):
+    rate = float(raw_value)
+    if rate <= 0:
+        raise ValueError(raw_value)
+    return rate
 
 def main_cli(args):
     dry_run = "--dry-run" in args
+    recursive = "--recursive" in args
+    follow_symlinks = "--follow-symlinks" in args
+    rebuild_index = "--rebuild-index" in args
+    verify_index = "--verify-index" in args
+    incremental = "--incremental" in args or rebuild_index or verify_index
+    hardlink = "--hardlink" in args
+    watch = "--watch" in args
+    poll = "--poll" in args
+    journal = "--journal" in args
+    inode_order = "--inode-order" in args
+    largest_first = "--largest-first" in args
+    serve = "--serve" in args
+    level = QUIET if "--quiet" in args else VERBOSE if "--verbose" in args else NORMAL
+    flags = ("--dry-run", "-ui", "--recursive", "--follow-symlinks", "--incremental", "--rebuild-index", "--verify-index",
+             "--hardlink", "--watch", "--poll", "--journal", "--quiet", "--verbose",
+             "--inode-order", "--largest-first", "--serve")
     arguments = []
     for arg in args[1:]:
-        if arg not in ("--dry-run", "-ui"):
+        if arg not in flags:
             arguments.append(arg)
 
+    try:
+        workers = pop_option_value(arguments, "--workers", parse_workers) or 1
+        walkers = pop_option_value(arguments, "--walkers", parse_workers) or 4
+        max_depth = pop_option_value(arguments, "--max-depth", parse_depth)
+        save_plan = pop_option_value(arguments, "--save-plan")
+        apply_plan = pop_option_value(arguments, "--apply-plan")
+        dedup = pop_option_value(arguments, "--dedup")
+        sniff = pop_option_value(arguments, "--sniff")
+        archives = pop_option_value(arguments, "--archives")
+        profile_path = pop_option_value(arguments, "--profile")
+        journal_sync = pop_option_value(arguments, "--journal-sync", parse_workers)
+        resume = pop_option_value(arguments, "--resume")
+        undo = pop_option_value(arguments, "--undo")
+        processes = pop_option_value(arguments, "--processes", parse_workers) or 1
+        log_json = pop_option_value(arguments, "--log-json")
+        device_limit = pop_option_value(arguments, "--device-limit", parse_workers)
+        max_mbps = pop_option_value(arguments, "--max-mbps", parse_rate)
+        max_ops = pop_option_value(arguments, "--max-ops", parse_rate)
+        port = pop_option_value(arguments, "--port", parse_depth)
+        concurrency = pop_option_value(arguments, "--concurrency", parse_workers) or 1
+    except ValueError as e:
+        get_output().error(f"\n{e}")
+        sys.exit(1)
+    configure_output(level, log_json)
+
+    scheduler = None
+    if inode_order or any(option is not None for option in (device_limit, max_mbps, max_ops)):
+        from io_scheduler import IOScheduler
+        scheduler = IOScheduler(device_limit=device_limit or max(workers, 4), max_mbps=max_mbps, max_ops=max_ops,
+                                inode_order=inode_order)
+
+    observer = None
+    if profile_path is not None:
+        from profiling import RunProfiler
+        observer = RunProfiler()
+
+    if serve and not arguments:
+        run_server(port, concurrency)
+        return
+    if apply_plan is not None and not arguments:
+        run_saved_plan(apply_plan, workers, hardlink, observer, profile_path, largest_first)
+        return
+    if resume is not None and not arguments:
+        run_resume(Path(resume), workers, hardlink, journal_sync)
+        return
+    if undo is not None and not arguments:
+        run_undo(Path(undo))
+        return
+
     if len(arguments) == 2:
         source_path = Path(arguments[0])
         destination_path = Path(arguments[1])
     elif len(arguments) == 1 and arguments[0] == ".":
-        print("Organizing files in the current directory.")
+        get_output().info("Organizing files in the current directory.")
         source_path = Path(".")
         destination_path = Path(".")
     else:
         script_name = args[0]
-        print(f"\nUsage: python {script_name} <source_path> <destination_path> [--dry-run]")
-        print(f"   or: python {script_name} . [--dry-run]")
+        print(f"\nUsage: python {script_name} <source_path> <destination_path> [--dry-run] [--workers N] [--recursive]")
+        print(f"   or: python {script_name} . [--dry-run] [--workers N] [--recursive]")
+        print(f"   or: python {script_name} --apply-plan <plan_file> [--workers N]")
+        print(f"   or: python {script_name} --resume <destination_path> [--workers N]")
+        print(f"   or: python {script_name} --undo <destination_path>")
+        print(f"   or: python {script_name} --serve [--port N] [--concurrency N]")
         print(f"   or: python {script_name} -ui [--dry-run]")
+        print("Recursive options: [--max-depth N] [--follow-symlinks] [--walkers N]")
+        print("Plan options: [--save-plan <plan_file>]")
+        print("Index options: [--incremental] [--rebuild-index] [--verify-index]")
+        print("Duplicate options: [--dedup report|skip|hardlink]")
+        print("Content detection: [--sniff unknown|verify]")
+        print("Archives: [--archives manifest|extract] (list or unpack the files inside zip and tar archives)")
+        print("Copy options: [--hardlink] (link instead of copying when on the same filesystem)")
+        print("Ordering: [--largest-first] (start the biggest files first)")
+        print("Profiling: [--profile <file.json|file.trace.json>]")
+        print("Watch mode: [--watch] [--poll] (keep organizing new files as they arrive)")
+        print("Processes: [--processes N] (split the work across N worker processes)")
+        print("I/O limits: [--device-limit N] [--max-mbps N] [--max-ops N] [--inode-order]")
+        print("Output: [--quiet] [--verbose] [--log-json <file.jsonl>]")
+        print("Journal: [--journal] [--journal-sync N] (record the run so it can be resumed or undone)")
         sys.exit(1)
 
+    index = None
     try:
-        categories = load_categories()
+        classifier = load_classifier()
         validate_paths(source_path, destination_path)
 
+        if watch:
+            # Each batch of the watcher is a plain transfer; these options would be silently ignored.
+            ignored = {"--dry-run": dry_run, "--recursive": recursive, "--incremental": incremental,
+                       "--journal": journal, "--hardlink": hardlink, "--largest-first": largest_first,
+                       "--save-plan": save_plan is not None, "--dedup": dedup is not None,
+                       "--sniff": sniff is not None, "--archives": archives is not None,
+                       "--profile": observer is not None, "--processes": processes > 1,
+                       "I/O limit options": scheduler is not None}
+            given = [option for option, used in ignored.items() if used]
+            if given:
+                raise ValueError(f"--watch cannot be combined with {', '.join(given)}.")
+
+        if incremental:
+            index = open_scan_index(destination_path, rebuild_index, verify_index)
+
         same_place = source_path.resolve() == destination_path.resolve()
         if same_place:
-            print("\nSource and destination are the same. Organizing files in-place (moving).")
+            get_output().info("\nSource and destination are the same. Organizing files in-place (moving).")
         else:
-            print("\nSource and destination are different. Organizing files by copying.")
+            get_output().info("\nSource and destination are different. Organizing files by copying.")
 
-        stats = organize_files_in_destination(source_path, destination_path, categories, same_place=same_place, dry_run=dry_run)
-        
-        print(format_report(stats))
-        print("\n--- Success! ---")
+        if watch:
+            run_watch(source_path, destination_path, classifier, same_place, workers, poll)
+            return
+
+        if processes > 1 and not dry_run:
+            if incremental or journal or observer is not None or scheduler is not None or \
+                    any(option is not None for option in (save_plan, dedup, sniff, archives)):
+                raise ValueError("--processes cannot be combined with --incremental, --save-plan, --dedup, --sniff, --archives, "
+                                 "--journal, --profile or the I/O limit options.")
+            stats = run_sharded(source_path, destination_path, classifier, processes, same_place, workers,
+                                recursive, max_depth, follow_symlinks, walkers, hardlink, largest_first)
+            get_output().report(stats, format_report(stats))
+            get_output().info("\n--- Success! ---")
+            return
+
+        stats = organize_files_in_destination(source_path, destination_path, classifier, same_place=same_place, dry_run=dry_run, workers=workers,
+                                             recursive=recursive, max_depth=max_depth,
+                                             follow_symlinks=follow_symlinks, walkers=walkers,
+                                             plan_path=save_plan, index=index, dedup=dedup,
+                                             hardlink=hardlink, observer=observer, sniff=sniff,
+                                             journal=journal, journal_sync=journal_sync, scheduler=scheduler,
+                                             largest_first=largest_first, archives=archives)
+
+        if save_plan is not None:
+            get_output().info(f"\nPlan saved to {save_plan}. Run it later with: --apply-plan {save_plan}")
+        if observer is not None:
+            observer.write(profile_path)
+            get_output().info(f"\nProfile written to {profile_path}")
+        get_output().report(stats, format_report(stats))
+        get_output().info("\n--- Success! ---")
         
     except (FileNotFoundError, NotADirectoryError, ValueError) as e:
-        print(f"\n{e}")
+        get_output().error(f"\n{e}")
+        sys.exit(1)
+    finally:
+        if index is not None:
+            index.close()
+
+def configure_output(level, log_json=None):
+    stream = None
+    json_stream = None
+    if log_json == "-":
+        # JSON lines on stdout for a log shipper reading a pipe; messages move to stderr.
+        stream = sys.stderr
+        json_stream = sys.stdout
+    elif log_json is not None:
+        json_stream = open(log_json, "a", encoding="utf-8")
+    set_output(Output(level=level, stream=stream, json_stream=json_stream))
+
+def run_watch(source_path, destination_path, classifier, same_place, workers, poll=False):
+    from watcher import watch_directory
+    from folder_utils import new_stats
+
+    get_output().info(f"\nWatching {source_path} for new files. Press Ctrl+C to stop.")
+    stats = new_stats()
+    try:
+        watch_directory(source_path, destination_path, classifier, same_place=same_place, workers=workers,
+                        use_inotify=False if poll else None, stats=stats)
+    except KeyboardInterrupt:
+        get_output().info("\nStopped watching.")
+    get_output().report(stats, format_report(stats))
+
+def run_sharded(source_path, destination_path, classifier, processes, same_place, workers, recursive,
+                max_depth, follow_symlinks, walkers, hardlink, largest_first=False):
+    from sharding import organize_sharded
+
+    get_output().info(f"\n--- Organizing Files ({processes} processes) ---")
+    return organize_sharded(source_path, destination_path, classifier, processes, same_place=same_place,
+                            workers=workers, recursive=recursive, max_depth=max_depth,
+                            follow_symlinks=follow_symlinks, walkers=walkers, hardlink=hardlink,
+                            largest_first=largest_first)
+
+def run_server(port=None, concurrency=1):
+    from server import OrganizerServer, DEFAULT_PORT, DEFAULT_TOKEN_PATH
+
+    try:
+        server = OrganizerServer(port=DEFAULT_PORT if port is None else port, concurrency=concurrency,
+                                 token_path=DEFAULT_TOKEN_PATH)
+    except OSError as e:
+        get_output().error(f"\nCould not start the server: {e}")
+        sys.exit(1)
+    host, port = server.address
+    get_output().info(f"Listening on http://{host}:{port} ({concurrency} job(s) at a time). Stop with Ctrl+C.")
+    get_output().info(f"Send the token in {DEFAULT_TOKEN_PATH} as 'Authorization: Bearer <token>'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        get_output().info("\nServer stopped.")
+    finally:
+        server.close()
+
+def run_resume(destination_path, workers, hardlink=False, journal_sync=None):
+    from journal import resume_run, JOURNAL_SYNC_EVERY
+
+    try:
+        get_output().info(f"\nResuming the interrupted run in {destination_path}.")
+        stats = resume_run(destination_path, workers=workers, hardlink=hardlink,
+                           sync_every=journal_sync or JOURNAL_SYNC_EVERY)
+        get_output().info(f"Files already organized before the interruption: {stats['already_done']}")
+        if stats["partial_files_removed"]:
+            get_output().info(f"Partially copied files removed: {stats['partial_files_removed']}")
+        get_output().report(stats, format_report(stats))
+        if stats.get("scan_incomplete"):
+            get_output().info("The interrupted run had not finished listing the source; run the organizer again to pick up the rest.")
+        get_output().info("\n--- Success! ---")
+    except (FileNotFoundError, ValueError) as e:
+        get_output().error(f"\n{e}")
+        sys.exit(1)
+
+def run_undo(destination_path):
+    from journal import undo_run
+
+    try:
+        result = undo_run(destination_path)
+    except (FileNotFoundError, ValueError) as e:
+        get_output().error(f"\n{e}")
+        sys.exit(1)
+    get_output().info(f"\nUndid {result['undone']} operations in {destination_path}.")
+    if result["uncertain"]:
+        get_output().info(f"{result['uncertain']} files were left in place because the journal does not show they were finished.")
+    if result["failed"]:
+        get_output().info(f"{result['failed']} operations could not be undone.")
+
+def open_scan_index(destination_path, rebuild, verify):
+    from scan_index import ScanIndex, INDEX_FILE_NAME
+
+    if rebuild:
+        index_file = destination_path / INDEX_FILE_NAME
+        if index_file.exists():
+            index_file.unlink()
+        get_output().info("Scan index cleared; all files will be examined again.")
+
+    index = ScanIndex(destination_path)
+    if verify:
+        checked, removed = index.verify()
+        get_output().info(f"Scan index verified: {checked} entries checked, {removed} stale entries removed.")
+    return index
+
+def run_saved_plan(plan_path, workers, hardlink=False, observer=None, profile_path=None, largest_first=False):
+    try:
+        plan = OrganizationPlan.load(plan_path)
+        get_output().info(f"\nApplying plan {plan_path}: {len(plan)} operations from {plan.source_dir} to {plan.dest_dir}.")
+        stats = execute_plan(plan, workers=workers, hardlink=hardlink, observer=observer, largest_first=largest_first)
+        if observer is not None:
+            observer.write(profile_path)
+            get_output().info(f"\nProfile written to {profile_path}")
+        get_output().report(stats, format_report(stats))
+        get_output().info("\n--- Success! ---")
+    except (FileNotFoundError, ValueError) as e:
+        get_output().error(f"\n{e}")
         sys.exit(1)
 
 def main():
@@ -49,6 +324,8 @@ def main():
     dry_run = "--dry-run" in sys.argv
 
     if use_ui:
+        # tkinter is only imported for the GUI, so CLI runs start faster and work without Tk.
+        from gui import FileOrganizerApp
         app = FileOrganizerApp(dry_run_cli_state=dry_run)
         app.mainloop()
     else:
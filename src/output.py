@@ -0,0 +1,199 @@
+import atexit
+import json
+import sys
+import threading
+import time
+from events import describe_event, COPIED, MOVED, LINKED, SKIPPED, MISSING, PROGRESS, SCAN_COMPLETE, CANCELLED
+
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+LEVELS = {"quiet": QUIET, "normal": NORMAL, "verbose": VERBOSE}
+
+PROGRESS_INTERVAL = 1.0
+# Characters collected before buffered lines are written out.
+BUFFER_SIZE = 64 * 1024
+
+_FILE_EVENTS = (COPIED, MOVED, LINKED, SKIPPED, MISSING)
+
+class Output:
+    """
+    Level-aware, buffered destination for everything the organizer reports.
+
+    Messages are shown at NORMAL level and above (quiet shows errors only).
+    Used as an event sink, it counts per-file events and, at NORMAL level,
+    prints a progress line at most every `progress_interval` seconds; only at
+    VERBOSE level is a line formatted for every file, and those lines are
+    written in batches. PROGRESS events of large copies count towards the
+    bytes in the progress line, so it keeps moving during a long copy. With a
+    JSON-lines stream every event is also written there as one JSON object per
+    line. In quiet mode without JSON the per-file path is a counter update,
+    with no string formatting at all.
+    """
+
+    def __init__(self, level=NORMAL, stream=None, json_stream=None, progress_interval=PROGRESS_INTERVAL,
+                 buffer_size=BUFFER_SIZE):
+        self.level = level
+        self.stream = stream
+        self.json_stream = json_stream
+        self.progress_interval = progress_interval
+        self.buffer_size = buffer_size
+        self.counts = dict.fromkeys(_FILE_EVENTS, 0)
+        self.size_done = 0
+        self.total_files = None
+        # Bytes copied so far of large files still in flight, by target.
+        self._partial = {}
+        self._lines = []
+        self._buffered = 0
+        self._records = []
+        self._next_progress = time.monotonic() + progress_interval if progress_interval else None
+        self._lock = threading.RLock()
+
+    def disable_progress(self):
+        self._next_progress = None
+
+    def _stream(self):
+        # Looked up when writing, so redirected or captured stdout is honoured.
+        return self.stream if self.stream is not None else sys.stdout
+
+    def _write_now(self, message, level):
+        with self._lock:
+            self._flush_lines()
+            self._stream().write(message + "\n")
+            self._stream().flush()
+            if self.json_stream is not None:
+                self._record({"event": "message", "level": level, "message": message.strip()})
+
+    def info(self, message):
+        if self.level >= NORMAL:
+            self._write_now(message, "info")
+
+    def warning(self, message):
+        if self.level >= NORMAL:
+            self._write_now(message, "warning")
+
+    def error(self, message):
+        self._write_now(message, "error")
+
+    def detail(self, message):
+        """A message only shown at VERBOSE level; buffered like per-file lines."""
+        if self.level >= VERBOSE:
+            with self._lock:
+                self._buffer(message)
+
+    def report(self, stats, text):
+        """The end-of-run report: `text` is shown at NORMAL level, stats go to the JSON stream."""
+        if self.level >= NORMAL:
+            self._write_now(text, "info")
+        if self.json_stream is not None:
+            with self._lock:
+                self._record({"event": "report", "stats": {key: value for key, value in stats.items() if key != "plan"}})
+                self.flush()
+
+    def __call__(self, event):
+        kind = event.kind
+        with self._lock:
+            if kind in self.counts:
+                self.counts[kind] += 1
+                if self._partial:
+                    self._partial.pop(event.operation.target, None)
+                if kind not in (SKIPPED, MISSING):
+                    self.size_done += event.operation.size
+                # A vanished source is worth a line even when per-file messages are off.
+                if self.level >= VERBOSE or (kind == MISSING and self.level >= NORMAL):
+                    self._buffer(describe_event(event))
+                if self.json_stream is not None:
+                    operation = event.operation
+                    self._record({"event": kind, "op": operation.op, "source": operation.source,
+                                  "target": operation.target, "size": operation.size, "category": operation.category})
+                self._maybe_progress()
+                return
+            if kind == PROGRESS:
+                self._partial[event.operation.target] = event.bytes_done
+                if self.json_stream is not None:
+                    self._record({"event": kind, "source": event.operation.source, "target": event.operation.target,
+                                  "size": event.operation.size, "bytes_done": event.bytes_done})
+                self._maybe_progress()
+                return
+            if kind == SCAN_COMPLETE:
+                self.total_files = event.total_files
+                if self.json_stream is not None:
+                    self._record({"event": kind, "total_files": event.total_files, "total_size": event.total_size})
+            elif kind == CANCELLED:
+                if self.json_stream is not None:
+                    self._record({"event": kind})
+                if self.level >= NORMAL:
+                    self._buffer(describe_event(event))
+                self.flush()
+
+    def _maybe_progress(self):
+        if self._next_progress is not None and self.level == NORMAL:
+            now = time.monotonic()
+            if now >= self._next_progress:
+                self._next_progress = now + self.progress_interval
+                self._buffer(self.progress_line())
+                self.flush()
+
+    def progress(self):
+        """Files handled so far per event kind, the total once known and the bytes done, as one consistent dict."""
+        with self._lock:
+            return {"files": sum(self.counts.values()), "total_files": self.total_files,
+                    "bytes": self.size_done + sum(self._partial.values()), "counts": dict(self.counts)}
+
+    def progress_line(self):
+        done = sum(self.counts.values())
+        megabytes = (self.size_done + sum(self._partial.values())) / (1024 * 1024)
+        if self.total_files and done <= self.total_files:
+            return f"Progress: {done} of {self.total_files} files ({done * 100 // self.total_files}%), {megabytes:.1f} MB"
+        return f"Progress: {done} files, {megabytes:.1f} MB"
+
+    def _buffer(self, line):
+        self._lines.append(line)
+        self._buffered += len(line) + 1
+        if self._buffered >= self.buffer_size:
+            self._flush_lines()
+
+    def _record(self, record):
+        record["time"] = round(time.time(), 3)
+        self._records.append(json.dumps(record, default=str))
+        if len(self._records) >= 256:
+            self._flush_records()
+
+    def _flush_lines(self):
+        if self._lines:
+            self._stream().write("\n".join(self._lines) + "\n")
+            self._lines = []
+            self._buffered = 0
+
+    def _flush_records(self):
+        if self._records:
+            self.json_stream.write("\n".join(self._records) + "\n")
+            self._records = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_lines()
+            self._stream().flush()
+            if self.json_stream is not None:
+                self._flush_records()
+                self.json_stream.flush()
+
+_current = Output()
+
+def get_output():
+    """The Output used by the organizer when no other event sink or output is given."""
+    return _current
+
+def set_output(output):
+    """Makes `output` the default for the rest of the process and returns the previous one."""
+    global _current
+    previous = _current
+    _current = output
+    return previous
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        _current.flush()
+    except (OSError, ValueError):
+        pass
@@ -0,0 +1,232 @@
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+COPY = "copy"
+MOVE = "move"
+# Hard link to an identical file that is already (or will be) in the destination; source is that file.
+LINK = "link"
+
+OPERATIONS = (COPY, MOVE, LINK)
+
+PLAN_MAGIC = b"FOPLAN\x01\n"
+
+# op code, size, source dir id, target dir id, category id, source name length, target name length
+_RECORD = struct.Struct("<BQIIHHH")
+_HEADER_LENGTH = struct.Struct("<I")
+
+PlannedOperation = namedtuple("PlannedOperation", ["source", "target", "op", "size", "category"])
+
+class OperationTable:
+    """
+    Compact, append-only list of PlannedOperations stored column by column.
+
+    Directories and categories are kept once in shared tables and referenced
+    by number; file names are packed into one bytes buffer, and a target name
+    equal to the source name (the usual case) is not stored again. Each
+    operation costs about 35 bytes plus the length of its name, instead of a
+    tuple and two full path strings. Items are rebuilt as PlannedOperation
+    tuples when read.
+    """
+
+    def __init__(self):
+        self.directories = []
+        self.categories = []
+        self._directory_ids = {}
+        self._category_ids = {}
+        self._ops = array("B")
+        self._sizes = array("Q")
+        self._source_dirs = array("I")
+        self._target_dirs = array("I")
+        self._category_numbers = array("H")
+        # End offsets in _names of each source name and each target name.
+        self._source_ends = array("Q")
+        self._target_ends = array("Q")
+        self._names = bytearray()
+
+    def _directory_id(self, directory):
+        number = self._directory_ids.get(directory)
+        if number is None:
+            number = self._directory_ids[directory] = len(self.directories)
+            self.directories.append(directory)
+        return number
+
+    def _category_id(self, category):
+        number = self._category_ids.get(category)
+        if number is None:
+            number = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return number
+
+    def append(self, operation):
+        source_dir, source_name = os.path.split(operation.source)
+        target_dir, target_name = os.path.split(operation.target)
+        self.append_record(OPERATIONS.index(operation.op), operation.size, self._directory_id(source_dir),
+                           self._directory_id(target_dir), self._category_id(operation.category),
+                           os.fsencode(source_name), os.fsencode(target_name))
+
+    def append_record(self, op_code, size, source_dir_id, target_dir_id, category_id, source_name, target_name):
+        """Appends an operation given as table numbers and encoded names (see records())."""
+        self._ops.append(op_code)
+        self._sizes.append(size)
+        self._source_dirs.append(source_dir_id)
+        self._target_dirs.append(target_dir_id)
+        self._category_numbers.append(category_id)
+        self._names += source_name
+        self._source_ends.append(len(self._names))
+        if target_name != source_name:
+            self._names += target_name
+        self._target_ends.append(len(self._names))
+
+    def records(self):
+        """Yields each operation as (op code, size, source dir id, target dir id, category id, source name, target name)."""
+        names = self._names
+        start = 0
+        for index in range(len(self._ops)):
+            source_end = self._source_ends[index]
+            target_end = self._target_ends[index]
+            source_name = bytes(names[start:source_end])
+            target_name = bytes(names[source_end:target_end]) if target_end != source_end else source_name
+            start = target_end
+            yield (self._ops[index], self._sizes[index], self._source_dirs[index], self._target_dirs[index],
+                   self._category_numbers[index], source_name, target_name)
+
+    def _operation(self, record):
+        op_code, size, source_dir_id, target_dir_id, category_id, source_name, target_name = record
+        return PlannedOperation(
+            os.path.join(self.directories[source_dir_id], os.fsdecode(source_name)),
+            os.path.join(self.directories[target_dir_id], os.fsdecode(target_name)),
+            OPERATIONS[op_code],
+            size,
+            self.categories[category_id],
+        )
+
+    def __iter__(self):
+        return map(self._operation, self.records())
+
+    def __len__(self):
+        return len(self._ops)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._ops)
+        if not 0 <= index < len(self._ops):
+            raise IndexError("operation index out of range")
+        start = self._target_ends[index - 1] if index else 0
+        source_end = self._source_ends[index]
+        target_end = self._target_ends[index]
+        source_name = bytes(self._names[start:source_end])
+        target_name = bytes(self._names[source_end:target_end]) if target_end != source_end else source_name
+        return self._operation((self._ops[index], self._sizes[index], self._source_dirs[index],
+                                self._target_dirs[index], self._category_numbers[index], source_name, target_name))
+
+    def nbytes(self):
+        """Memory allocated by the table, including its directory and category tables."""
+        columns = (self._ops, self._sizes, self._source_dirs, self._target_dirs, self._category_numbers,
+                   self._source_ends, self._target_ends, self._names)
+        tables = (self.directories, self.categories, self._directory_ids, self._category_ids)
+        strings = self.directories + self.categories
+        return (sum(sys.getsizeof(column) for column in columns) + sum(sys.getsizeof(table) for table in tables)
+                + sum(sys.getsizeof(string) for string in strings))
+
+class OrganizationPlan:
+    """
+    The list of file operations an organization run will perform.
+
+    A plan is produced by the planning phase (see folder_utils.plan_operations)
+    and consumed by folder_utils.execute_plan. It can be saved to a compact
+    binary file and loaded again later, so a reviewed dry run can be executed
+    without rescanning the source directory.
+    """
+
+    def __init__(self, source_dir, dest_dir, same_place=False, stats=None):
+        self.source_dir = str(source_dir)
+        self.dest_dir = str(dest_dir)
+        self.same_place = same_place
+        self.stats = stats if stats is not None else {"total_files": 0, "total_size": 0, "files_per_category": {}}
+        self.operations = OperationTable()
+
+    def append(self, operation):
+        self.operations.append(operation)
+
+    def __iter__(self):
+        return iter(self.operations)
+
+    def __len__(self):
+        return len(self.operations)
+
+    def describe(self, limit=None):
+        lines = []
+        for index, operation in enumerate(self.operations):
+            if limit is not None and index >= limit:
+                lines.append(f"... and {len(self.operations) - limit} more")
+                break
+            target_dir, name = os.path.split(operation.target)
+            lines.append(f"DRY-RUN: Would {operation.op} '{name}' to '{target_dir}'")
+        return "\n".join(lines)
+
+    def save(self, plan_path):
+        # The file uses the same directory and category tables as OperationTable.
+        header = json.dumps({
+            "source_dir": self.source_dir,
+            "dest_dir": self.dest_dir,
+            "same_place": self.same_place,
+            "stats": self.stats,
+            "directories": self.operations.directories,
+            "categories": self.operations.categories,
+            "count": len(self.operations),
+        }).encode("utf-8")
+
+        with open(plan_path, "wb") as f:
+            f.write(PLAN_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for op_code, size, source_dir_id, target_dir_id, category_id, source_name, target_name in self.operations.records():
+                f.write(_RECORD.pack(op_code, size, source_dir_id, target_dir_id, category_id, len(source_name), len(target_name)))
+                f.write(source_name)
+                f.write(target_name)
+
+    @classmethod
+    def load(cls, plan_path):
+        try:
+            with open(plan_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Plan file not found at: {plan_path}")
+
+        if not data.startswith(PLAN_MAGIC):
+            raise ValueError(f"Not a file organizer plan: {plan_path}")
+
+        try:
+            offset = len(PLAN_MAGIC)
+            (header_length,) = _HEADER_LENGTH.unpack_from(data, offset)
+            offset += _HEADER_LENGTH.size
+            header = json.loads(data[offset:offset + header_length].decode("utf-8"))
+            offset += header_length
+
+            plan = cls(header["source_dir"], header["dest_dir"], header["same_place"], header["stats"])
+            table = plan.operations
+            for directory in header["directories"]:
+                table._directory_id(directory)
+            for category in header["categories"]:
+                table._category_id(category)
+            for _ in range(header["count"]):
+                op_code, size, source_dir_id, target_dir_id, category_id, source_length, target_length = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                source_name = data[offset:offset + source_length]
+                offset += source_length
+                target_name = data[offset:offset + target_length]
+                offset += target_length
+                if op_code >= len(OPERATIONS) or source_dir_id >= len(table.directories) or \
+                        target_dir_id >= len(table.directories) or category_id >= len(table.categories):
+                    raise IndexError(op_code)
+                table.append_record(op_code, size, source_dir_id, target_dir_id, category_id, source_name, target_name)
+            if offset != len(data):
+                raise ValueError("trailing or missing data")
+        except (struct.error, ValueError, KeyError, IndexError, TypeError):
+            raise ValueError(f"The plan file is corrupted: {plan_path}")
+
+        return plan
@@ -0,0 +1,163 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+class RunProfiler:
+    """
+    Observer that collects timing data while organize_files_in_destination runs.
+
+    It records cumulative time per phase (scan, stat, classify, mkdir, transfer),
+    counters for the filesystem calls the organizer makes, bytes moved, and a
+    latency histogram per category with power-of-two microsecond buckets.
+    Pass an instance as `observer=`; subclasses can override phase(), count()
+    and record_transfer() to forward the data elsewhere. Phases overlap when
+    transfers run on worker threads, so their totals can exceed the wall time.
+    Individual spans are kept for Chrome trace output up to max_trace_events.
+    """
+
+    def __init__(self, max_trace_events=100000):
+        self.phases = {}
+        self.counters = {}
+        self.histograms = {}
+        self.transferred_bytes = 0
+        self.transferred_files = 0
+        self.max_trace_events = max_trace_events
+        self.trace_events = []
+        self.dropped_trace_events = 0
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._started = None
+        self._finished = None
+
+    def start(self):
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self._finished = time.perf_counter()
+
+    @property
+    def wall_seconds(self):
+        if self._started is None:
+            return 0.0
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def _trace(self, name, started, seconds, category=None):
+        if len(self.trace_events) >= self.max_trace_events:
+            self.dropped_trace_events += 1
+            return
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round((started - self._origin) * 1e6, 3),
+            "dur": round(seconds * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if category is not None:
+            event["cat"] = category
+        self.trace_events.append(event)
+
+    def add_phase_time(self, name, started, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            self._trace(name, started, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, started, time.perf_counter() - started)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_transfer(self, operation, started, seconds):
+        bucket = 1 << max(0, math.ceil(math.log2(max(seconds * 1e6, 1))))
+        with self._lock:
+            self.phases["transfer"] = self.phases.get("transfer", 0.0) + seconds
+            self.transferred_files += 1
+            self.transferred_bytes += operation.size
+            histogram = self.histograms.setdefault(operation.category, {})
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+            self._trace(operation.op, started, seconds, operation.category)
+
+    def summary(self):
+        wall = self.wall_seconds
+        return {
+            "wall_seconds": round(wall, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+            "transferred_files": self.transferred_files,
+            "transferred_bytes": self.transferred_bytes,
+            "files_per_s": round(self.transferred_files / wall, 1) if wall else None,
+            "mb_per_s": round(self.transferred_bytes / (1024 * 1024) / wall, 2) if wall else None,
+            "latency_histograms_us": {
+                category: {str(bucket): count for bucket, count in sorted(buckets.items())}
+                for category, buckets in self.histograms.items()
+            },
+        }
+
+    def write(self, path):
+        """Writes the summary as JSON, or a Chrome trace when path ends with .trace.json."""
+        path = str(path)
+        if path.endswith(".trace.json"):
+            data = {
+                "traceEvents": self.trace_events,
+                "displayTimeUnit": "ms",
+                "otherData": {"summary": self.summary(), "dropped_events": self.dropped_trace_events},
+            }
+        else:
+            data = self.summary()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+class PhaseTimer:
+    """
+    Accumulates the time spent in one phase of a per-file loop.
+
+    Timing every file individually would flood the observer (and its trace),
+    so the total is reported once, through flush(), as a single span.
+    """
+
+    def __init__(self, observer, name):
+        self.observer = observer
+        self.name = name
+        self.total = 0.0
+        self.calls = 0
+        self.started = time.perf_counter()
+
+    def wrap(self, function):
+        def timed(*args):
+            before = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self.total += time.perf_counter() - before
+                self.calls += 1
+        return timed
+
+    def iterate(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            before = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.total += time.perf_counter() - before
+                return
+            self.total += time.perf_counter() - before
+            self.calls += 1
+            yield item
+
+    def flush(self):
+        self.observer.add_phase_time(self.name, self.started, self.total)
+        self.observer.count(self.name, self.calls)
+        self.total = 0.0
+        self.calls = 0
@@ -0,0 +1,222 @@
+import fnmatch
+import re
+import string
+import time
+
+RULE_KEYS = ("extensions", "patterns", "regex", "min_size", "max_size", "older_than_days", "newer_than_days")
+TEMPLATE_FIELDS = ("year", "month")
+
+_SIZE_UNITS = {"B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+_DAY = 24 * 60 * 60
+
+def parse_size(value):
+    """Parses a byte count given as a number or as text such as 512, "4K", "1.5M" or "2G"."""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, (int, float)):
+        size = value
+    else:
+        text = value.strip().upper().removesuffix("B") or "0"
+        unit = text[-1] if text[-1] in _SIZE_UNITS else "B"
+        size = float(text[:-1] if text[-1] in _SIZE_UNITS else text) * _SIZE_UNITS[unit]
+    if size < 0:
+        raise ValueError(value)
+    return int(size)
+
+def validate_rule(category, rule):
+    """Checks one rule-style category entry from config.json and raises ValueError describing the first problem."""
+    prefix = f"The rule for category '{category}'"
+    for key in rule:
+        if key not in RULE_KEYS:
+            raise ValueError(f"{prefix} has an unknown key '{key}'. Allowed keys: {', '.join(RULE_KEYS)}.")
+    if not rule:
+        raise ValueError(f"{prefix} must contain at least one condition.")
+
+    for key in ("extensions", "patterns"):
+        if key in rule:
+            values = rule[key]
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"{prefix}: '{key}' must be a list of strings.")
+    if "regex" in rule:
+        if not isinstance(rule["regex"], str):
+            raise ValueError(f"{prefix}: 'regex' must be a string.")
+        try:
+            re.compile(rule["regex"])
+        except re.error as error:
+            raise ValueError(f"{prefix}: invalid regex: {error}.")
+    for key in ("min_size", "max_size"):
+        if key in rule:
+            try:
+                parse_size(rule[key])
+            except (ValueError, TypeError, AttributeError, IndexError):
+                raise ValueError(f"{prefix}: '{key}' must be a byte count such as 1048576, \"500M\" or \"2G\".")
+    for key in ("older_than_days", "newer_than_days"):
+        if key in rule:
+            value = rule[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f"{prefix}: '{key}' must be a non-negative number.")
+
+    for _, field, _, _ in string.Formatter().parse(category):
+        if field is not None and field not in TEMPLATE_FIELDS:
+            raise ValueError(f"{prefix}: unknown placeholder '{{{field}}}' in the category name. Use {{year}} or {{month}}.")
+
+def _normalize_extension(ext):
+    ext = ext.strip().lower()
+    if ext and not ext.startswith("."):
+        ext = "." + ext
+    return ext
+
+def _embeddable(source, compiled):
+    """True when a regex means the same inside a larger alternation: no groups to renumber, no global flags."""
+    if compiled.groups:
+        return False
+    try:
+        re.compile("(?:)|(?:" + source + ")")
+    except re.error:
+        return False
+    return True
+
+class _Rule:
+    __slots__ = ("order", "category", "template", "pattern", "matchers", "min_size", "max_size", "older_than",
+                 "newer_than")
+
+    def __init__(self, order, category, spec):
+        self.order = order
+        self.category = category
+        self.template = any(field is not None for _, field, _, _ in string.Formatter().parse(category))
+        patterns = ["(?i:" + fnmatch.translate(glob) + ")" for glob in spec.get("patterns", ())]
+        # The user's regex is compiled on its own: global flags, named groups and backreferences
+        # only mean what they say at the start of their own pattern.
+        self.matchers = [re.compile("|".join(patterns), re.DOTALL)] if patterns else []
+        if "regex" in spec:
+            regex = re.compile(spec["regex"], re.DOTALL)
+            self.matchers.append(regex)
+            if patterns is not None and _embeddable(spec["regex"], regex):
+                patterns.append("(?:" + spec["regex"] + ")")
+            else:
+                patterns = None
+        # Source for the combined regex of RuleTable, or None when the rule must be matched alone.
+        self.pattern = "|".join(patterns) if patterns else None
+        self.min_size = parse_size(spec["min_size"]) if "min_size" in spec else None
+        self.max_size = parse_size(spec["max_size"]) if "max_size" in spec else None
+        self.older_than = spec["older_than_days"] * _DAY if "older_than_days" in spec else None
+        self.newer_than = spec["newer_than_days"] * _DAY if "newer_than_days" in spec else None
+
+    def matches_name(self, name):
+        return any(matcher.fullmatch(name) is not None for matcher in self.matchers)
+
+    def accepts(self, size, mtime):
+        if self.min_size is not None or self.max_size is not None:
+            if size is None:
+                return False
+            if self.min_size is not None and size < self.min_size:
+                return False
+            if self.max_size is not None and size > self.max_size:
+                return False
+        if self.older_than is not None or self.newer_than is not None or self.template:
+            if mtime is None:
+                return False
+            age = time.time() - mtime
+            if self.older_than is not None and age < self.older_than:
+                return False
+            if self.newer_than is not None and age > self.newer_than:
+                return False
+        return True
+
+    def folder(self, mtime):
+        if not self.template:
+            return self.category
+        moment = time.localtime(mtime)
+        return self.category.format(year=moment.tm_year, month=f"{moment.tm_mon:02d}")
+
+class RuleTable:
+    """
+    Decision table compiled from rule-style categories, checked in config order.
+
+    Matching a file takes three steps. A hash lookup on the file's extensions
+    gives the rules that can apply to it (precomputed per extension, merged
+    with the rules that have no extension condition). A single combined regex
+    over the name patterns finds the first rule whose pattern matches; a
+    regex with groups or global flags would change meaning inside it, so such
+    rules are matched with their own compiled pattern instead. Only
+    then are the remaining candidates' size and date limits compared, which
+    are plain integer checks. The cost per file therefore depends on the
+    rules for its extension, not on the size of the whole table.
+    """
+
+    def __init__(self, rules):
+        self.specs = [(category, dict(spec)) for category, spec in rules]
+        self._rules = [_Rule(order, category, spec) for order, (category, spec) in enumerate(self.specs)]
+
+        by_extension = {}
+        generic = []
+        for rule, (_, spec) in zip(self._rules, self.specs):
+            extensions = {_normalize_extension(ext) for ext in spec.get("extensions", ())} - {""}
+            if "extensions" in spec:
+                for ext in extensions:
+                    by_extension.setdefault(ext, []).append(rule)
+            else:
+                generic.append(rule)
+        self._generic = tuple(generic)
+        self._max_parts = max([ext.count(".") for ext in by_extension] or [1])
+        # A name ending in ".tar.gz" also ends in ".gz", so each key gets the rules of its shorter suffixes too.
+        self._index = {}
+        for ext in by_extension:
+            candidates = list(generic)
+            for other, rules in by_extension.items():
+                if ext.endswith(other):
+                    candidates.extend(rules)
+            self._index[ext] = tuple(sorted(set(candidates), key=lambda rule: rule.order))
+
+        # Rules whose pattern cannot be embedded (see _embeddable) are matched on their own.
+        combined_rules = [rule for rule in self._rules if rule.pattern is not None]
+        self._combined = None
+        self._in_combined = frozenset(rule.order for rule in combined_rules)
+        if combined_rules:
+            self._combined = re.compile("|".join(f"(?P<rule{rule.order}>{rule.pattern})" for rule in combined_rules),
+                                        re.DOTALL)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def folders(self):
+        """Top-level folders the rules file into; a templated first level ("{year}/Photos") has none."""
+        folders = set()
+        for rule in self._rules:
+            top = rule.category.split("/", 1)[0]
+            if "{" not in top:
+                folders.add(top)
+        return folders
+
+    def _candidates(self, lowered):
+        start = len(lowered) - len(lowered.lstrip("."))
+        pos = len(lowered)
+        candidates = self._generic
+        for _ in range(self._max_parts):
+            pos = lowered.rfind(".", start + 1, pos)
+            if pos == -1:
+                break
+            found = self._index.get(lowered[pos:])
+            if found is not None:
+                candidates = found
+        return candidates
+
+    def match(self, name, size=None, mtime=None):
+        """Returns the folder of the first rule matching the file, or None."""
+        candidates = self._candidates(name.lower())
+        first_pattern = None
+        for rule in candidates:
+            if rule.order in self._in_combined:
+                if first_pattern is None:
+                    found = self._combined.fullmatch(name)
+                    first_pattern = int(found.lastgroup[4:]) if found is not None else len(self._rules)
+                if rule.order < first_pattern:
+                    continue
+                # The combined regex only names the first matching rule; later ones are checked on their own.
+                if rule.order > first_pattern and not rule.matches_name(name):
+                    continue
+            elif rule.matchers and not rule.matches_name(name):
+                continue
+            if rule.accepts(size, mtime):
+                return rule.folder(mtime)
+        return None
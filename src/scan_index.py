@@ -0,0 +1,91 @@
+import os
+import sqlite3
+from scanner import ORGANIZER_FILE_PREFIX
+
+INDEX_FILE_NAME = ORGANIZER_FILE_PREFIX + "index.sqlite"
+
+class ScanIndex:
+    """
+    Persistent record of files already organized into a destination.
+
+    Each processed source file is stored with its size, mtime and chosen
+    category. On the next run, files whose size and mtime are unchanged are
+    skipped without being classified or transferred again, so repeated runs
+    over the same inbox only pay for new or modified files.
+    """
+
+    def __init__(self, dest_dir, index_path=None):
+        if index_path is None:
+            os.makedirs(dest_dir, exist_ok=True)
+            index_path = os.path.join(dest_dir, INDEX_FILE_NAME)
+        self.index_path = str(index_path)
+        try:
+            self._db = sqlite3.connect(self.index_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "source TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "category TEXT NOT NULL, target TEXT NOT NULL)"
+            )
+            self._db.commit()
+        except sqlite3.DatabaseError:
+            raise ValueError(f"The scan index is not a valid database: {self.index_path}. Use --rebuild-index to recreate it.")
+
+    def is_unchanged(self, source, size, mtime_ns):
+        row = self._db.execute("SELECT size, mtime_ns FROM files WHERE source = ?", (source,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def record(self, operation, mtime_ns):
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (source, size, mtime_ns, category, target) VALUES (?, ?, ?, ?, ?)",
+            (operation.source, operation.size, mtime_ns, operation.category, operation.target),
+        )
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def rebuild(self):
+        """Forgets every entry, so the next run examines all files again."""
+        self._db.execute("DELETE FROM files")
+        self._db.commit()
+
+    def verify(self):
+        """
+        Removes entries that no longer match the disk and returns (checked, removed).
+
+        An entry is stale when its source changed size or mtime, or when the
+        organized copy no longer exists (a deleted copy of an unchanged source
+        would otherwise never be made again).
+        """
+        stale = []
+        checked = 0
+        for source, size, mtime_ns, target in self._db.execute("SELECT source, size, mtime_ns, target FROM files"):
+            checked += 1
+            try:
+                info = os.stat(source)
+            except FileNotFoundError:
+                info = None
+            if info is not None and (info.st_size != size or info.st_mtime_ns != mtime_ns):
+                stale.append((source,))
+            elif not os.path.exists(target):
+                stale.append((source,))
+        self._db.executemany("DELETE FROM files WHERE source = ?", stale)
+        self._db.commit()
+        return checked, len(stale)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        self.close()
+        return False
@@ -0,0 +1,167 @@
+import os
+import queue
+import threading
+
+_DONE = object()
+
+# Bookkeeping files the organizer keeps next to the organized files; never organized themselves.
+ORGANIZER_FILE_PREFIX = ".file_organizer_"
+
+def scan_directory(source_dir):
+    """
+    Lazily yields an os.DirEntry for every regular file directly inside source_dir.
+
+    Entries are produced while the directory is still being read, so callers can
+    start classifying before the listing is complete and memory use does not grow
+    with the size of the directory. DirEntry caches the file type from the listing
+    and the result of its first stat() call, so callers should use entry.stat()
+    rather than stat-ing entry.path again.
+    """
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(ORGANIZER_FILE_PREFIX):
+                continue
+            try:
+                if entry.is_file():
+                    yield entry
+            except OSError:
+                continue
+
+def entry_size(entry):
+    """Returns the cached size of a DirEntry, or None if the file disappeared."""
+    try:
+        return entry.stat().st_size
+    except FileNotFoundError:
+        return None
+
+class FileEntry:
+    """
+    Minimal stand-in for os.DirEntry for a file known only by its path.
+
+    Used for files reported one by one (e.g. by the watcher) so they can go
+    through the same planning code as scanned entries. stat() is cached too.
+    """
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path, stat_result=None):
+        self.path = os.fspath(path)
+        self.name = os.path.basename(self.path)
+        self._stat = stat_result
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+class _WalkState:
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.closed = threading.Event()
+        self.visited = set()
+        self.error = None
+
+def walk_files(source_dir, workers=4, max_depth=None, follow_symlinks=False, exclude_dirs=(), backlog=1024):
+    """
+    Lazily yields (relative_dir, DirEntry) for every file below source_dir.
+
+    Subdirectories are scanned concurrently by `workers` threads. Found files are
+    handed over through a bounded queue, so the walkers pause when the consumer
+    falls behind instead of building the whole tree in memory. relative_dir is
+    "." for files directly inside source_dir. max_depth=0 only lists source_dir
+    itself; None walks the whole tree. Symlinked directories are only entered
+    when follow_symlinks is set, and each real directory is visited once.
+    Directories whose absolute path is in exclude_dirs are not entered.
+    """
+    root = os.path.abspath(source_dir)
+    excluded = {os.path.abspath(path) for path in exclude_dirs}
+    results = queue.Queue(maxsize=backlog)
+    state = _WalkState()
+
+    def put(item):
+        while not state.closed.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def add_job(path, relative, depth):
+        if follow_symlinks:
+            try:
+                info = os.stat(path)
+            except OSError:
+                return
+            key = (info.st_dev, info.st_ino)
+            with state.lock:
+                if key in state.visited:
+                    return
+                state.visited.add(key)
+        with state.lock:
+            state.pending += 1
+        state.jobs.put((path, relative, depth))
+
+    def scan(path, relative, depth):
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if state.stopped.is_set():
+                        return
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            if (max_depth is None or depth < max_depth) and entry.path not in excluded:
+                                child = entry.name if relative == "." else os.path.join(relative, entry.name)
+                                add_job(entry.path, child, depth + 1)
+                        elif entry.is_file() and not entry.name.startswith(ORGANIZER_FILE_PREFIX):
+                            put((relative, entry))
+                    except OSError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            if depth == 0:
+                raise
+
+    def worker():
+        while True:
+            job = state.jobs.get()
+            if job is None:
+                return
+            try:
+                if not state.stopped.is_set():
+                    scan(*job)
+            except Exception as error:
+                if state.error is None:
+                    state.error = error
+                state.stopped.set()
+                put(_DONE)
+            finally:
+                with state.lock:
+                    state.pending -= 1
+                    finished = state.pending == 0
+                if finished:
+                    put(_DONE)
+
+    add_job(root, ".", 0)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        state.closed.set()
+        state.stopped.set()
+        for _ in threads:
+            state.jobs.put(None)
+        for thread in threads:
+            thread.join()
+
+    if state.error is not None:
+        raise state.error
@@ -0,0 +1,404 @@
+import hmac
+import itertools
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from config_cache import load_classifier
+from folder_utils import DEFAULT_CONFIG_PATH, organize_files_in_destination, format_report
+from os_config import validate_paths
+from output import Output, get_output, QUIET
+
+DEFAULT_PORT = 8765
+# Where run_server() writes the token clients must send; readable by the owner only.
+DEFAULT_TOKEN_PATH = Path.home() / ".file_organizer_server_token"
+# Finished jobs kept for polling; older ones are forgotten.
+KEEP_FINISHED = 100
+STREAM_INTERVAL = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Options a job may set, with their type; they are passed to organize_files_in_destination.
+JOB_OPTIONS = {
+    "dry_run": bool, "workers": int, "recursive": bool, "max_depth": int, "follow_symlinks": bool, "walkers": int,
+    "dedup": str, "sniff": str, "archives": str, "hardlink": bool, "largest_first": bool, "journal": bool,
+}
+
+def validate_options(options):
+    """Raises ValueError unless options is a dict of known job options with valid values."""
+    if not isinstance(options, dict):
+        raise ValueError("'options' must be an object.")
+    from dedup import DEDUP_POLICIES
+    from sniffer import SNIFF_MODES
+    from archives import ARCHIVE_MODES
+    choices = {"dedup": DEDUP_POLICIES, "sniff": SNIFF_MODES, "archives": ARCHIVE_MODES}
+    for name, value in options.items():
+        expected = JOB_OPTIONS.get(name)
+        if expected is None:
+            raise ValueError(f"Unknown option '{name}'. Allowed options: {', '.join(JOB_OPTIONS)}.")
+        # bool is an int subclass; a true/false where a number is expected is a mistake.
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"Option '{name}' must be of type {expected.__name__}.")
+        if expected is int and value < (0 if name == "max_depth" else 1):
+            raise ValueError(f"Option '{name}' is out of range: {value}.")
+        if name in choices and value not in choices[name]:
+            raise ValueError(f"Option '{name}' must be one of: {', '.join(choices[name])}.")
+
+class WarmClassifier:
+    """Keeps the compiled classifier in memory and reloads it only when the config file changes."""
+
+    def __init__(self, config_path=None):
+        self.config_path = Path(config_path) if config_path is not None else DEFAULT_CONFIG_PATH
+        self.loads = 0
+        self._classifier = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        info = os.stat(self.config_path)
+        key = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            if key != self._key:
+                self._classifier = load_classifier(self.config_path)
+                self._key = key
+                self.loads += 1
+            return self._classifier
+
+class Job:
+    """
+    One organize request and its state.
+
+    Per-file events go to an Output at QUIET level, which only counts them,
+    so progress can be read at any time without formatting anything.
+    Waiters on `changed` are woken when the state changes.
+    """
+
+    def __init__(self, job_id, source, destination, options):
+        self.id = job_id
+        self.source = source
+        self.destination = destination
+        self.options = options
+        self.state = QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.stats = None
+        self.report = None
+        self.error = None
+        self.cancel = threading.Event()
+        self.output = Output(level=QUIET, progress_interval=0)
+        self.changed = threading.Condition()
+
+    def set_state(self, state, **fields):
+        with self.changed:
+            self.state = state
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if state == RUNNING:
+                self.started = time.time()
+            elif state in FINISHED_STATES:
+                self.finished = time.time()
+            self.changed.notify_all()
+
+    def wait(self, timeout):
+        """Waits up to timeout seconds for the job to finish; returns True once it has."""
+        with self.changed:
+            if self.state not in FINISHED_STATES:
+                self.changed.wait(timeout)
+            return self.state in FINISHED_STATES
+
+    def snapshot(self, full=True):
+        data = {
+            "id": self.id, "state": self.state, "source": self.source, "destination": self.destination,
+            "options": self.options, "submitted": self.submitted, "started": self.started, "finished": self.finished,
+            "progress": self.output.progress(),
+        }
+        if full:
+            data["stats"] = self.stats
+            data["report"] = self.report
+            data["error"] = self.error
+        return data
+
+class OrganizerServer:
+    """
+    Runs organize jobs from a queue, `concurrency` at a time, behind a JSON API on localhost.
+
+    The process stays up between jobs, so modules are imported and the
+    classifier compiled once (WarmClassifier reloads it when config.json
+    changes). Endpoints:
+
+        POST   /jobs              {"source", "destination", "options"} -> the queued job
+        GET    /jobs              all known jobs, without stats
+        GET    /jobs/<id>         one job, with stats and report once finished
+        GET    /jobs/<id>/stream  JSON lines with the job's status until it finishes
+        DELETE /jobs/<id>         cancels a queued or running job
+        GET    /health            number of queued and running jobs
+
+    Port 0 picks a free port (see `address`). Requests whose Host header
+    is not this address (DNS rebinding) are refused, and so are POST bodies
+    that are not sent as application/json, which a browser will not send
+    cross-site without asking first. With token_path, a new random token is
+    written there (mode 0600) and every request must carry it as
+    `Authorization: Bearer <token>`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, concurrency=1, config_path=None,
+                 keep_finished=KEEP_FINISHED, token_path=None):
+        self.concurrency = concurrency
+        self.keep_finished = keep_finished
+        self.classifier = WarmClassifier(config_path)
+        self.jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._serve_thread = None
+        # Imported now, so the first job using them does not pay for it.
+        import dedup, sniffer, archives, journal, io_scheduler
+        self.classifier.get()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.organizer = self
+        bound_port = self.address[1]
+        self.allowed_hosts = {f"{name}:{bound_port}" for name in ("127.0.0.1", "localhost", host)}
+        self.token = None
+        if token_path is not None:
+            self.token = secrets.token_urlsafe(32)
+            write_token(token_path, self.token)
+
+    @property
+    def address(self):
+        return self._httpd.server_address[:2]
+
+    def authorized(self, authorization):
+        if self.token is None:
+            return True
+        return hmac.compare_digest(authorization or "", f"Bearer {self.token}")
+
+    def submit(self, source, destination, options=None):
+        """Queues a job and returns it; raises ValueError for invalid input."""
+        if not isinstance(source, str) or not isinstance(destination, str) or not source or not destination:
+            raise ValueError("'source' and 'destination' must be non-empty strings.")
+        options = {} if options is None else options
+        validate_options(options)
+        options = dict(options)
+        with self._lock:
+            job = Job(str(next(self._ids)), source, destination, options)
+            self.jobs[job.id] = job
+            self._forget_finished()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Cancels a job; returns it, or None if there is no such job."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel.set()
+        with job.changed:
+            if job.state == QUEUED:
+                job.set_state(CANCELLED)
+        return job
+
+    def health(self):
+        states = [job.state for job in self.list_jobs()]
+        return {"status": "ok", "queued": states.count(QUEUED), "running": states.count(RUNNING),
+                "concurrency": self.concurrency, "config_loads": self.classifier.loads}
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            # Claimed under the job's lock, so a job cancelled while queued never starts.
+            with job.changed:
+                if job.state != QUEUED:
+                    continue
+                job.set_state(RUNNING)
+            self.run_job(job)
+
+    def run_job(self, job):
+        try:
+            source = Path(job.source)
+            destination = Path(job.destination)
+            validate_paths(source, destination)
+            same_place = source.resolve() == destination.resolve()
+            stats = organize_files_in_destination(source, destination, self.classifier.get(), same_place=same_place,
+                                                  on_event=job.output, cancel=job.cancel, **job.options)
+        except Exception as error:
+            job.set_state(FAILED, error=str(error))
+            return
+        report = format_report(stats)
+        plan = stats.pop("plan", None)
+        if plan is not None:
+            stats["planned_operations"] = len(plan)
+        job.set_state(CANCELLED if stats.get("cancelled") else DONE, stats=stats, report=report)
+
+    def start(self):
+        """Starts the job workers and serves requests in a background thread."""
+        self._start_workers()
+        self._serve_thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._serve_thread.start()
+
+    def serve_forever(self):
+        self._start_workers()
+        self._httpd.serve_forever()
+
+    def _start_workers(self):
+        for _ in range(self.concurrency):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self):
+        """Stops accepting requests, cancels running jobs and waits for the workers."""
+        if self._serve_thread is not None:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+        for job in self.list_jobs():
+            if job.state not in FINISHED_STATES:
+                self.cancel(job.id)
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+def write_token(path, token):
+    """Writes token to path, readable and writable by the owner only."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        # The mode passed to open() does not apply to an existing file.
+        if hasattr(os, "fchmod"):
+            os.fchmod(f.fileno(), 0o600)
+        f.write(token + "\n")
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FileOrganizer"
+
+    def log_message(self, format, *args):
+        get_output().detail(f"{self.address_string()} {format % args}")
+
+    def _route(self):
+        url = urlsplit(self.path)
+        return [part for part in url.path.split("/") if part], parse_qs(url.query)
+
+    def _send(self, status, data):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send(404, {"error": f"Not found: {self.path}"})
+
+    def _refused(self):
+        """Sends an error and returns True unless the request may be served."""
+        organizer = self.server.organizer
+        if self.headers.get("Host") not in organizer.allowed_hosts:
+            self._send(403, {"error": "Unexpected Host header."})
+            return True
+        if not organizer.authorized(self.headers.get("Authorization")):
+            self._send(401, {"error": "Missing or wrong token."})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._refused():
+            return
+        organizer = self.server.organizer
+        parts, query = self._route()
+        if parts == ["health"]:
+            return self._send(200, organizer.health())
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": [job.snapshot(full=False) for job in organizer.list_jobs()]})
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = organizer.get(parts[1])
+            if job is None:
+                return self._not_found()
+            if len(parts) == 2:
+                return self._send(200, job.snapshot())
+            if parts[2] == "stream":
+                try:
+                    interval = float(query.get("interval", [STREAM_INTERVAL])[0])
+                except ValueError:
+                    return self._send(400, {"error": "'interval' must be a number of seconds."})
+                return self._stream(job, max(interval, 0.01))
+        self._not_found()
+
+    def _stream(self, job, interval):
+        # No Content-Length: the response ends when the connection closes after the last line.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        last = None
+        try:
+            while True:
+                finished = job.wait(interval)
+                snapshot = job.snapshot(full=finished)
+                key = (snapshot["state"], snapshot["progress"]["files"], snapshot["progress"]["bytes"])
+                if key != last:
+                    self.wfile.write(json.dumps(snapshot, default=str).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                    last = key
+                if finished:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        if self._refused():
+            return
+        organizer = self.server.organizer
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            return self._not_found()
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            return self._send(415, {"error": "The request body must be sent as application/json."})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request body must be a JSON object.")
+            job = organizer.submit(request.get("source"), request.get("destination"), request.get("options"))
+        except ValueError as error:
+            return self._send(400, {"error": str(error)})
+        self._send(202, job.snapshot())
+
+    def do_DELETE(self):
+        if self._refused():
+            return
+        organizer = self.server.organizer
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._not_found()
+        job = organizer.cancel(parts[1])
+        if job is None:
+            return self._not_found()
+        self._send(200, job.snapshot(full=False))
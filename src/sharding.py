@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import queue
+import zlib
+from pathlib import Path
+from classifier import CategoryClassifier, compile_categories
+from scanner import FileEntry
+from folder_utils import new_stats, source_entries, plan_entries, execute_operations
+from events import OrganizerEvent, SKIPPED
+from output import get_output
+
+SHARD_BATCH_SIZE = 512
+# Batches waiting per shard; bounds the parent's memory when a shard falls behind.
+SHARD_BACKLOG = 8
+_PUT_TIMEOUT = 1.0
+
+def shard_of(name, shards):
+    """Shard number for a file name. Equal names always share a shard, so they never race for a target."""
+    return zlib.crc32(os.fsencode(name)) % shards
+
+def merge_stats(total, part):
+    """Adds one shard's stats into total: counts are summed, per-key dicts merged recursively."""
+    for key, value in part.items():
+        if isinstance(value, bool):
+            total[key] = total.get(key, False) or value
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+        elif isinstance(value, dict):
+            merge_stats(total.setdefault(key, {}), value)
+        else:
+            total.setdefault(key, value)
+    return total
+
+def organize_sharded(source_dir, dest_dir, categories, processes, same_place=False, workers=1,
+                     recursive=False, max_depth=None, follow_symlinks=False, walkers=4, hardlink=False,
+                     largest_first=False):
+    """
+    Organizes source_dir with `processes` worker processes and returns the merged stats.
+
+    The parent only lists the source. Each file goes to the shard given by a
+    hash of its name; every shard is owned by one process, which stats,
+    classifies and transfers its files with `workers` threads exactly like a
+    normal run. Because a target name is the file's own name, two files that
+    could claim the same target (same name, different subdirectories) are
+    always in the same shard. A shard sorts its files by relative path once
+    the listing is complete, and the first file for each target wins; the
+    others are reported as skipped. The result therefore does not depend on
+    the order the threaded walkers listed the files in, nor on which worker
+    thread starts first. Category folders are created with exist_ok, so
+    shards creating the same folder do not conflict. Per-shard stats are
+    merged with merge_stats(), ready for format_report().
+    """
+    classifier = compile_categories(categories)
+    source_path = Path(source_dir)
+    stats = new_stats(recursive)
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    compiled = classifier.compiled()
+    shards = []
+    for shard in range(processes):
+        tasks = context.Queue(SHARD_BACKLOG)
+        process = context.Process(
+            target=_shard_worker,
+            args=(shard, tasks, results, os.fspath(dest_dir), compiled, same_place, recursive, workers, hardlink,
+                  largest_first),
+            daemon=True,
+        )
+        process.start()
+        shards.append((tasks, process))
+
+    try:
+        batches = [[] for _ in range(processes)]
+        for relative_dir, entry in source_entries(source_path, Path(dest_dir), classifier, recursive=recursive,
+                                                  max_depth=max_depth, follow_symlinks=follow_symlinks, walkers=walkers):
+            shard = shard_of(entry.name, processes)
+            batch = batches[shard]
+            batch.append((relative_dir, entry.path))
+            if len(batch) >= SHARD_BATCH_SIZE:
+                _put(shards[shard], batch, results)
+                batches[shard] = []
+        for shard, batch in enumerate(batches):
+            if batch:
+                _put(shards[shard], batch, results)
+            _put(shards[shard], None, results)
+
+        error = None
+        for _ in range(processes):
+            _, part, shard_error = _get_result(results, shards)
+            if shard_error is not None:
+                error = error or shard_error
+            else:
+                merge_stats(stats, part)
+        if error is not None:
+            raise error
+    finally:
+        for _, process in shards:
+            process.join(timeout=_PUT_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+    return stats
+
+def _put(shard, item, results):
+    tasks, process = shard
+    while True:
+        try:
+            tasks.put(item, timeout=_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            if not process.is_alive():
+                break
+    # The shard stopped taking work; report its own error if it sent one.
+    try:
+        _, _, error = results.get(timeout=_PUT_TIMEOUT)
+    except queue.Empty:
+        error = None
+    if error is not None:
+        raise error
+    raise OSError(f"An organizer worker process exited unexpectedly (exit code {process.exitcode}).")
+
+def _get_result(results, shards):
+    while True:
+        try:
+            return results.get(timeout=_PUT_TIMEOUT)
+        except queue.Empty:
+            # A killed process never reports; don't wait for it forever.
+            if any(not process.is_alive() and process.exitcode != 0 for _, process in shards):
+                raise OSError("An organizer worker process exited unexpectedly.")
+
+def _received_entries(tasks):
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            return
+        for relative_dir, path in batch:
+            yield relative_dir, FileEntry(path)
+
+def _relative_path(item):
+    relative_dir, entry = item
+    return os.path.normpath(os.path.join(relative_dir, entry.name))
+
+def _first_per_target(operations, on_event):
+    """Keeps the first operation for each target and reports the others as skipped, as the executor would."""
+    claimed = set()
+    for operation in operations:
+        if operation.target in claimed:
+            on_event(OrganizerEvent(SKIPPED, operation))
+            continue
+        claimed.add(operation.target)
+        yield operation
+
+def _shard_worker(shard, tasks, results, dest_dir, compiled, same_place, recursive, workers, hardlink, largest_first):
+    # Progress lines from every shard would interleave; the parent reports the totals.
+    get_output().disable_progress()
+    try:
+        classifier = CategoryClassifier.from_compiled(compiled)
+        stats = new_stats(recursive)
+        entries = sorted(_received_entries(tasks), key=_relative_path)
+        operations = plan_entries(entries, dest_dir, classifier, stats, same_place=same_place)
+        execute_operations(_first_per_target(operations, get_output()), workers=workers, stats=stats, hardlink=hardlink, largest_first=largest_first)
+        results.put((shard, stats, None))
+    except BaseException as error:
+        results.put((shard, None, error))
@@ -0,0 +1,242 @@
+import marshal
+import os
+from concurrent.futures import ThreadPoolExecutor
+from classifier import compile_categories
+from scanner import ORGANIZER_FILE_PREFIX
+
+SNIFF_MODES = ("unknown", "verify")
+
+HEADER_SIZE = 512
+SNIFF_BATCH_SIZE = 256
+SNIFF_CACHE_NAME = ORGANIZER_FILE_PREFIX + "sniff.cache"
+
+# (pattern, extensions). A pattern is bytes, or a tuple of bytes and ints where
+# an int skips that many bytes of any value. The first extension is the one a
+# file is classified as; the others are legitimate names for the same container
+# (an .xlsx is a zip file), so verify mode leaves them alone.
+SIGNATURES = [
+    (b"%PDF-", (".pdf",)),
+    (b"\x89PNG\r\n\x1a\n", (".png",)),
+    (b"\xff\xd8\xff", (".jpg", ".jpeg")),
+    (b"GIF87a", (".gif",)),
+    (b"GIF89a", (".gif",)),
+    (b"II*\x00", (".tiff", ".tif")),
+    (b"MM\x00*", (".tiff", ".tif")),
+    (b"{\\rtf", (".rtf",)),
+    (b"PK\x03\x04", (".zip", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".jar", ".apk", ".epub")),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", (".doc", ".xls", ".ppt", ".msi")),
+    (b"Rar!\x1a\x07", (".rar",)),
+    (b"7z\xbc\xaf\x27\x1c", (".7z",)),
+    (b"\x1f\x8b", (".gz", ".tgz")),
+    (b"ID3", (".mp3",)),
+    (b"\xff\xfb", (".mp3",)),
+    (b"fLaC", (".flac",)),
+    (b"OggS", (".ogg", ".oga", ".ogv")),
+    ((b"RIFF", 4, b"WAVE"), (".wav",)),
+    ((b"RIFF", 4, b"AVI "), (".avi",)),
+    ((4, b"ftypqt"), (".mov",)),
+    ((4, b"ftyp"), (".mp4", ".m4v", ".m4a", ".mov", ".3gp")),
+    (b"\x1a\x45\xdf\xa3", (".mkv", ".webm")),
+    (b"FLV\x01", (".flv",)),
+    (b"MZ", (".exe", ".dll")),
+    (b"!<arch>\ndebian", (".deb",)),
+    (b"\xed\xab\xee\xdb", (".rpm",)),
+    ((257, b"ustar"), (".tar",)),
+]
+
+def _pattern(signature):
+    if isinstance(signature, bytes):
+        return list(signature)
+    pattern = []
+    for part in signature:
+        if isinstance(part, int):
+            pattern.extend([None] * part)
+        else:
+            pattern.extend(part)
+    return pattern
+
+class SignatureTrie:
+    """
+    Prefix trie of magic numbers; match() returns the extensions of the longest matching signature.
+
+    Each node is a dict keyed by byte value, with None as the "any byte" edge
+    and "$" holding the extensions of a signature ending there. Walking the
+    header once through the trie checks every signature at the same time.
+    """
+
+    def __init__(self, signatures=SIGNATURES):
+        self.root = {}
+        for signature, extensions in signatures:
+            node = self.root
+            for byte in _pattern(signature):
+                node = node.setdefault(byte, {})
+            node.setdefault("$", extensions)
+
+    def match(self, header):
+        found = self.root.get("$")
+        nodes = [self.root]
+        for byte in header:
+            next_nodes = []
+            for node in nodes:
+                child = node.get(byte)
+                if child is not None:
+                    next_nodes.append(child)
+                child = node.get(None)
+                if child is not None:
+                    next_nodes.append(child)
+            if not next_nodes:
+                break
+            for node in next_nodes:
+                if "$" in node:
+                    found = node["$"]
+            nodes = next_nodes
+        return found
+
+def read_header(path, size=HEADER_SIZE):
+    try:
+        with open(path, "rb") as f:
+            return f.read(size)
+    except OSError:
+        return None
+
+def _file_key(path):
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None, None
+    return (info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns), info.st_mtime_ns
+
+class ContentSniffer:
+    """
+    Identifies files by their first bytes, with results cached per (device, inode, size, mtime).
+
+    The cache is kept in the destination (SNIFF_CACHE_NAME) so repeated runs
+    over the same inbox do not read the same headers again. Only entries
+    looked up during a run are written back, so it never outgrows the source.
+    """
+
+    def __init__(self, cache_path=None, workers=8):
+        self.trie = SignatureTrie()
+        self.cache_path = cache_path
+        self.workers = workers
+        self._cache = self._load_cache()
+        self._used = {}
+
+    def _load_cache(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, "rb") as f:
+                cache = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _detect(self, path):
+        header = read_header(path)
+        if not header:
+            return ()
+        return self.trie.match(header) or ()
+
+    def sniff_many(self, paths):
+        """Returns {path: (extensions, mtime_ns)}; headers missing from the cache are read in parallel."""
+        results = {}
+        to_read = []
+        for path in paths:
+            key, mtime_ns = _file_key(path)
+            if key is None:
+                continue
+            extensions = self._cache.get(key)
+            if extensions is None:
+                to_read.append((path, key, mtime_ns))
+            else:
+                self._used[key] = extensions
+                results[path] = (extensions, mtime_ns)
+        if to_read:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+                detected = executor.map(self._detect, [path for path, _, _ in to_read])
+                for (path, key, mtime_ns), extensions in zip(to_read, detected):
+                    self._used[key] = extensions
+                    results[path] = (extensions, mtime_ns)
+        return results
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        temporary = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                marshal.dump(self._used, f)
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+def sniff_operations(operations, dest_dir, categories, stats, mode="unknown", sniffer=None, index=None,
+                     batch_size=SNIFF_BATCH_SIZE):
+    """
+    Re-classifies planned files by content and yields the (possibly re-targeted) operations.
+
+    In "unknown" mode only files whose extension matched no category are
+    sniffed, so files with a known extension cost nothing extra. In "verify"
+    mode every file is sniffed, and a file whose content belongs to another
+    category than its extension (a PDF named .jpg) is moved to that category,
+    i.e. to dest_dir/<category>/<file name>.
+    Sniffed files are collected into batches whose headers are read in
+    parallel. Empty files and unrecognised content keep their category.
+    Adds identified_by_content and mislabeled counts to stats.
+    """
+    if mode not in SNIFF_MODES:
+        raise ValueError(f"Unknown sniff mode '{mode}'. Choose one of: {', '.join(SNIFF_MODES)}")
+    if sniffer is None:
+        sniffer = ContentSniffer()
+    stats.setdefault("identified_by_content", 0)
+    if mode == "verify":
+        stats.setdefault("mislabeled", 0)
+    return _sniff(operations, dest_dir, compile_categories(categories), stats, mode, sniffer, index, batch_size)
+
+def _sniff(operations, dest_dir, classifier, stats, mode, sniffer, index, batch_size):
+    batch = []
+    for operation in operations:
+        if operation.size and (mode == "verify" or operation.category == classifier.default):
+            batch.append(operation)
+            if len(batch) >= batch_size:
+                yield from _reclassify(batch, dest_dir, classifier, sniffer, stats, index)
+                batch = []
+        else:
+            yield operation
+    if batch:
+        yield from _reclassify(batch, dest_dir, classifier, sniffer, stats, index)
+
+def _reclassify(batch, dest_dir, classifier, sniffer, stats, index):
+    sniffed = sniffer.sniff_many([operation.source for operation in batch])
+    files_per_category = stats["files_per_category"]
+    for operation in batch:
+        extensions, mtime_ns = sniffed.get(operation.source, ((), None))
+        if not extensions:
+            yield operation
+            continue
+        name = os.path.basename(operation.source).lower()
+        known = operation.category != classifier.default
+        if known and any(name.endswith(ext) for ext in extensions):
+            yield operation
+            continue
+        category = classifier.lookup("file" + extensions[0])
+        if category is None or category == operation.category:
+            yield operation
+            continue
+
+        files_per_category[operation.category] -= 1
+        if not files_per_category[operation.category]:
+            del files_per_category[operation.category]
+        files_per_category[category] = files_per_category.get(category, 0) + 1
+        stats["mislabeled" if known else "identified_by_content"] += 1
+
+        # Categories may be nested ("Docs/PDF"), so the folder is rebuilt from dest_dir, not from the old target.
+        target = os.path.join(dest_dir, category, os.path.basename(operation.target))
+        operation = operation._replace(target=target, category=category)
+        if index is not None:
+            index.record(operation, mtime_ns)
+        yield operation
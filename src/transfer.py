@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from plan import MOVE, LINK
+from copy_backend import CopyBackend, MoveBackend
+from events import OrganizerEvent, COPIED, MOVED, LINKED, SKIPPED, MISSING, PROGRESS
+from output import get_output
+
+class FolderCreator:
+    """Creates category folders once, even when several workers ask for the same one."""
+
+    def __init__(self, observer=None):
+        self.observer = observer
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, folder):
+        if folder in self._created:
+            return
+        with self._lock:
+            if folder not in self._created:
+                started = time.perf_counter()
+                # exist_ok makes a lost race with another process harmless too.
+                os.makedirs(folder, exist_ok=True)
+                self._created.add(folder)
+                if self.observer is not None:
+                    self.observer.add_phase_time("mkdir", started, time.perf_counter() - started)
+                    self.observer.count("mkdir")
+
+class NameClaims:
+    """
+    Reserves destination names so two workers never write the same file.
+
+    Each destination folder is listed once, on first use, instead of calling
+    exists() for every file; names claimed during the run are added to that set.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def claim(self, dest_folder, name):
+        with self._lock:
+            names = self._names.get(dest_folder)
+            if names is None:
+                try:
+                    names = set(os.listdir(dest_folder))
+                except FileNotFoundError:
+                    names = set()
+                self._names[dest_folder] = names
+            if name in names:
+                return False
+            names.add(name)
+            return True
+
+def transfer_file(operation, pool):
+    """Performs one planned operation and returns the event reported for it (None if cancelled)."""
+    if pool.cancelled():
+        return None
+
+    observer = pool.observer
+    dest_folder, name = os.path.split(operation.target)
+    pool.folders.ensure(dest_folder)
+
+    if not pool.claims.claim(dest_folder, name):
+        if observer is not None:
+            observer.count("skipped_existing")
+        event = OrganizerEvent(SKIPPED, operation)
+        pool.on_event(event)
+        return event
+
+    if pool.scheduler is not None:
+        with pool.scheduler.transfer(operation):
+            kind = _perform(operation, pool)
+    else:
+        kind = _perform(operation, pool)
+    event = OrganizerEvent(kind, operation)
+    pool.on_event(event)
+    return event
+
+def _perform(operation, pool):
+    observer = pool.observer
+    if observer is not None:
+        started = time.perf_counter()
+
+    def progress(bytes_done):
+        # Only called by the copier for large files, once per chunk.
+        pool.on_event(OrganizerEvent(PROGRESS, operation, bytes_done=bytes_done))
+
+    # The bandwidth cap is charged by the copier, only when data is really copied.
+    throttle = pool.scheduler.charge_bytes if pool.scheduler is not None else None
+    try:
+        if operation.op == MOVE:
+            strategy = pool.mover.move(operation.source, operation.target, operation.size, progress, throttle)
+            kind = MOVED
+        elif operation.op == LINK:
+            try:
+                os.link(operation.source, operation.target)
+                strategy = "link"
+            except OSError:
+                # Cross-device or no hard link support: fall back to a real copy.
+                strategy = pool.copier.copy(operation.source, operation.target, progress, throttle)
+            kind = LINKED
+        else:
+            strategy = pool.copier.copy(operation.source, operation.target, progress, throttle)
+            kind = COPIED
+    except FileExistsError:
+        # The name was free when claimed, but another process (or, on a case-insensitive
+        # filesystem, a name differing only in case) took it since; it is never replaced.
+        if observer is not None:
+            observer.count("skipped_existing")
+        return SKIPPED
+    except FileNotFoundError:
+        # Deleted since it was planned; anything else missing (the destination folder) is a real error.
+        if os.path.lexists(operation.source):
+            raise
+        if observer is not None:
+            observer.count("missing_source")
+        return MISSING
+
+    if observer is not None:
+        observer.count(strategy)
+        observer.record_transfer(operation, started, time.perf_counter() - started)
+    return kind
+
+class TransferPool:
+    """
+    Runs transfer_file calls on a bounded pool of worker threads.
+
+    At most `workers * backlog` transfers are queued at once, so submitting
+    from a huge directory listing does not hold every pending task in memory.
+    The first error raised by a worker is re-raised from close().
+    Every finished file is reported to on_event (printed by default), and
+    large copies also report PROGRESS events while they run; once
+    `cancel` (a threading.Event) is set, queued files are not started. With
+    an io_scheduler.IOScheduler, every copy and move waits for its device
+    slots and ops limit first, and copied data for the bandwidth cap.
+    """
+
+    def __init__(self, workers, backlog=4, copier=None, mover=None, observer=None, on_event=None, cancel=None,
+                 scheduler=None):
+        self.observer = observer
+        self.scheduler = scheduler
+        self.on_event = on_event if on_event is not None else get_output()
+        self.cancel = cancel
+        self.folders = FolderCreator(observer)
+        self.claims = NameClaims()
+        self.copier = copier if copier is not None else CopyBackend()
+        self._owns_mover = mover is None
+        self.mover = mover if mover is not None else MoveBackend(self.copier)
+        self._executor = None
+        self._slots = None
+        self._error = None
+        if workers > 1:
+            # Imported here: concurrent.futures pulls in logging, which single-file runs never need.
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._slots = threading.BoundedSemaphore(workers * backlog)
+
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.is_set()
+
+    def submit(self, operation):
+        if self._error is not None:
+            return
+        if self._executor is None:
+            transfer_file(operation, self)
+            return
+        self._slots.acquire()
+        future = self._executor.submit(transfer_file, operation, self)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        self._slots.release()
+        error = future.exception()
+        if error is not None and self._error is None:
+            self._error = error
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._owns_mover:
+            self.mover.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            if self._owns_mover:
+                self.mover.close()
+            return False
+        self.close()
+        return False
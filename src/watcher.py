@@ -0,0 +1,237 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from classifier import compile_categories
+from scanner import scan_directory, ORGANIZER_FILE_PREFIX
+from folder_utils import new_stats, plan_files, execute_operations
+from output import get_output
+
+# inotify event masks (linux/inotify.h).
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+# Longest sleep while nothing is pending; bounds how long a stop request can take.
+IDLE_WAKEUP = 0.5
+
+class InotifySource:
+    """
+    Reports files created, written or moved into a directory using inotify.
+
+    read_changes() returns (name, complete) pairs; complete is True when the
+    writer closed the file or it was moved in whole, so it needs no settling.
+    """
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.path = os.fspath(path)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        if libc.inotify_add_watch(self.fd, os.fsencode(self.path), IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {self.path}: {os.strerror(error)}")
+
+    def read_changes(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        changes = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; fall back to looking at everything once.
+                    changes.extend((entry.name, False) for entry in scan_directory(self.path))
+                elif name and not mask & (IN_ISDIR | IN_IGNORED):
+                    changes.append((name, bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingSource:
+    """Fallback change source: rescans the directory every `interval` seconds and compares size and mtime."""
+
+    def __init__(self, path, interval=1.0):
+        self.path = os.fspath(path)
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self):
+        snapshot = {}
+        for entry in scan_directory(self.path):
+            try:
+                info = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = (info.st_size, info.st_mtime_ns)
+        return snapshot
+
+    def read_changes(self, timeout):
+        delay = self._next_scan - time.monotonic()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() < self._next_scan:
+            return []
+        self._next_scan = time.monotonic() + self.interval
+        previous = self._snapshot
+        self._snapshot = self._scan()
+        return [(name, False) for name, signature in self._snapshot.items() if previous.get(name) != signature]
+
+    def close(self):
+        pass
+
+def open_change_source(path, poll_interval=1.0, use_inotify=None):
+    """Returns an InotifySource where inotify works, else a PollingSource (use_inotify=False forces polling)."""
+    if use_inotify is not False and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(path)
+        except (OSError, AttributeError):
+            if use_inotify:
+                raise
+    return PollingSource(path, poll_interval)
+
+def _signature(path):
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    return info.st_size, info.st_mtime_ns
+
+class _Pending:
+    __slots__ = ("signature", "since", "complete")
+
+    def __init__(self, signature, since, complete):
+        self.signature = signature
+        self.since = since
+        self.complete = complete
+
+def watch_directory(source_dir, dest_dir, categories, same_place=False, workers=1, debounce=0.2, settle=1.0,
+                    max_delay=1.0, poll_interval=1.0, use_inotify=None, stats=None, on_event=None, on_batch=None, stop=None):
+    """
+    Keeps organizing files as they arrive in source_dir until `stop` is set (or Ctrl+C).
+
+    Files already present are organized first. Arrivals are collected until no
+    new event has come in for `debounce` seconds (or a file has waited
+    `max_delay` seconds during a steady stream) and then handled as one batch
+    with the same classification and transfer code as a normal run. A file
+    that was closed after writing or moved in is ready at once; any other file
+    (and every file seen by the polling fallback) must keep the same size and
+    mtime for `settle` seconds first, so half-written files are left alone.
+    Only the top level of source_dir is watched. Cumulative statistics are
+    kept in `stats`; on_batch(operations) is called after each batch. A file
+    deleted before its transfer is reported as missing; a batch that fails
+    with another OSError is reported as a warning and counted in
+    stats["failed_batches"], and watching goes on.
+    """
+    classifier = compile_categories(categories)
+    if stats is None:
+        stats = {}
+    stats.update(new_stats())
+    if stop is None:
+        stop = threading.Event()
+    source_dir = os.fspath(source_dir)
+
+    source = open_change_source(source_dir, poll_interval, use_inotify)
+    pending = {}
+    now = time.monotonic()
+    last_change = now - debounce
+    # Subscribed before this listing, so nothing arriving in between is missed.
+    for entry in scan_directory(source_dir):
+        signature = _signature(entry.path)
+        if signature is not None:
+            pending[entry.name] = _Pending(signature, now, False)
+
+    try:
+        while not stop.is_set():
+            changes = source.read_changes(debounce if pending else IDLE_WAKEUP)
+            now = time.monotonic()
+            for name, complete in changes:
+                if name.startswith(ORGANIZER_FILE_PREFIX):
+                    continue
+                last_change = now
+                signature = _signature(os.path.join(source_dir, name))
+                if signature is None:
+                    pending.pop(name, None)
+                    continue
+                item = pending.get(name)
+                if item is None or item.signature != signature:
+                    pending[name] = _Pending(signature, now, complete)
+                elif complete:
+                    item.complete = True
+
+            if not pending:
+                continue
+            if now - last_change < debounce and now - min(item.since for item in pending.values()) < max_delay:
+                continue
+
+            ready = []
+            for name, item in list(pending.items()):
+                if item.complete:
+                    ready.append(name)
+                    continue
+                signature = _signature(os.path.join(source_dir, name))
+                if signature is None:
+                    del pending[name]
+                elif signature != item.signature:
+                    item.signature = signature
+                    item.since = now
+                elif now - item.since >= settle:
+                    ready.append(name)
+            if ready:
+                for name in ready:
+                    del pending[name]
+                try:
+                    _organize_batch(source_dir, dest_dir, classifier, ready, same_place, workers, stats, on_event,
+                                    stop, on_batch)
+                except OSError as error:
+                    # One unreadable file or a full disk must not end a resident watcher.
+                    stats["failed_batches"] = stats.get("failed_batches", 0) + 1
+                    get_output().warning(f"Could not organize {len(ready)} new file(s): {error}")
+    finally:
+        source.close()
+    return stats
+
+def _organize_batch(source_dir, dest_dir, classifier, names, same_place, workers, stats, on_event, stop, on_batch):
+    paths = [os.path.join(source_dir, name) for name in sorted(names)]
+    operations = list(plan_files(paths, dest_dir, classifier, stats, same_place=same_place))
+    batch_stats = {}
+    execute_operations(operations, workers=workers, stats=batch_stats, on_event=on_event, cancel=stop)
+    for key in ("copy_strategies", "move_strategies"):
+        for strategy, usage in batch_stats.get(key, {}).items():
+            total = stats.setdefault(key, {}).setdefault(strategy, {"files": 0, "bytes": 0})
+            total["files"] += usage["files"]
+            total["bytes"] += usage["bytes"]
+    if batch_stats.get("missing_files"):
+        stats["missing_files"] = stats.get("missing_files", 0) + batch_stats["missing_files"]
+    if batch_stats.get("cancelled"):
+        stats["cancelled"] = True
+    if on_batch is not None:
+        on_batch(operations)
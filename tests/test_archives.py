@@ -0,0 +1,106 @@
+import io
+import json
+import os
+import sys
+import tarfile
+import zipfile
+import pytest
+
+# Add src to path to allow importing archives
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from archives import archive_members, member_file_name, process_archives, is_archive, MANIFEST_SUFFIX
+from folder_utils import organize_files_in_destination, format_report
+from output import Output, QUIET, set_output
+
+MTIME = 1_600_000_000
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    with zipfile.ZipFile(source / "photos.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("holiday/", "")
+        archive.writestr("holiday/beach.jpg", b"beach" * 100)
+        archive.writestr(zipfile.ZipInfo("scans/letter.pdf", date_time=(2020, 9, 13, 12, 26, 40)), b"letter")
+        archive.writestr("notes.xyz", b"notes")
+    with tarfile.open(source / "backup.tar.gz", "w:gz") as archive:
+        for name, data in (("docs/report.pdf", b"report"), ("docs/beach.jpg", b"another beach")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = MTIME
+            archive.addfile(info, io.BytesIO(data))
+    (source / "readme.pdf").write_text("not an archive")
+    return source
+
+@pytest.fixture
+def quiet():
+    previous = set_output(Output(level=QUIET))
+    yield
+    set_output(previous)
+
+def members(path):
+    return [(member.name, member.size) for member, _ in archive_members(str(path))]
+
+def test_archive_members(source):
+    assert members(source / "photos.zip") == [("holiday/beach.jpg", 500), ("scans/letter.pdf", 6), ("notes.xyz", 5)]
+    assert members(source / "backup.tar.gz") == [("docs/report.pdf", 6), ("docs/beach.jpg", 13)]
+
+def test_member_file_name():
+    assert member_file_name("../../etc/passwd") == "passwd"
+    assert member_file_name("scans\\letter.pdf") == "letter.pdf"
+    assert member_file_name("..") is None
+    assert is_archive("BACKUP.TGZ") and is_archive("a.zip") and not is_archive("song.gz")
+
+def test_manifest_mode(source, tmp_path, categories_dict, quiet):
+    dest = tmp_path / "dest"
+    stats = organize_files_in_destination(source, dest, categories_dict, archives="manifest")
+
+    lines = [json.loads(line) for line in (dest / "Archives" / ("photos.zip" + MANIFEST_SUFFIX)).read_text().splitlines()]
+    assert [line.get("category") for line in lines[:3]] == ["Images", "Documents", "Others"]
+    assert lines[3] == {"archive": "photos.zip", "members": 3, "categories": {"Images": 1, "Documents": 1, "Others": 1}}
+    # .tar.gz is not an Archives extension in this configuration, but it is still read.
+    assert (dest / "Others" / ("backup.tar.gz" + MANIFEST_SUFFIX)).exists()
+
+    assert stats["archives"]["archives"] == 2
+    assert stats["archives"]["members"] == 5
+    assert stats["archives"]["categories"] == {"Images": 2, "Documents": 2, "Others": 1}
+    assert not (dest / "Images").exists()
+    report = format_report(stats)
+    assert "Archives read: 2 (5 files inside)" in report
+    assert "Files inside archives per category:" in report
+
+def test_extract_mode(source, tmp_path, categories_dict, quiet):
+    dest = tmp_path / "dest"
+    stats = organize_files_in_destination(source, dest, categories_dict, archives="extract", workers=2)
+
+    assert (dest / "Documents" / "letter.pdf").read_bytes() == b"letter"
+    assert (dest / "Documents" / "report.pdf").stat().st_mtime == MTIME
+    assert (dest / "Others" / "notes.xyz").read_bytes() == b"notes"
+    # Both archives contain a beach.jpg; only the first one extracted is kept.
+    assert (dest / "Images" / "beach.jpg").read_bytes() in (b"beach" * 100, b"another beach")
+    assert (dest / "Archives" / "photos.zip").exists()
+    assert not any(name.endswith(MANIFEST_SUFFIX) for name in os.listdir(dest / "Archives"))
+    assert stats["archives"]["extracted"] == 4
+    assert stats["archives"]["skipped"] == 1
+    assert "Files extracted from archives: 4 (1 already existed)" in format_report(stats)
+
+def test_unreadable_archive_is_reported(source, tmp_path, categories_dict):
+    (source / "broken.zip").write_bytes(b"PK\x03\x04 not really a zip")
+    stream = io.StringIO()
+    previous = set_output(Output(stream=stream, progress_interval=0))
+    try:
+        stats = organize_files_in_destination(source, tmp_path / "dest", categories_dict, archives="manifest")
+    finally:
+        set_output(previous)
+
+    assert stats["archives"]["errors"] == 1
+    assert stats["archives"]["archives"] == 2
+    assert "Could not read archive" in stream.getvalue()
+    assert not any(name.startswith(".") for name in os.listdir(tmp_path / "dest" / "Archives"))
+
+def test_unknown_mode(source, tmp_path, categories_dict):
+    with pytest.raises(ValueError, match="Unknown archive mode"):
+        process_archives([], tmp_path, categories_dict, {}, mode="unpack")
+    with pytest.raises(ValueError, match="Unknown archive mode"):
+        organize_files_in_destination(source, tmp_path / "dest", categories_dict, archives="unpack")
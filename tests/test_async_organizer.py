@@ -0,0 +1,58 @@
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from async_organizer import organize_files_async
+from folder_utils import organize_files_in_destination
+from events import COPIED, MOVED, SCAN_COMPLETE
+
+def collect(source, dest, categories, **kwargs):
+    async def run():
+        stats = {}
+        events = [event async for event in organize_files_async(source, dest, categories, stats=stats, **kwargs)]
+        return events, stats
+    return asyncio.run(run())
+
+def make_files(directory, count):
+    directory.mkdir(exist_ok=True)
+    for number in range(count):
+        (directory / f"file{number}.{'jpg' if number % 2 else 'pdf'}").write_text("x" * number)
+
+def test_async_results_match_cli(tmp_path, categories_dict):
+    make_files(tmp_path / "source", 12)
+
+    sync_stats = organize_files_in_destination(tmp_path / "source", tmp_path / "sync", categories_dict, workers=4, on_event=lambda event: None)
+    events, async_stats = collect(tmp_path / "source", tmp_path / "async", categories_dict, concurrency=4)
+
+    assert async_stats == sync_stats
+    assert sorted(event.kind for event in events) == [COPIED] * 12 + [SCAN_COMPLETE]
+    assert sorted(os.listdir(tmp_path / "async" / "Images")) == sorted(os.listdir(tmp_path / "sync" / "Images"))
+
+def test_async_move_in_place(tmp_path, categories_dict):
+    make_files(tmp_path / "source", 4)
+
+    events, stats = collect(tmp_path / "source", tmp_path / "source", categories_dict, same_place=True)
+
+    assert [event.kind for event in events].count(MOVED) == 4
+    assert stats["move_strategies"]["rename"]["files"] == 4
+    assert len(os.listdir(tmp_path / "source" / "Documents")) == 2
+
+def test_closing_early_cancels_and_applies_backpressure(tmp_path, categories_dict):
+    make_files(tmp_path / "source", 40)
+
+    async def run():
+        stats = {}
+        events = organize_files_async(tmp_path / "source", tmp_path / "dest", categories_dict, concurrency=1, stats=stats)
+        first = await events.__anext__()
+        await asyncio.sleep(0.05)
+        await events.aclose()
+        return first, stats
+    first, stats = asyncio.run(run())
+
+    copied = sum(len(files) for _, _, files in os.walk(tmp_path / "dest"))
+    assert first.kind == COPIED
+    assert stats["cancelled"] is True
+    # Transfers wait for the consumer: only a few files beyond the first one ran.
+    assert copied <= 4
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+import json
+
+# Add the project root and benchmarks to path to allow importing the corpus generator and harness
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from create_dummy_files import generate_corpus, parse_size, size_sampler, load_extensions
+from bench_organizer import run_benchmark, compare_to_baseline, main as bench_main
+
+def test_parse_size():
+    assert parse_size("512") == 512
+    assert parse_size("4K") == 4096
+    assert parse_size("1.5m") == 1572864
+
+def test_unknown_size_distribution():
+    import random
+    with pytest.raises(ValueError, match="Unknown size distribution"):
+        size_sampler("gaussian:1", random.Random(0))
+
+def test_load_extensions_reads_rule_objects(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"categories": {
+        "Images": [".jpg", ".png"],
+        "Large Videos": {"extensions": [".mp4"], "min_size": "100M"},
+        "Old": {"older_than_days": 365},
+    }}))
+    assert load_extensions(config) == [".jpg", ".png", ".mp4"]
+
+def test_generate_corpus_layout(tmp_path):
+    summary = generate_corpus(tmp_path / "corpus", file_count=60, sizes="fixed:100", depth=2, fanout=2,
+                              duplicate_ratio=0.5, seed=1)
+
+    files = [path for path in (tmp_path / "corpus").rglob("*") if path.is_file()]
+    assert len(files) == 60
+    assert summary["directories"] == 1 + 2 + 4
+    assert summary["total_size"] == 6000
+    assert 0 < summary["duplicates"] < 60
+    assert all(path.stat().st_size == 100 for path in files)
+
+def test_generate_corpus_is_deterministic(tmp_path):
+    first = generate_corpus(tmp_path / "a", file_count=20, seed=3)
+    second = generate_corpus(tmp_path / "b", file_count=20, seed=3)
+    assert first == second
+    assert sorted(p.name for p in (tmp_path / "a").iterdir()) == sorted(p.name for p in (tmp_path / "b").iterdir())
+
+def test_run_benchmark_reports_phases(tmp_path):
+    results = run_benchmark(tmp_path, files=50, sizes="fixed:1K", workers=2)
+
+    assert {"scan", "stat", "classify", "transfer", "total"} <= set(results["phases"])
+    assert results["phases"]["total"]["mb_per_s"] is not None
+    assert results["counters"]["classify"] == 50
+    assert sum(strategy["files"] for strategy in results["strategies"].values()) == 50
+
+def test_compare_to_baseline():
+    baseline = {"phases": {"scan": {"files_per_s": 1000.0}, "transfer": {"files_per_s": 100.0}}}
+    results = {"phases": {"scan": {"files_per_s": 950.0}, "transfer": {"files_per_s": 50.0}}}
+    regressions = compare_to_baseline(results, baseline, tolerance=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("transfer")
+
+def test_bench_main_writes_json(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    assert bench_main(["--files", "20", "--sizes", "fixed:10", "--root", str(tmp_path), "--output", str(output)]) == 0
+    assert json.loads(output.read_text())["corpus"]["files"] == 20
+
+def test_plan_memory_benchmark(capsys):
+    from bench_plan_memory import main as memory_main
+
+    assert memory_main(["--files", "5000", "--sample", "1000"]) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert results["plan_bytes_per_file"] < 100 < results["list_bytes_per_file"]
+    assert memory_main(["--files", "1000", "--sample", "0", "--limit", "1"]) == 1
+
+def test_makespan_benchmark(tmp_path):
+    from bench_makespan import run_benchmark as makespan_benchmark, simulate
+    from plan import PlannedOperation, COPY
+
+    operations = [PlannedOperation(name, "", COPY, 0, "Others") for name in ("small1", "small2", "big")]
+    costs = {"small1": 1.0, "small2": 1.0, "big": 4.0}
+    assert simulate(operations, costs, workers=2) == 5.0
+    assert simulate(operations[::-1], costs, workers=2) == 4.0
+
+    results = makespan_benchmark(tmp_path, files=30, sizes="uniform:1:20K", workers=2, repeat=1)
+    assert set(results["simulated_makespan_seconds"]["largest_first_speedup"]) == {"listing", "smallest_first"}
+    assert results["makespan_seconds"]["largest_first"] > 0
@@ -0,0 +1,59 @@
+import pytest
+import sys
+import os
+
+# Add src to path to allow importing classifier
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from classifier import CategoryClassifier, compile_categories
+from folder_utils import organize_files_in_destination
+
+def test_classify_known_extensions(categories_dict):
+    classifier = CategoryClassifier(categories_dict)
+    assert classifier.classify("photo.jpeg") == "Images"
+    assert classifier.classify("report.docx") == "Documents"
+    assert classifier.classify("backup.rar") == "Archives"
+
+def test_classify_unknown_goes_to_others(categories_dict):
+    classifier = CategoryClassifier(categories_dict)
+    assert classifier.classify("notes.xyz") == "Others"
+    assert classifier.classify("another_unknown") == "Others"
+    assert classifier.lookup("notes.xyz") is None
+
+def test_classify_is_case_insensitive():
+    classifier = CategoryClassifier({"Images": [".JPG", "png"]})
+    assert classifier.classify("HOLIDAY.jpg") == "Images"
+    assert classifier.classify("icon.PNG") == "Images"
+
+def test_multi_part_suffix_wins_over_single():
+    classifier = CategoryClassifier({"Archives": [".gz"], "Tarballs": [".tar.gz"]})
+    assert classifier.classify("backup.tar.gz") == "Tarballs"
+    assert classifier.classify("log.gz") == "Archives"
+    assert classifier.classify("my.report.v2.tar.gz") == "Tarballs"
+
+def test_hidden_files_have_no_extension():
+    classifier = CategoryClassifier({"Archives": [".gz"]})
+    assert classifier.classify(".gz") == "Others"
+    assert classifier.classify(".cache.gz") == "Archives"
+
+def test_first_category_wins_on_conflict():
+    classifier = CategoryClassifier({"Documents": [".txt"], "Code": [".txt", ".py"]})
+    assert classifier.classify("readme.txt") == "Documents"
+    assert classifier.conflicts == {".txt": ["Documents", "Code"]}
+
+def test_compile_categories_reuses_classifier(categories_dict):
+    classifier = CategoryClassifier(categories_dict)
+    assert compile_categories(classifier) is classifier
+    assert isinstance(compile_categories(categories_dict), CategoryClassifier)
+
+def test_organize_accepts_compiled_classifier(tmp_path, categories_dict):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "photo.JPEG").touch()
+    classifier = CategoryClassifier(categories_dict)
+
+    for run in ("first", "second"):
+        dest = tmp_path / run
+        stats = organize_files_in_destination(source, dest, classifier)
+        assert (dest / "Images" / "photo.JPEG").exists()
+        assert stats["files_per_category"] == {"Images": 1}
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import config_cache
+from config_cache import load_classifier, default_cache_path
+
+@pytest.fixture
+def config_file(tmp_path, categories_dict):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"categories": categories_dict}))
+    return path
+
+def fail_to_load(config_path=None):
+    raise AssertionError("config.json should not have been loaded")
+
+def test_unchanged_config_is_served_from_cache(config_file, monkeypatch):
+    first = load_classifier(config_file)
+    assert default_cache_path(config_file).exists()
+
+    monkeypatch.setattr(config_cache, "load_categories", fail_to_load)
+    cached = load_classifier(config_file)
+
+    assert cached.classify("photo.JPG") == "Images"
+    assert cached.categories == first.categories
+
+def test_touched_but_identical_config_reuses_cache(config_file, monkeypatch):
+    load_classifier(config_file)
+    info = os.stat(config_file)
+    os.utime(config_file, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+
+    monkeypatch.setattr(config_cache, "load_categories", fail_to_load)
+    assert load_classifier(config_file).classify("a.zip") == "Archives"
+
+def test_changed_config_is_reloaded(config_file):
+    load_classifier(config_file)
+    config_file.write_text(json.dumps({"categories": {"Pictures": [".jpg", ".png"]}}))
+    info = os.stat(config_file)
+    os.utime(config_file, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+
+    classifier = load_classifier(config_file)
+
+    assert classifier.classify("photo.jpg") == "Pictures"
+    assert classifier.classify("a.zip") == "Others"
+
+def test_invalid_config_still_raises(config_file):
+    config_file.write_text(json.dumps({"categories": []}))
+    with pytest.raises(ValueError, match="must be a dictionary"):
+        load_classifier(config_file)
+
+def test_corrupt_cache_is_ignored(config_file):
+    default_cache_path(config_file).write_bytes(b"not a cache")
+    assert load_classifier(config_file).classify("report.pdf") == "Documents"
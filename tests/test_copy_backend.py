@@ -0,0 +1,235 @@
+import pytest
+import sys
+import os
+import errno
+import stat
+
+# Add src to path to allow importing copy_backend
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import copy_backend
+from copy_backend import CopyBackend, HARDLINK, COPY2
+from folder_utils import organize_files_in_destination, format_report
+
+@pytest.fixture
+def source_file(tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(300_000))
+    os.chmod(source, 0o640)
+    return source
+
+def test_copy_preserves_content_and_mode(tmp_path, source_file):
+    backend = CopyBackend()
+    target = tmp_path / "copy.mp4"
+
+    strategy = backend.copy(str(source_file), str(target))
+
+    assert target.read_bytes() == source_file.read_bytes()
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
+    assert backend.usage == {strategy: {"files": 1, "bytes": 300_000}}
+    assert target.stat().st_ino != source_file.stat().st_ino
+
+def test_hardlink_is_opt_in(tmp_path, source_file):
+    backend = CopyBackend(allow_hardlink=True)
+    target = tmp_path / "link.mp4"
+
+    assert backend.copy(str(source_file), str(target)) == HARDLINK
+    assert target.stat().st_ino == source_file.stat().st_ino
+
+def test_unsupported_strategies_fall_through(tmp_path, source_file, monkeypatch):
+    calls = []
+
+    def unsupported(name):
+        def copy_function(src_fd, dst_fd, size):
+            calls.append(name)
+            os.write(dst_fd, b"partial")
+            raise OSError(errno.EXDEV, "not here")
+        return copy_function
+
+    monkeypatch.setattr(copy_backend, "_available_strategies", lambda: [("a", unsupported("a")), ("b", unsupported("b"))])
+    backend = CopyBackend()
+
+    assert backend.copy(str(source_file), str(tmp_path / "one.mp4")) == COPY2
+    assert backend.copy(str(source_file), str(tmp_path / "two.mp4")) == COPY2
+
+    # Each failing strategy is only tried once per device pair.
+    assert calls == ["a", "b"]
+    assert (tmp_path / "one.mp4").read_bytes() == source_file.read_bytes()
+
+def test_real_errors_are_raised(tmp_path, source_file, monkeypatch):
+    def failing(src_fd, dst_fd, size):
+        raise OSError(errno.ENOSPC, "disk full")
+
+    monkeypatch.setattr(copy_backend, "_available_strategies", lambda: [("a", failing)])
+    with pytest.raises(OSError):
+        CopyBackend().copy(str(source_file), str(tmp_path / "one.mp4"))
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(copy_backend, "_LARGE_CHUNK", 64 * 1024)
+
+def test_large_file_is_copied_in_chunks_with_progress(tmp_path, source_file, small_chunks, monkeypatch):
+    advice = []
+    if hasattr(os, "posix_fadvise"):
+        real_fadvise = os.posix_fadvise
+        def fadvise(fd, offset, length, hint):
+            advice.append(hint)
+            real_fadvise(fd, offset, length, hint)
+        monkeypatch.setattr(os, "posix_fadvise", fadvise)
+    # Reflink would clone the file in one step; leave only the chunked strategies.
+    strategies = [entry for entry in copy_backend._available_strategies() if entry[0] != copy_backend.REFLINK]
+    monkeypatch.setattr(copy_backend, "_available_strategies", lambda: strategies)
+    progress = []
+    backend = CopyBackend(large_file_size=100_000)
+    target = tmp_path / "copy.mp4"
+
+    backend.copy(str(source_file), str(target), progress.append)
+
+    assert target.read_bytes() == source_file.read_bytes()
+    assert progress == [65536, 131072, 196608, 262144, 300000]
+    if hasattr(os, "posix_fadvise"):
+        assert os.POSIX_FADV_SEQUENTIAL in advice
+        assert os.POSIX_FADV_DONTNEED in advice
+
+def test_large_file_read_write_fallback(tmp_path, source_file, small_chunks, monkeypatch):
+    monkeypatch.setattr(copy_backend, "_available_strategies", lambda: [])
+    progress = []
+    backend = CopyBackend(large_file_size=100_000)
+
+    assert backend.copy(str(source_file), str(tmp_path / "large.mp4"), progress.append) == copy_backend.READ_WRITE
+    assert backend.copy(str(tmp_path / "large.mp4"), str(tmp_path / "copy.mp4")) == copy_backend.READ_WRITE
+    assert (tmp_path / "copy.mp4").read_bytes() == source_file.read_bytes()
+    assert stat.S_IMODE((tmp_path / "copy.mp4").stat().st_mode) == 0o640
+    assert progress[-1] == 300_000
+
+    small = tmp_path / "small.txt"
+    small.write_text("small")
+    assert backend.copy(str(small), str(tmp_path / "small-copy.txt"), progress.append) == COPY2
+    # Small files do not report progress.
+    assert progress[-1] == 300_000
+
+def test_strategies_reported_in_stats(tmp_path, categories_dict):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "photo.jpeg").write_bytes(b"x" * 2048)
+    dest = tmp_path / "dest"
+
+    stats = organize_files_in_destination(source, dest, categories_dict, hardlink=True)
+
+    assert stats["copy_strategies"] == {HARDLINK: {"files": 1, "bytes": 2048}}
+    assert "- hardlink: 1 files, 2.00 KB" in format_report(stats)
+
+from copy_backend import MoveBackend, RENAME, COPY_DELETE
+from events import SKIPPED
+
+def test_move_uses_rename_on_same_device(tmp_path):
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "Images").mkdir()
+    source = tmp_path / "inbox" / "photo.jpeg"
+    source.write_text("image")
+    inode = source.stat().st_ino
+    mover = MoveBackend()
+
+    strategy = mover.move(str(source), str(tmp_path / "Images" / "photo.jpeg"), 5)
+    mover.close()
+
+    assert strategy == RENAME
+    assert not source.exists()
+    assert (tmp_path / "Images" / "photo.jpeg").stat().st_ino == inode
+    assert mover.usage == {RENAME: {"files": 1, "bytes": 5}}
+
+def test_move_reuses_directory_handles(tmp_path, monkeypatch):
+    (tmp_path / "Images").mkdir()
+    for i in range(5):
+        (tmp_path / f"photo{i}.jpeg").touch()
+    opened = []
+    real_open = os.open
+    monkeypatch.setattr(os, "open", lambda path, flags, *args, **kwargs: opened.append(path) or real_open(path, flags, *args, **kwargs))
+    mover = MoveBackend()
+
+    for i in range(5):
+        mover.move(str(tmp_path / f"photo{i}.jpeg"), str(tmp_path / "Images" / f"photo{i}.jpeg"))
+    mover.close()
+
+    assert sorted(opened) == sorted([str(tmp_path), str(tmp_path / "Images")])
+
+def test_move_across_devices_copies_and_deletes(tmp_path, monkeypatch):
+    (tmp_path / "Images").mkdir()
+    source = tmp_path / "photo.jpeg"
+    source.write_text("image")
+    os.utime(source, ns=(10**9, 10**9))
+
+    def cross_device(*args, **kwargs):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(copy_backend, "rename_noreplace", cross_device)
+    mover = MoveBackend()
+    strategy = mover.move(str(source), str(tmp_path / "Images" / "photo.jpeg"), 5)
+    mover.close()
+
+    target = tmp_path / "Images" / "photo.jpeg"
+    assert strategy == COPY_DELETE
+    assert not source.exists()
+    assert target.read_text() == "image"
+    assert target.stat().st_mtime_ns == 10**9
+
+@pytest.mark.parametrize("renameat2", [True, False])
+def test_move_never_replaces_an_existing_target(tmp_path, monkeypatch, renameat2):
+    if not renameat2:
+        # Platforms without renameat2 use link + unlink.
+        monkeypatch.setattr(copy_backend, "_renameat2", False)
+    (tmp_path / "Images").mkdir()
+    (tmp_path / "Images" / "photo.jpeg").write_text("already there")
+    source = tmp_path / "photo.jpeg"
+    source.write_text("image")
+
+    mover = MoveBackend()
+    try:
+        with pytest.raises(FileExistsError):
+            mover.move(str(source), str(tmp_path / "Images" / "photo.jpeg"), 5)
+        with pytest.raises(FileExistsError):
+            copy_backend.rename_noreplace(str(source), str(tmp_path / "Images" / "photo.jpeg"))
+        assert mover.move(str(source), str(tmp_path / "Images" / "other.jpeg"), 5) == RENAME
+    finally:
+        mover.close()
+    assert (tmp_path / "Images" / "photo.jpeg").read_text() == "already there"
+    assert (tmp_path / "Images" / "other.jpeg").read_text() == "image"
+    assert not source.exists()
+
+def test_taken_target_is_skipped(tmp_path, categories_dict, monkeypatch):
+    import transfer
+    (tmp_path / "photo.jpeg").write_text("image")
+    (tmp_path / "Images").mkdir()
+    # The target appears after its folder was listed, e.g. written by another process.
+    real_claim = transfer.NameClaims.claim
+    def claim_then_race(self, dest_folder, name):
+        claimed = real_claim(self, dest_folder, name)
+        (tmp_path / "Images" / "photo.jpeg").write_text("other process")
+        return claimed
+    monkeypatch.setattr(transfer.NameClaims, "claim", claim_then_race)
+
+    events = []
+    organize_files_in_destination(tmp_path, tmp_path, categories_dict, same_place=True, on_event=events.append)
+
+    assert [event.kind for event in events if event.operation is not None] == [SKIPPED]
+    assert (tmp_path / "Images" / "photo.jpeg").read_text() == "other process"
+    assert (tmp_path / "photo.jpeg").read_text() == "image"
+
+def test_rename_without_hard_links_checks_the_target(tmp_path, monkeypatch):
+    monkeypatch.setattr(copy_backend, "_renameat2", False)
+    def no_links(*args, **kwargs):
+        raise OSError(errno.EPERM, "hard links not supported")
+    monkeypatch.setattr(os, "link", no_links)
+    (tmp_path / "a").write_text("a")
+    (tmp_path / "b").write_text("b")
+
+    with pytest.raises(FileExistsError):
+        copy_backend.rename_noreplace(str(tmp_path / "a"), str(tmp_path / "b"))
+    copy_backend.rename_noreplace(str(tmp_path / "a"), str(tmp_path / "c"))
+    assert (tmp_path / "c").read_text() == "a" and not (tmp_path / "a").exists()
+
+def test_in_place_moves_report_strategy(tmp_path, categories_dict):
+    (tmp_path / "photo.jpeg").write_text("image")
+    stats = organize_files_in_destination(tmp_path, tmp_path, categories_dict, same_place=True)
+    assert stats["move_strategies"] == {RENAME: {"files": 1, "bytes": 5}}
+    assert "Move strategies:" in format_report(stats)
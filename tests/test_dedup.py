@@ -0,0 +1,123 @@
+import pytest
+import sys
+import os
+import hashlib
+
+# Add src to path to allow importing dedup
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dedup import deduplicate, file_digest
+from plan import LINK, COPY, PlannedOperation
+from folder_utils import execute_operations, new_stats
+from folder_utils import organize_files_in_destination, format_report
+
+@pytest.fixture
+def dirs(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    dest = tmp_path / "dest"
+    return source, dest
+
+def test_file_digest_streams_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("dedup.HASH_CHUNK_SIZE", 7)
+    a = tmp_path / "a"
+    b = tmp_path / "b"
+    a.write_bytes(b"x" * 100)
+    b.write_bytes(b"x" * 99 + b"y")
+    assert file_digest(a) == hashlib.blake2b(b"x" * 100).digest()
+    assert file_digest(a) != file_digest(b)
+
+def test_report_policy_counts_but_copies(dirs, categories_dict):
+    source, dest = dirs
+    (source / "a.jpeg").write_text("same picture")
+    (source / "b.jpeg").write_text("same picture")
+    (source / "c.jpeg").write_text("other picture")
+
+    stats = organize_files_in_destination(source, dest, categories_dict, dedup="report")
+
+    assert stats["duplicates"] == 1
+    assert stats["duplicate_bytes"] == len("same picture")
+    assert len(list((dest / "Images").iterdir())) == 3
+
+def test_skip_policy_drops_duplicates(dirs, categories_dict):
+    source, dest = dirs
+    (source / "a.jpeg").write_text("same picture")
+    (source / "b.jpeg").write_text("same picture")
+
+    organize_files_in_destination(source, dest, categories_dict, dedup="skip")
+
+    assert len(list((dest / "Images").iterdir())) == 1
+
+def test_hardlink_policy_links_duplicates(dirs, categories_dict):
+    source, dest = dirs
+    (source / "a.jpeg").write_text("same picture")
+    (source / "b.jpeg").write_text("same picture")
+
+    organize_files_in_destination(source, dest, categories_dict, dedup="hardlink", workers=4)
+
+    a = (dest / "Images" / "a.jpeg").stat()
+    b = (dest / "Images" / "b.jpeg").stat()
+    assert (a.st_dev, a.st_ino) == (b.st_dev, b.st_ino)
+
+def test_repeated_target_never_owns_content(dirs):
+    source, dest = dirs
+    for folder, name, content in (("b", "x.jpg", "AAAA"), ("c", "x.jpg", "BBBB"), ("a", "y.jpg", "BBBB")):
+        (source / folder).mkdir()
+        (source / folder / name).write_text(content)
+    # The order a recursive walk may produce: both x.jpg want Images/x.jpg.
+    operations = [PlannedOperation(str(source / folder / name), str(dest / "Images" / name), COPY, 4, "Images")
+                  for folder, name in (("b", "x.jpg"), ("c", "x.jpg"), ("a", "y.jpg"))]
+    stats = new_stats()
+
+    planned = list(deduplicate(operations, stats, policy="hardlink"))
+    execute_operations(planned, stats=stats, on_event=lambda event: None)
+
+    assert all(operation.op == COPY for operation in planned)
+    assert stats["name_conflicts"] == 1
+    assert stats["duplicates"] == 0
+    assert (dest / "Images" / "x.jpg").read_text() == "AAAA"
+    assert (dest / "Images" / "y.jpg").read_text() == "BBBB"
+
+def test_detects_duplicates_of_existing_destination_files(dirs, categories_dict):
+    source, dest = dirs
+    (dest / "Images").mkdir(parents=True)
+    (dest / "Images" / "old_name.jpeg").write_text("same picture")
+    (dest / "Images" / "clash.jpeg").write_text("different")
+    (source / "new_name.jpeg").write_text("same picture")
+    (source / "clash.jpeg").write_text("also different")
+
+    stats = organize_files_in_destination(source, dest, categories_dict, dedup="skip")
+
+    assert stats["duplicates"] == 1
+    assert stats["name_conflicts"] == 1
+    assert not (dest / "Images" / "new_name.jpeg").exists()
+    assert (dest / "Images" / "clash.jpeg").read_text() == "different"
+    assert "Duplicate files: 1" in format_report(stats)
+
+def test_only_colliding_sizes_are_hashed(dirs, categories_dict, monkeypatch):
+    source, dest = dirs
+    (source / "a.jpeg").write_text("1")
+    (source / "b.jpeg").write_text("22")
+    (source / "c.jpeg").write_text("33")
+    hashed = []
+    import dedup
+    original = dedup.file_digest
+    monkeypatch.setattr("dedup.file_digest", lambda path: hashed.append(os.path.basename(path)) or original(path))
+
+    organize_files_in_destination(source, dest, categories_dict, dedup="report")
+
+    assert sorted(hashed) == ["b.jpeg", "c.jpeg"]
+
+def test_dry_run_shows_links(dirs, categories_dict):
+    source, dest = dirs
+    (source / "a.jpeg").write_text("same picture")
+    (source / "b.jpeg").write_text("same picture")
+
+    stats = organize_files_in_destination(source, dest, categories_dict, dry_run=True, dedup="hardlink")
+
+    assert [op.op for op in stats["plan"]].count(LINK) == 1
+    assert not dest.exists()
+
+def test_unknown_policy():
+    with pytest.raises(ValueError, match="Unknown duplicate policy"):
+        deduplicate([], {}, policy="delete")
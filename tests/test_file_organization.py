@@ -2,12 +2,14 @@ import pytest
 import sys
 import os
 import shutil
+import threading
 from pathlib import Path
 
 # Add src to path to allow importing folder_utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
-from folder_utils import organize_files_in_destination
+from folder_utils import organize_files_in_destination, format_report
+from events import COPIED, SCAN_COMPLETE, CANCELLED
 
 @pytest.fixture
 def test_dirs(tmp_path):
@@ -55,3 +57,138 @@ def test_move_files(test_dirs, categories_dict):
     # Check that original files are gone from the root of source
     assert not (source_dir / "photo.jpeg").exists()
     assert not (source_dir / "report.docx").exists()
+
+def test_parallel_copy_matches_serial_stats(test_dirs, categories_dict, tmp_path):
+    """
+    Tests that the worker pool produces the same files and stats as the serial path.
+    """
+    source_dir, dest_dir = test_dirs
+    for i in range(40):
+        (source_dir / f"photo{i}.jpeg").write_text("x" * i)
+        (source_dir / f"report{i}.docx").write_text("y" * i)
+        (source_dir / f"misc{i}.bin").write_text("z")
+
+    serial_dest = tmp_path / "serial"
+    serial_stats = organize_files_in_destination(source_dir, serial_dest, categories_dict)
+    parallel_stats = organize_files_in_destination(source_dir, dest_dir, categories_dict, workers=8)
+
+    assert parallel_stats == serial_stats
+    assert sorted(p.name for p in (dest_dir / "Images").iterdir()) == sorted(p.name for p in (serial_dest / "Images").iterdir())
+    assert len(list((dest_dir / "Others").iterdir())) == 40
+
+def test_parallel_keeps_skip_if_exists(test_dirs, categories_dict):
+    """
+    Tests that existing destination files are not overwritten by parallel workers.
+    """
+    source_dir, dest_dir = test_dirs
+    (source_dir / "photo.jpeg").write_text("new")
+    (dest_dir / "Images").mkdir()
+    (dest_dir / "Images" / "photo.jpeg").write_text("old")
+
+    organize_files_in_destination(source_dir, dest_dir, categories_dict, workers=4)
+
+    assert (dest_dir / "Images" / "photo.jpeg").read_text() == "old"
+
+def test_parallel_move_files(test_dirs, categories_dict):
+    """
+    Tests that in-place moves work with several workers.
+    """
+    source_dir, _ = test_dirs
+    for i in range(20):
+        (source_dir / f"photo{i}.jpeg").touch()
+
+    organize_files_in_destination(source_dir, source_dir, categories_dict, same_place=True, workers=4)
+
+    assert len(list((source_dir / "Images").iterdir())) == 20
+    assert not list(source_dir.glob("*.jpeg"))
+
+def test_recursive_copy_collects_nested_files(test_dirs, categories_dict):
+    """
+    Tests that recursive mode organizes files from subdirectories and counts them per directory.
+    """
+    source_dir, dest_dir = test_dirs
+    (source_dir / "trip" / "day1").mkdir(parents=True)
+    (source_dir / "top.jpeg").touch()
+    (source_dir / "trip" / "notes.docx").touch()
+    (source_dir / "trip" / "day1" / "beach.jpeg").touch()
+
+    stats = organize_files_in_destination(source_dir, dest_dir, categories_dict, recursive=True)
+
+    assert (dest_dir / "Images" / "top.jpeg").exists()
+    assert (dest_dir / "Images" / "beach.jpeg").exists()
+    assert (dest_dir / "Documents" / "notes.docx").exists()
+    assert stats["total_files"] == 3
+    assert stats["files_per_directory"] == {".": 1, "trip": 1, os.path.join("trip", "day1"): 1}
+
+def test_recursive_in_place_skips_category_folders(test_dirs, categories_dict):
+    """
+    Tests that sorting in place does not re-visit the category folders being filled.
+    """
+    source_dir, _ = test_dirs
+    (source_dir / "Images").mkdir()
+    (source_dir / "Images" / "already.jpeg").touch()
+    (source_dir / "inbox").mkdir()
+    (source_dir / "inbox" / "new.jpeg").touch()
+
+    stats = organize_files_in_destination(source_dir, source_dir, categories_dict, same_place=True, recursive=True)
+
+    assert stats["total_files"] == 1
+    assert (source_dir / "Images" / "new.jpeg").exists()
+    assert (source_dir / "Images" / "already.jpeg").exists()
+
+def test_recursive_max_depth(test_dirs, categories_dict):
+    """
+    Tests that files deeper than max_depth are left alone.
+    """
+    source_dir, dest_dir = test_dirs
+    (source_dir / "deep").mkdir()
+    (source_dir / "deep" / "photo.jpeg").touch()
+
+    stats = organize_files_in_destination(source_dir, dest_dir, categories_dict, recursive=True, max_depth=0)
+
+    assert stats["total_files"] == 0
+
+def test_report_lists_directories():
+    """
+    Tests that per-directory counts from a recursive run appear in the report.
+    """
+    stats = {"total_files": 2, "total_size": 0, "files_per_category": {"Images": 2},
+             "files_per_directory": {".": 1, "trip": 1}}
+    report = format_report(stats)
+    assert "Files per directory:" in report
+    assert "- trip: 1" in report
+    assert "Files per directory:" not in format_report({"total_files": 0, "total_size": 0, "files_per_category": {}})
+
+def test_events_reported_to_sink(test_dirs, categories_dict):
+    """
+    Tests that every transferred file and the end of the scan are reported as events.
+    """
+    source_dir, dest_dir = test_dirs
+    (source_dir / "photo.jpeg").write_text("a")
+    (source_dir / "report.docx").write_text("bb")
+    events = []
+
+    organize_files_in_destination(source_dir, dest_dir, categories_dict, on_event=events.append)
+
+    kinds = sorted(event.kind for event in events)
+    assert kinds == [COPIED, COPIED, SCAN_COMPLETE]
+    scan_complete = next(event for event in events if event.kind == SCAN_COMPLETE)
+    assert scan_complete.total_files == 2
+    assert scan_complete.total_size == 3
+
+def test_cancel_stops_before_transfers(test_dirs, categories_dict):
+    """
+    Tests that a cancelled run transfers nothing and is flagged in stats and the report.
+    """
+    source_dir, dest_dir = test_dirs
+    (source_dir / "photo.jpeg").touch()
+    cancel = threading.Event()
+    cancel.set()
+    events = []
+
+    stats = organize_files_in_destination(source_dir, dest_dir, categories_dict, on_event=events.append, cancel=cancel)
+
+    assert stats["cancelled"] is True
+    assert [event.kind for event in events] == [CANCELLED]
+    assert not (dest_dir / "Images" / "photo.jpeg").exists()
+    assert "cancelled" in format_report(stats)
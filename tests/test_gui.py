@@ -3,6 +3,7 @@ import tkinter as tk
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import threading
 
 # Add src to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
@@ -79,6 +80,7 @@ def test_backend_called_for_copy(mock_validate, mock_load_cat, mock_organize, ap
     mock_load_cat.return_value = {"Images": [".jpg"]}
 
     app.organize_files()
+    app.wait_for_worker()
 
     mock_validate.assert_called_once()
     mock_organize.assert_called_once()
@@ -100,6 +102,7 @@ def test_backend_called_for_move(mock_validate, mock_load_cat, mock_organize, ap
     mock_load_cat.return_value = {"Images": [".jpg"]}
 
     app.organize_files()
+    app.wait_for_worker()
 
     mock_organize.assert_called_once()
     args, kwargs = mock_organize.call_args
@@ -119,6 +122,7 @@ def test_backend_called_for_dry_run(mock_validate, mock_load_cat, mock_organize,
     mock_load_cat.return_value = {"Images": [".jpg"]}
 
     app.organize_files()
+    app.wait_for_worker()
 
     mock_organize.assert_called_once()
     args, kwargs = mock_organize.call_args
@@ -154,6 +158,31 @@ def test_success_shows_report(mock_validate, mock_load_cat, mock_organize, mock_
     app.source_path.set("/source")
     app.dest_path.set("/dest")
     app.organize_files()
+    app.wait_for_worker()
 
     assert app.status_label.cget("text") == "File organization complete!"
     mock_showinfo.assert_called_once_with("Organization Report", report_content)
+
+# 6. Background Worker
+@patch('gui.organize_files_in_destination')
+@patch('gui.load_categories')
+@patch('gui.validate_paths')
+def test_cancel_sets_event_for_running_worker(mock_validate, mock_load_cat, mock_organize, app, monkeypatch):
+    """11. Test that Cancel signals the running worker and the status reflects it."""
+    monkeypatch.setattr("tkinter.messagebox.showinfo", lambda *args, **kwargs: None)
+    release = threading.Event()
+
+    def slow_organize(*args, cancel=None, **kwargs):
+        release.wait(5)
+        return {'total_files': 0, 'total_size': 0, 'files_per_category': {}, 'cancelled': cancel.is_set()}
+    mock_organize.side_effect = slow_organize
+
+    app.source_path.set("/source")
+    app.dest_path.set("/dest")
+    app.organize_files()
+    app.cancel_organize()
+    release.set()
+    app.wait_for_worker()
+
+    assert app.cancel_event.is_set()
+    assert app.status_label.cget("text") == "Organization cancelled."
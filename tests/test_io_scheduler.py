@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+# Add src to path to allow importing io_scheduler
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import io_scheduler
+from io_scheduler import RateLimiter, DeviceGate, IOScheduler, largest_first
+from copy_backend import CopyBackend
+from events import PROGRESS, COPIED
+from transfer import TransferPool
+from plan import PlannedOperation, COPY
+from folder_utils import organize_files_in_destination, format_report
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    clock = [100.0]
+    slept = []
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(io_scheduler.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(io_scheduler.time, "sleep", sleep)
+    return slept
+
+def test_rate_limiter_allows_burst_then_waits(fake_clock):
+    limiter = RateLimiter(rate=10)
+    for _ in range(10):
+        assert limiter.take() == 0
+    assert limiter.take() == pytest.approx(0.1)
+    # A request larger than the burst goes through and is paid for by waiting.
+    assert limiter.take(20) == pytest.approx(2.0)
+    assert fake_clock == [pytest.approx(0.1), pytest.approx(2.0)]
+
+def test_gate_grows_when_calm_and_halves_on_congestion():
+    gate = DeviceGate(max_limit=8)
+    assert gate.limit == 2
+    for _ in range(20):
+        gate.acquire()
+        gate.release(seconds=0.001, size=1024 * 1024)
+    assert gate.limit == 7
+
+    for _ in range(3):
+        gate.acquire()
+        gate.release(seconds=0.1, size=1024 * 1024)
+    assert gate.limit < 7
+    assert gate.limit >= 1
+
+def test_gate_never_exceeds_max_limit():
+    gate = DeviceGate(max_limit=3)
+    for _ in range(50):
+        gate.acquire()
+        gate.release(seconds=0.001, size=1024)
+    assert gate.limit == 3
+
+def test_device_limit_bounds_concurrency(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    operations = []
+    for number in range(24):
+        (source / f"f{number}.bin").write_bytes(b"x" * 100)
+        operations.append(PlannedOperation(str(source / f"f{number}.bin"), str(tmp_path / "dest" / f"f{number}.bin"),
+                                           COPY, 100, "Others"))
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    class SlowCopier:
+        def copy(self, source, target, progress=None, throttle=None):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return "fake"
+
+    scheduler = IOScheduler(device_limit=2, adaptive=False)
+    with TransferPool(8, copier=SlowCopier(), on_event=lambda event: None, scheduler=scheduler) as pool:
+        for operation in operations:
+            pool.submit(operation)
+
+    assert peak[0] == 2
+    assert list(scheduler.limits().values()) == [2]
+
+def test_inode_order(tmp_path):
+    paths = []
+    for number in range(6):
+        path = tmp_path / f"f{number}"
+        path.write_text(str(number))
+        paths.append(path)
+    operations = [PlannedOperation(str(path), str(path) + ".out", COPY, 1, "Others") for path in reversed(paths)]
+
+    ordered = list(IOScheduler(inode_order=True, order_window=4).order(iter(operations)))
+
+    assert sorted(ordered) == sorted(operations)
+    inodes = [os.stat(operation.source).st_ino for operation in ordered]
+    assert inodes[:4] == sorted(inodes[:4])
+    assert inodes[4:] == sorted(inodes[4:])
+    assert IOScheduler().order(operations) is operations
+
+def test_organize_with_bandwidth_cap(tmp_path, categories_dict):
+    source = tmp_path / "source"
+    source.mkdir()
+    for number in range(4):
+        (source / f"f{number}.pdf").write_bytes(b"x" * 512 * 1024)
+    scheduler = IOScheduler(max_mbps=1, inode_order=True)
+
+    started = time.monotonic()
+    stats = organize_files_in_destination(source, tmp_path / "dest", categories_dict, workers=4,
+                                          scheduler=scheduler, on_event=lambda event: None)
+
+    # 2 MB at 1 MB/s with a 1 MB burst takes about a second.
+    assert time.monotonic() - started >= 0.9
+    assert stats["throttled_seconds"] >= 0.9
+    assert len(os.listdir(tmp_path / "dest" / "Documents")) == 4
+    assert "Time spent waiting for rate limits" in format_report(stats)
+
+def test_renames_and_hard_links_are_not_charged_for_bandwidth(tmp_path, categories_dict, fake_clock):
+    source = tmp_path / "source"
+    source.mkdir()
+    for number in range(3):
+        (source / f"f{number}.pdf").write_bytes(b"x" * 4 * 1024 * 1024)
+    scheduler = IOScheduler(max_mbps=2)
+
+    organize_files_in_destination(source, source, categories_dict, same_place=True, scheduler=scheduler,
+                                  on_event=lambda event: None)
+    assert sorted(os.listdir(source / "Documents")) == ["f0.pdf", "f1.pdf", "f2.pdf"]
+    organize_files_in_destination(source / "Documents", tmp_path / "linked", categories_dict, hardlink=True,
+                                  scheduler=scheduler, on_event=lambda event: None)
+    assert (tmp_path / "linked" / "Documents" / "f0.pdf").stat().st_nlink == 2
+
+    assert scheduler.throttled_seconds == 0
+    assert fake_clock == []
+
+    # A real copy of the same data is charged.
+    organize_files_in_destination(source / "Documents", tmp_path / "copied", categories_dict, scheduler=scheduler,
+                                  on_event=lambda event: None)
+    assert scheduler.throttled_seconds > 0
+
+def test_largest_first_within_windows():
+    sizes = [5, 1, 9, 3, 7, 2, 8]
+    operations = [PlannedOperation(f"/src/f{size}", f"/dest/f{size}", COPY, size, "Others") for size in sizes]
+
+    assert [operation.size for operation in largest_first(iter(operations))] == [9, 8, 7, 5, 3, 2, 1]
+    assert [operation.size for operation in largest_first(iter(operations), window=4)] == [9, 5, 3, 1, 8, 7, 2]
+
+def test_large_copies_report_progress(tmp_path, monkeypatch):
+    import copy_backend
+    monkeypatch.setattr(copy_backend, "_LARGE_CHUNK", 64 * 1024)
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(200_000))
+    (tmp_path / "small.txt").write_text("small")
+    events = []
+
+    with TransferPool(1, copier=CopyBackend(large_file_size=100_000), on_event=events.append) as pool:
+        pool.submit(PlannedOperation(str(tmp_path / "small.txt"), str(tmp_path / "dest" / "small.txt"), COPY, 5, "Others"))
+        pool.submit(PlannedOperation(str(source), str(tmp_path / "dest" / "video.mp4"), COPY, 200_000, "Videos"))
+
+    kinds = [event.kind for event in events]
+    assert kinds[0] == COPIED and kinds[-1] == COPIED
+    assert set(kinds[1:-1]) == {PROGRESS}
+    assert events[-2].bytes_done == 200_000
+    assert all(event.operation.size == 200_000 for event in events[1:])
@@ -0,0 +1,155 @@
+import os
+import sys
+import pytest
+
+# Add src to path to allow importing journal
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import copy_backend
+from copy_backend import CopyBackend, PARTIAL_PREFIX
+from events import COPIED, MOVED
+from folder_utils import organize_files_in_destination
+from journal import JOURNAL_NAME, read_journal, resume_run, undo_run
+
+@pytest.fixture
+def inbox(tmp_path):
+    source = tmp_path / "inbox"
+    source.mkdir()
+    for name in ("a.jpg", "b.pdf", "c.zip", "d.docx", "e.txt"):
+        (source / name).write_bytes(name.encode() * 100)
+    return source
+
+def listing(folder):
+    return sorted(str(path.relative_to(folder)) for path in folder.rglob("*") if path.is_file())
+
+def crash_after(count):
+    """on_event that lets `count` files finish and then simulates a crash."""
+    seen = []
+    def on_event(event):
+        if event.kind in (COPIED, MOVED):
+            seen.append(event)
+            if len(seen) == count:
+                raise KeyboardInterrupt
+    return on_event
+
+def test_journaled_run_is_complete(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=lambda event: None)
+
+    state = read_journal(dest / JOURNAL_NAME)
+    assert state.complete and state.scan_complete
+    assert len(state.operations) == 5
+    assert len(state.results) == 5
+    assert state.header["source_dir"] == str(inbox)
+
+def test_resume_after_crash(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    with pytest.raises(KeyboardInterrupt):
+        organize_files_in_destination(inbox, dest, categories_dict, journal=True, journal_sync=1,
+                                      on_event=crash_after(2))
+    assert not read_journal(dest / JOURNAL_NAME).complete
+
+    # A half-written copy left by the crash.
+    (dest / "Images").mkdir(exist_ok=True)
+    (dest / "Images" / (PARTIAL_PREFIX + "123.0")).write_bytes(b"half")
+    stats = resume_run(dest)
+
+    assert stats["partial_files_removed"] == 1
+    assert stats["already_done"] == 2
+    assert stats["total_files"] == 3
+    assert listing(dest) == [JOURNAL_NAME, "Archives/c.zip", "Documents/b.pdf", "Documents/d.docx",
+                             "Images/a.jpg", "Others/e.txt"]
+    assert read_journal(dest / JOURNAL_NAME).complete
+
+def test_unfinished_journal_blocks_new_run(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    with pytest.raises(KeyboardInterrupt):
+        organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=crash_after(1))
+
+    with pytest.raises(ValueError, match="--resume"):
+        organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=lambda event: None)
+
+def test_resume_of_finished_run_is_refused(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=lambda event: None)
+    with pytest.raises(ValueError, match="nothing to resume"):
+        resume_run(dest)
+
+def test_undo_copy_run(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=lambda event: None)
+
+    result = undo_run(dest)
+
+    assert result == {"undone": 5, "uncertain": 0, "failed": 0}
+    assert os.listdir(dest) == []
+    assert len(listing(inbox)) == 5
+
+def test_undo_interrupted_move_run(inbox, categories_dict):
+    before = listing(inbox)
+    with pytest.raises(KeyboardInterrupt):
+        organize_files_in_destination(inbox, inbox, categories_dict, same_place=True, journal=True,
+                                      journal_sync=1000, on_event=crash_after(3))
+
+    # Results were not synced yet, but the moved files show where they went.
+    result = undo_run(inbox)
+
+    assert result["undone"] == 3
+    assert listing(inbox) == before
+
+def test_torn_tail_is_ignored(inbox, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    organize_files_in_destination(inbox, dest, categories_dict, journal=True, on_event=lambda event: None)
+    path = dest / JOURNAL_NAME
+    data = path.read_bytes()
+    # Cut the completion record in half, as a crash during the last write would.
+    path.write_bytes(data[:-3])
+
+    state = read_journal(path)
+    assert not state.complete
+    assert len(state.results) == 5
+
+def test_not_a_journal(tmp_path):
+    (tmp_path / JOURNAL_NAME).write_bytes(b"hello")
+    with pytest.raises(ValueError, match="Not a file organizer journal"):
+        read_journal(tmp_path / JOURNAL_NAME)
+
+def test_failed_copy_leaves_no_partial_file(tmp_path, monkeypatch):
+    source = tmp_path / "big.bin"
+    source.write_bytes(os.urandom(10_000))
+    target = tmp_path / "out" / "big.bin"
+    target.parent.mkdir()
+
+    def broken_copy(source, destination):
+        with open(destination, "wb") as f:
+            f.write(b"half")
+        raise OSError("disk full")
+    monkeypatch.setattr(copy_backend.shutil, "copy2", broken_copy)
+    backend = CopyBackend()
+    backend._strategies = []
+
+    with pytest.raises(OSError):
+        backend.copy(str(source), str(target))
+    assert os.listdir(target.parent) == []
+
+def test_publish_never_overwrites(tmp_path):
+    temporary = tmp_path / "tmp"
+    target = tmp_path / "target"
+    temporary.write_bytes(b"new")
+    target.write_bytes(b"old")
+
+    with pytest.raises(FileExistsError):
+        copy_backend.publish(str(temporary), str(target))
+    assert target.read_bytes() == b"old"
+
+def test_sync_flushes_only_the_transferred_files(inbox, tmp_path, categories_dict, monkeypatch):
+    import journal
+    synced = []
+    monkeypatch.setattr(journal, "_fsync_path", synced.append)
+    monkeypatch.setattr(os, "sync", lambda: pytest.fail("os.sync flushes the whole machine"), raising=False)
+    dest = tmp_path / "dest"
+    organize_files_in_destination(inbox, dest, categories_dict, journal=True, journal_sync=2, on_event=lambda event: None)
+
+    assert str(dest / "Images" / "a.jpg") in synced
+    assert str(dest / "Documents") in synced
+    assert all(path.startswith(str(dest)) for path in synced)
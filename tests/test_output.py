@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import sys
+import pytest
+
+# Add src to path to allow importing output
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import output
+from output import Output, QUIET, NORMAL, VERBOSE, get_output, set_output
+from events import OrganizerEvent, COPIED, SKIPPED, PROGRESS, SCAN_COMPLETE, CANCELLED
+from folder_utils import organize_files_in_destination
+from plan import PlannedOperation, COPY
+
+def copied(number, size=1024):
+    return OrganizerEvent(COPIED, PlannedOperation(f"/src/f{number}.pdf", f"/dest/Documents/f{number}.pdf", COPY, size, "Documents"))
+
+@pytest.fixture
+def use_output():
+    previous = get_output()
+    def install(instance):
+        set_output(instance)
+        return instance
+    yield install
+    set_output(previous)
+
+def test_verbose_lines_are_buffered():
+    stream = io.StringIO()
+    sink = Output(level=VERBOSE, stream=stream, buffer_size=10_000)
+    for number in range(5):
+        sink(copied(number))
+    assert stream.getvalue() == ""
+
+    sink.flush()
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == "Copying /src/f0.pdf to /dest/Documents"
+    assert len(lines) == 5
+
+def test_quiet_does_not_format(monkeypatch):
+    def fail(event):
+        raise AssertionError("formatted a message in quiet mode")
+    monkeypatch.setattr(output, "describe_event", fail)
+    stream = io.StringIO()
+    sink = Output(level=QUIET, stream=stream, progress_interval=0)
+    for number in range(100):
+        sink(copied(number))
+    sink.info("hidden")
+    sink.flush()
+
+    assert stream.getvalue() == ""
+    assert sink.counts[COPIED] == 100
+
+def test_errors_are_shown_in_quiet_mode():
+    stream = io.StringIO()
+    Output(level=QUIET, stream=stream).error("broken")
+    assert stream.getvalue() == "broken\n"
+
+def test_progress_is_rate_limited(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(output.time, "monotonic", lambda: clock[0])
+    stream = io.StringIO()
+    sink = Output(level=NORMAL, stream=stream, progress_interval=1.0)
+    sink(OrganizerEvent(SCAN_COMPLETE, total_files=10, total_size=10 * 1024))
+    for number in range(10):
+        clock[0] = number * 0.25
+        sink(copied(number))
+    sink.flush()
+
+    assert stream.getvalue().splitlines() == [
+        "Progress: 5 of 10 files (50%), 0.0 MB",
+        "Progress: 9 of 10 files (90%), 0.0 MB",
+    ]
+
+def test_progress_counts_large_copies_in_flight(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(output.time, "monotonic", lambda: clock[0])
+    stream = io.StringIO()
+    sink = Output(level=NORMAL, stream=stream, progress_interval=1.0)
+    video = copied(1, size=300 * 1024 * 1024)
+    for second in (1, 2):
+        clock[0] = second
+        sink(OrganizerEvent(PROGRESS, video.operation, bytes_done=second * 100 * 1024 * 1024))
+    clock[0] = 3
+    sink(video)
+    sink.flush()
+
+    assert stream.getvalue().splitlines() == [
+        "Progress: 0 files, 100.0 MB",
+        "Progress: 0 files, 200.0 MB",
+        "Progress: 1 files, 300.0 MB",
+    ]
+
+def test_json_lines():
+    json_stream = io.StringIO()
+    sink = Output(level=QUIET, stream=io.StringIO(), json_stream=json_stream)
+    sink(copied(1, size=7))
+    sink(OrganizerEvent(SKIPPED, copied(2).operation))
+    sink(OrganizerEvent(CANCELLED))
+    sink.report({"total_files": 2, "plan": object()}, "report text")
+
+    records = [json.loads(line) for line in json_stream.getvalue().splitlines()]
+    assert [record["event"] for record in records] == [COPIED, SKIPPED, CANCELLED, "report"]
+    assert records[0]["target"] == "/dest/Documents/f1.pdf"
+    assert records[0]["size"] == 7
+    assert records[3]["stats"] == {"total_files": 2}
+
+def test_organizer_uses_default_output(tmp_path, categories_dict, use_output):
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ("a.pdf", "b.jpg"):
+        (source / name).write_text(name)
+    stream = io.StringIO()
+    use_output(Output(level=VERBOSE, stream=stream))
+
+    organize_files_in_destination(source, tmp_path / "dest", categories_dict)
+
+    text = stream.getvalue()
+    assert "--- Organizing Files ---" in text
+    assert f"Copying {source / 'a.pdf'} to {tmp_path / 'dest' / 'Documents'}" in text
+
+def test_quiet_organizer_prints_nothing(tmp_path, categories_dict, use_output, capsys):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.pdf").write_text("a")
+    use_output(Output(level=QUIET))
+
+    organize_files_in_destination(source, tmp_path / "dest", categories_dict)
+
+    assert capsys.readouterr().out == ""
+    assert (tmp_path / "dest" / "Documents" / "a.pdf").exists()
@@ -0,0 +1,145 @@
+import pytest
+import sys
+import os
+
+# Add src to path to allow importing plan
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from plan import OrganizationPlan, OperationTable, PlannedOperation, COPY, MOVE, LINK
+from folder_utils import organize_files_in_destination, execute_plan
+
+@pytest.fixture
+def source_with_files(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "photo.jpeg").write_text("image")
+    (source / "report.docx").write_text("doc")
+    (source / "notes.xyz").write_text("?")
+    return source
+
+def test_plan_roundtrip(tmp_path):
+    plan = OrganizationPlan("/src", "/dest", same_place=False)
+    plan.stats["total_files"] = 2
+    plan.append(PlannedOperation("/src/a.jpg", "/dest/Images/a.jpg", COPY, 10, "Images"))
+    plan.append(PlannedOperation("/src/sub/bé.pdf", "/dest/Documents/bé.pdf", MOVE, 2**40, "Documents"))
+    plan_file = tmp_path / "plan.bin"
+
+    plan.save(plan_file)
+    loaded = OrganizationPlan.load(plan_file)
+
+    assert list(loaded) == list(plan)
+    assert loaded.stats == plan.stats
+    assert loaded.source_dir == "/src"
+    assert loaded.dest_dir == "/dest"
+
+def test_load_rejects_other_files(tmp_path):
+    bogus = tmp_path / "plan.bin"
+    bogus.write_bytes(b"not a plan")
+    with pytest.raises(ValueError, match="Not a file organizer plan"):
+        OrganizationPlan.load(bogus)
+
+def test_load_rejects_truncated_plan(tmp_path):
+    plan = OrganizationPlan("/src", "/dest")
+    plan.append(PlannedOperation("/src/a.jpg", "/dest/Images/a.jpg", COPY, 10, "Images"))
+    plan_file = tmp_path / "plan.bin"
+    plan.save(plan_file)
+    plan_file.write_bytes(plan_file.read_bytes()[:-5])
+    with pytest.raises(ValueError, match="corrupted"):
+        OrganizationPlan.load(plan_file)
+
+def test_dry_run_returns_plan_without_touching_files(source_with_files, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    stats = organize_files_in_destination(source_with_files, dest, categories_dict, dry_run=True)
+
+    plan = stats["plan"]
+    assert not dest.exists()
+    assert len(plan) == 3
+    assert {op.category for op in plan} == {"Images", "Documents", "Others"}
+    assert all(op.op == COPY for op in plan)
+    assert "DRY-RUN: Would copy 'photo.jpeg'" in plan.describe()
+
+def test_saved_plan_can_be_replayed(source_with_files, tmp_path, categories_dict):
+    dest = tmp_path / "dest"
+    plan_file = tmp_path / "plan.bin"
+    dry_stats = organize_files_in_destination(source_with_files, dest, categories_dict, dry_run=True, plan_path=plan_file)
+
+    # New files after planning are not picked up by the replay.
+    (source_with_files / "late.jpeg").touch()
+    stats = execute_plan(OrganizationPlan.load(plan_file), workers=2)
+
+    assert (dest / "Images" / "photo.jpeg").read_text() == "image"
+    assert (dest / "Others" / "notes.xyz").exists()
+    assert not (dest / "Images" / "late.jpeg").exists()
+    assert stats["files_per_category"] == dry_stats["files_per_category"]
+
+def test_apply_plan_skips_deleted_sources(source_with_files, tmp_path, capsys):
+    import main
+
+    dest = tmp_path / "dest"
+    plan_file = tmp_path / "plan.bin"
+    main.main_cli(["main.py", str(source_with_files), str(dest), "--dry-run", "--save-plan", str(plan_file)])
+    (source_with_files / "photo.jpeg").unlink()
+
+    main.main_cli(["main.py", "--apply-plan", str(plan_file), "--workers", "2"])
+    out = capsys.readouterr().out
+    assert (dest / "Documents" / "report.docx").exists()
+    assert not (dest / "Images" / "photo.jpeg").exists()
+    assert f"Skipping {source_with_files / 'photo.jpeg'} as it no longer exists" in out
+    assert "Files no longer in the source (skipped): 1" in out
+    assert "--- Success! ---" in out
+
+def test_cli_save_and_apply_plan(source_with_files, tmp_path, capsys):
+    import main
+
+    dest = tmp_path / "dest"
+    plan_file = tmp_path / "plan.bin"
+    main.main_cli(["main.py", str(source_with_files), str(dest), "--dry-run", "--save-plan", str(plan_file)])
+    assert plan_file.exists()
+    assert not dest.exists()
+
+    main.main_cli(["main.py", "--apply-plan", str(plan_file)])
+    assert (dest / "Documents" / "report.docx").exists()
+    assert "Total files processed: 3" in capsys.readouterr().out
+
+def test_plan_with_relative_paths_applies_from_another_directory(source_with_files, tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.chdir(tmp_path)
+    source = os.path.relpath(source_with_files, tmp_path)
+    main.main_cli(["main.py", source, "dest", "--dry-run", "--save-plan", "plan.bin"])
+    plan = OrganizationPlan.load(tmp_path / "plan.bin")
+    assert os.path.isabs(plan.dest_dir) and all(os.path.isabs(op.source) for op in plan)
+
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    main.main_cli(["main.py", "--apply-plan", str(tmp_path / "plan.bin")])
+    assert (tmp_path / "dest" / "Documents" / "report.docx").exists()
+    assert not (elsewhere / "dest").exists()
+
+def test_operation_table_roundtrip():
+    table = OperationTable()
+    operations = [
+        PlannedOperation("/src/a.jpg", "/dest/Images/a.jpg", COPY, 10, "Images"),
+        PlannedOperation("/src/sub/a.jpg", "/dest/Images/a (1).jpg", COPY, 0, "Images"),
+        PlannedOperation("/dest/Images/a.jpg", "/dest/Images/b.jpg", LINK, 10, "Images"),
+        PlannedOperation("/src/caf\udce9.pdf", "/dest/Documents/caf\udce9.pdf", MOVE, 2**40, "Documents"),
+    ]
+    for operation in operations:
+        table.append(operation)
+
+    assert list(table) == operations
+    assert len(table) == 4
+    assert table[1] == operations[1]
+    assert table[-1] == operations[-1]
+    assert table.categories == ["Images", "Documents"]
+    with pytest.raises(IndexError):
+        table[4]
+
+def test_plan_memory_per_file():
+    plan = OrganizationPlan("/data/inbox", "/data/organized")
+    for number in range(20000):
+        name = f"IMG_{number:08d}.jpg"
+        plan.append(PlannedOperation(f"/data/inbox/dir{number % 100:03d}/{name}", f"/data/organized/Images/{name}",
+                                     COPY, number, "Images"))
+    assert plan.operations.nbytes() / len(plan) < 100
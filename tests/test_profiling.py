@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+import json
+
+# Add src to path to allow importing profiling
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from profiling import RunProfiler, PhaseTimer
+from folder_utils import organize_files_in_destination, format_report
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(5):
+        (source / f"photo{i}.jpeg").write_bytes(b"x" * 1000)
+    (source / "report.docx").write_bytes(b"y" * 500)
+    return source
+
+def test_profile_collects_phases_and_counters(source, tmp_path, categories_dict):
+    profiler = RunProfiler()
+    stats = organize_files_in_destination(source, tmp_path / "dest", categories_dict, workers=2, observer=profiler)
+
+    profile = stats["profile"]
+    assert {"scan", "stat", "classify", "mkdir", "transfer"} <= set(profile["phases"])
+    assert profile["counters"]["scan"] == 6
+    assert profile["counters"]["mkdir"] == 2
+    assert profile["transferred_files"] == 6
+    assert profile["transferred_bytes"] == 5500
+    assert sum(profile["latency_histograms_us"]["Images"].values()) == 5
+    assert "Throughput:" in format_report(stats)
+
+def test_report_without_profile_has_no_throughput(source, tmp_path, categories_dict):
+    stats = organize_files_in_destination(source, tmp_path / "dest", categories_dict)
+    assert "profile" not in stats
+    assert "Throughput:" not in format_report(stats)
+
+def test_write_json_and_chrome_trace(source, tmp_path, categories_dict):
+    profiler = RunProfiler()
+    organize_files_in_destination(source, tmp_path / "dest", categories_dict, observer=profiler)
+
+    profiler.write(tmp_path / "profile.json")
+    profiler.write(tmp_path / "run.trace.json")
+
+    summary = json.loads((tmp_path / "profile.json").read_text())
+    trace = json.loads((tmp_path / "run.trace.json").read_text())
+    assert summary["transferred_files"] == 6
+    assert all(event["ph"] == "X" for event in trace["traceEvents"])
+    assert {"copy", "classify"} <= {event["name"] for event in trace["traceEvents"]}
+
+def test_trace_events_are_capped():
+    profiler = RunProfiler(max_trace_events=2)
+    for _ in range(5):
+        with profiler.phase("scan"):
+            pass
+    assert len(profiler.trace_events) == 2
+    assert profiler.dropped_trace_events == 3
+
+def test_phase_timer_accumulates():
+    profiler = RunProfiler()
+    timer = PhaseTimer(profiler, "classify")
+    double = timer.wrap(lambda value: value * 2)
+    assert [double(v) for v in timer.iterate([1, 2, 3])] == [2, 4, 6]
+    timer.flush()
+    assert profiler.counters["classify"] == 6
+    assert "classify" in profiler.phases
+
+def test_cli_profile_flag(source, tmp_path):
+    import main
+    profile_file = tmp_path / "profile.json"
+    main.main_cli(["main.py", str(source), str(tmp_path / "dest"), "--profile", str(profile_file)])
+    assert json.loads(profile_file.read_text())["transferred_files"] == 6
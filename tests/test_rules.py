@@ -0,0 +1,133 @@
+import json
+import os
+import sys
+import time
+import pytest
+
+# Add src to path to allow importing rules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from classifier import CategoryClassifier
+from config_cache import load_classifier
+from folder_utils import load_categories, organize_files_in_destination
+
+DAY = 24 * 60 * 60
+
+@pytest.fixture
+def rule_categories():
+    return {
+        "Videos/Large": {"extensions": [".mp4", ".mkv"], "min_size": "2G"},
+        "Screenshots": {"patterns": ["Screenshot*.png"]},
+        "Invoices": {"regex": r"INV-\d{4}\.pdf"},
+        "Archive/{year}": {"older_than_days": 90},
+        "Videos": [".mp4", ".mkv"],
+        "Images": [".png", ".jpg"],
+        "Documents": [".pdf"],
+    }
+
+def test_size_rule(rule_categories):
+    classifier = CategoryClassifier(rule_categories)
+    now = time.time()
+    assert classifier.classify("movie.MP4", 3 * 1024 ** 3, now) == "Videos/Large"
+    assert classifier.classify("movie.mp4", 10, now) == "Videos"
+    # Without a size the size rule cannot apply.
+    assert classifier.classify("movie.mp4") == "Videos"
+
+def test_name_patterns(rule_categories):
+    classifier = CategoryClassifier(rule_categories)
+    now = time.time()
+    assert classifier.classify("screenshot 2024-01-01.PNG", 10, now) == "Screenshots"
+    assert classifier.classify("holiday.png", 10, now) == "Images"
+    assert classifier.classify("INV-2024.pdf", 10, now) == "Invoices"
+    assert classifier.classify("INV-24.pdf", 10, now) == "Documents"
+
+def test_age_rule_with_year_template(rule_categories):
+    classifier = CategoryClassifier(rule_categories)
+    old = time.mktime((2020, 6, 1, 12, 0, 0, 0, 0, -1))
+    assert classifier.classify("report.pdf", 10, old) == "Archive/2020"
+    assert classifier.classify("report.pdf", 10, time.time() - DAY) == "Documents"
+    assert classifier.classify("unknown.xyz", 10, old) == "Archive/2020"
+
+def test_rules_are_checked_in_config_order():
+    classifier = CategoryClassifier({
+        "Raw": {"patterns": ["*.png"]},
+        "Screenshots": {"patterns": ["Screenshot*"]},
+        "Tarballs": {"extensions": [".gz"], "patterns": ["backup*"]},
+    })
+    assert classifier.classify("Screenshot.png") == "Raw"
+    assert classifier.classify("Screenshot.jpg") == "Screenshots"
+    assert classifier.classify("backup.tar.gz") == "Tarballs"
+    assert classifier.classify("backup.zip") == "Others"
+
+def test_regexes_keep_their_meaning_next_to_other_rules():
+    categories = {
+        "Images/Camera": {"regex": r"(?i)^img_\d+\.jpg$"},
+        "Doubled": {"regex": r"(?P<word>[a-z]+)-(?P=word)\.txt"},
+        "Repeated": {"regex": r"(?P<word>[a-z])\1\.txt"},
+        "Backups": {"regex": r"(bak)_\1\.zip"},
+        "Screenshots": {"patterns": ["Screenshot*.png"]},
+        "Invoices": {"regex": r"INV-\d{4}\.pdf"},
+        "Images": [".jpg", ".png"],
+    }
+    classifier = CategoryClassifier(categories)
+    assert classifier.classify("IMG_0042.JPG") == "Images/Camera"
+    assert classifier.classify("holiday.jpg") == "Images"
+    assert classifier.classify("hello-hello.txt") == "Doubled"
+    assert classifier.classify("aa.txt") == "Repeated"
+    assert classifier.classify("bak_bak.zip") == "Backups"
+    assert classifier.classify("bak_tmp.zip") == "Others"
+    assert classifier.classify("Screenshot 1.png") == "Screenshots"
+    assert classifier.classify("INV-2024.pdf") == "Invoices"
+
+def test_candidates_only_include_rules_for_the_extension():
+    categories = {f"Rule{n}": {"extensions": [f".e{n}"], "min_size": n} for n in range(500)}
+    categories["Large"] = {"min_size": "1G"}
+    classifier = CategoryClassifier(categories)
+    assert [rule.category for rule in classifier.rules._candidates("file.e7")] == ["Rule7", "Large"]
+    assert classifier.classify("file.e7", 100) == "Rule7"
+    assert classifier.classify("file.e7", 3) == "Others"
+
+def test_organize_with_rules(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "old.pdf").write_text("x")
+    (source / "new.pdf").write_text("x")
+    os.utime(source / "old.pdf", (time.time() - 400 * DAY, time.time() - 400 * DAY))
+    year = time.localtime(time.time() - 400 * DAY).tm_year
+
+    categories = {"Archive/{year}": {"older_than_days": 90}, "Documents": [".pdf"]}
+    stats = organize_files_in_destination(source, source, categories, same_place=True, recursive=True)
+
+    assert (source / "Archive" / str(year) / "old.pdf").exists()
+    assert (source / "Documents" / "new.pdf").exists()
+    assert stats["files_per_category"] == {f"Archive/{year}": 1, "Documents": 1}
+
+    # A second in-place run does not walk into the rule folders again.
+    assert organize_files_in_destination(source, source, categories, same_place=True, recursive=True)["total_files"] == 0
+
+@pytest.mark.parametrize("rule, message", [
+    ({"size": 5}, "unknown key 'size'"),
+    ({}, "at least one condition"),
+    ({"patterns": "*.png"}, "'patterns' must be a list of strings"),
+    ({"regex": "("}, "invalid regex"),
+    ({"min_size": "huge"}, "'min_size' must be a byte count"),
+    ({"older_than_days": -1}, "'older_than_days' must be a non-negative number"),
+])
+def test_invalid_rules_are_rejected(tmp_path, rule, message):
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"categories": {"Images": [".jpg"], "Special": rule}}))
+    with pytest.raises(ValueError, match=message):
+        load_categories(config_file)
+
+def test_unknown_template_field_is_rejected(tmp_path):
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"categories": {"Archive/{day}": {"older_than_days": 1}}}))
+    with pytest.raises(ValueError, match="unknown placeholder '{day}'"):
+        load_categories(config_file)
+
+def test_rules_survive_the_config_cache(tmp_path, rule_categories):
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"categories": rule_categories}))
+    load_classifier(config_file)
+    cached = load_classifier(config_file)
+    assert cached.classify("movie.mkv", 3 * 1024 ** 3, time.time()) == "Videos/Large"
@@ -0,0 +1,101 @@
+import pytest
+import sys
+import os
+
+# Add src to path to allow importing scan_index
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from scan_index import ScanIndex, INDEX_FILE_NAME
+from folder_utils import organize_files_in_destination
+
+@pytest.fixture
+def dirs(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    dest = tmp_path / "dest"
+    (source / "photo.jpeg").write_text("image")
+    (source / "report.docx").write_text("doc")
+    return source, dest
+
+def test_second_run_skips_unchanged_files(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        first = organize_files_in_destination(source, dest, categories_dict, index=index)
+        assert first["total_files"] == 2
+        assert first["unchanged_files"] == 0
+        assert len(index) == 2
+
+        (source / "new.jpeg").write_text("new")
+        second = organize_files_in_destination(source, dest, categories_dict, index=index)
+
+    assert second["total_files"] == 1
+    assert second["unchanged_files"] == 2
+    assert second["files_per_category"] == {"Images": 1}
+    assert (dest / INDEX_FILE_NAME).exists()
+
+def test_index_persists_between_instances(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        organize_files_in_destination(source, dest, categories_dict, index=index)
+
+    os.utime(source / "photo.jpeg", ns=(0, 10**9))
+    with ScanIndex(dest) as index:
+        stats = organize_files_in_destination(source, dest, categories_dict, index=index)
+
+    # Only the file with a new mtime is examined again.
+    assert stats["total_files"] == 1
+    assert stats["unchanged_files"] == 1
+
+def test_dry_run_does_not_record(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        organize_files_in_destination(source, dest, categories_dict, dry_run=True, index=index)
+        assert len(index) == 0
+
+def test_index_file_is_never_organized_in_place(dirs, categories_dict):
+    source, _ = dirs
+    with ScanIndex(source) as index:
+        organize_files_in_destination(source, source, categories_dict, same_place=True, index=index)
+    assert (source / INDEX_FILE_NAME).exists()
+    assert not (source / "Others").exists()
+
+def test_verify_removes_stale_entries(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        organize_files_in_destination(source, dest, categories_dict, index=index)
+        (source / "photo.jpeg").write_text("changed content")
+        os.remove(source / "report.docx")
+        os.remove(dest / "Documents" / "report.docx")
+
+        assert index.verify() == (2, 2)
+        assert len(index) == 0
+
+def test_verify_forgets_deleted_copies_of_unchanged_files(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        organize_files_in_destination(source, dest, categories_dict, index=index)
+        os.remove(dest / "Images" / "photo.jpeg")
+
+        assert index.verify() == (2, 1)
+        stats = organize_files_in_destination(source, dest, categories_dict, index=index)
+
+    assert stats["total_files"] == 1
+    assert (dest / "Images" / "photo.jpeg").read_text() == "image"
+
+def test_verify_keeps_files_moved_in_place(dirs, categories_dict):
+    source, _ = dirs
+    with ScanIndex(source) as index:
+        organize_files_in_destination(source, source, categories_dict, same_place=True, index=index)
+        assert index.verify() == (2, 0)
+
+def test_rebuild_clears_entries(dirs, categories_dict):
+    source, dest = dirs
+    with ScanIndex(dest) as index:
+        organize_files_in_destination(source, dest, categories_dict, index=index)
+        index.rebuild()
+        assert len(index) == 0
+
+def test_corrupted_index_reports_error(tmp_path):
+    (tmp_path / INDEX_FILE_NAME).write_text("not a database" * 100)
+    with pytest.raises(ValueError, match="--rebuild-index"):
+        ScanIndex(tmp_path)
@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+import types
+
+# Add src to path to allow importing scanner
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from scanner import scan_directory, entry_size
+
+def test_scan_yields_only_files(tmp_path):
+    (tmp_path / "a.txt").write_text("abc")
+    (tmp_path / "b.jpg").touch()
+    (tmp_path / "subdir").mkdir()
+    (tmp_path / "subdir" / "nested.txt").touch()
+
+    names = sorted(entry.name for entry in scan_directory(tmp_path))
+
+    assert names == ["a.txt", "b.jpg"]
+
+def test_scan_is_lazy(tmp_path):
+    (tmp_path / "a.txt").touch()
+    scan = scan_directory(tmp_path)
+    assert isinstance(scan, types.GeneratorType)
+    assert next(scan).name == "a.txt"
+
+def test_scan_skips_broken_symlinks(tmp_path):
+    (tmp_path / "real.txt").touch()
+    os.symlink(tmp_path / "missing.txt", tmp_path / "broken.txt")
+
+    names = [entry.name for entry in scan_directory(tmp_path)]
+
+    assert names == ["real.txt"]
+
+def test_entry_size_uses_cached_stat(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    entry = next(scan_directory(tmp_path))
+    assert entry_size(entry) == 5
+    os.remove(tmp_path / "a.txt")
+    # The stat result is cached on the DirEntry after the first call.
+    assert entry_size(entry) == 5
+
+from scanner import walk_files
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b" / "c").mkdir(parents=True)
+    (root / "top.txt").touch()
+    (root / "a" / "one.txt").touch()
+    (root / "a" / "b" / "two.txt").touch()
+    (root / "a" / "b" / "c" / "three.txt").touch()
+    return root
+
+def _collect(walk):
+    return sorted((relative, entry.name) for relative, entry in walk)
+
+def test_walk_files_finds_nested_files(tree):
+    found = _collect(walk_files(tree, workers=3))
+    assert found == [
+        (".", "top.txt"),
+        ("a", "one.txt"),
+        (os.path.join("a", "b"), "two.txt"),
+        (os.path.join("a", "b", "c"), "three.txt"),
+    ]
+
+def test_walk_files_respects_max_depth(tree):
+    assert _collect(walk_files(tree, max_depth=0)) == [(".", "top.txt")]
+    assert _collect(walk_files(tree, max_depth=1)) == [(".", "top.txt"), ("a", "one.txt")]
+
+def test_walk_files_skips_excluded_dirs(tree):
+    found = _collect(walk_files(tree, exclude_dirs=[tree / "a" / "b"]))
+    assert found == [(".", "top.txt"), ("a", "one.txt")]
+
+def test_walk_files_symlinked_dirs(tree):
+    os.symlink(tree / "a", tree / "link")
+    assert ("link", "one.txt") not in _collect(walk_files(tree))
+    # With symlinks followed, the real directory is still visited only once.
+    followed = _collect(walk_files(tree, follow_symlinks=True))
+    assert len([name for _, name in followed if name == "one.txt"]) == 1
+
+def test_walk_files_streams_with_small_backlog(tree):
+    for i in range(50):
+        (tree / "a" / f"extra{i}.txt").touch()
+    walk = walk_files(tree, workers=2, backlog=2)
+    first = next(walk)
+    walk.close()
+    assert first[1].name.endswith(".txt")
+
+def test_walk_files_missing_root(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(walk_files(tmp_path / "missing"))
@@ -0,0 +1,184 @@
+import http.client
+import json
+import os
+import stat
+import sys
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+# Add src to path to allow importing server
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from server import OrganizerServer, validate_options, DONE, FAILED, CANCELLED, QUEUED
+from output import Output, QUIET, set_output
+
+@pytest.fixture
+def config(tmp_path, categories_dict):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"categories": categories_dict}))
+    return path
+
+@pytest.fixture
+def organizer(config):
+    previous = set_output(Output(level=QUIET))
+    instance = OrganizerServer(port=0, concurrency=2, config_path=config)
+    instance.start()
+    yield instance
+    instance.close()
+    set_output(previous)
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ("a.jpg", "b.pdf", "c.zip", "d.unknown"):
+        (source / name).write_text(name)
+    return source
+
+def request(organizer, method, path, body=None, headers=None):
+    host, port = organizer.address
+    data = json.dumps(body).encode() if body is not None else None
+    call = urllib.request.Request(f"http://{host}:{port}{path}", data=data, method=method,
+                                  headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(call, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+def wait_for(organizer, job_id):
+    host, port = organizer.address
+    with urllib.request.urlopen(f"http://{host}:{port}/jobs/{job_id}/stream?interval=0.05", timeout=10) as response:
+        return [json.loads(line) for line in response]
+
+def test_submit_and_poll(organizer, source, tmp_path):
+    status, job = request(organizer, "POST", "/jobs", {"source": str(source), "destination": str(tmp_path / "dest")})
+    assert status == 202
+    assert job["state"] in (QUEUED, "running", DONE)
+
+    lines = wait_for(organizer, job["id"])
+    assert lines[-1]["state"] == DONE
+    assert "Total files processed: 4" in lines[-1]["report"]
+
+    status, finished = request(organizer, "GET", f"/jobs/{job['id']}")
+    assert status == 200
+    assert finished["stats"]["files_per_category"] == {"Images": 1, "Documents": 1, "Archives": 1, "Others": 1}
+    assert finished["progress"]["files"] == 4
+    assert (tmp_path / "dest" / "Images" / "a.jpg").exists()
+
+def test_dry_run_and_options(organizer, source, tmp_path):
+    status, job = request(organizer, "POST", "/jobs", {"source": str(source), "destination": str(tmp_path / "dest"),
+                                                       "options": {"dry_run": True, "workers": 2, "recursive": True}})
+    assert status == 202
+    final = wait_for(organizer, job["id"])[-1]
+    assert final["state"] == DONE
+    assert final["stats"]["planned_operations"] == 4
+    assert not (tmp_path / "dest").exists()
+
+def test_invalid_requests(organizer, source):
+    assert request(organizer, "POST", "/jobs", {"source": str(source)})[0] == 400
+    status, body = request(organizer, "POST", "/jobs", {"source": str(source), "destination": "x", "options": {"colour": 1}})
+    assert status == 400 and "Unknown option" in body["error"]
+    assert request(organizer, "POST", "/jobs", [1, 2])[0] == 400
+    assert request(organizer, "GET", "/jobs/999")[0] == 404
+    assert request(organizer, "DELETE", "/jobs/999")[0] == 404
+
+def test_failed_job_reports_error(organizer, tmp_path):
+    status, job = request(organizer, "POST", "/jobs", {"source": str(tmp_path / "missing"), "destination": str(tmp_path / "dest")})
+    final = wait_for(organizer, job["id"])[-1]
+    assert final["state"] == FAILED
+    assert "does not exist" in final["error"]
+
+def test_validate_options():
+    validate_options({"workers": 4, "dedup": "skip", "max_depth": 0})
+    for options in ({"workers": True}, {"workers": 0}, {"dedup": "delete"}, {"recursive": "yes"}, []):
+        with pytest.raises(ValueError):
+            validate_options(options)
+
+def test_queue_concurrency_and_cancel(config, source, tmp_path, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    real_run_job = OrganizerServer.run_job
+
+    def blocking_run_job(self, job):
+        started.set()
+        release.wait(10)
+        real_run_job(self, job)
+
+    monkeypatch.setattr(OrganizerServer, "run_job", blocking_run_job)
+    previous = set_output(Output(level=QUIET))
+    organizer = OrganizerServer(port=0, concurrency=1, config_path=config)
+    organizer.start()
+    try:
+        first = organizer.submit(str(source), str(tmp_path / "first"))
+        second = organizer.submit(str(source), str(tmp_path / "second"))
+        assert started.wait(10)
+        assert request(organizer, "GET", "/health")[1]["queued"] == 1
+
+        status, cancelled = request(organizer, "DELETE", f"/jobs/{second.id}")
+        assert status == 200 and cancelled["state"] == CANCELLED
+        release.set()
+        assert first.wait(10) and first.state == DONE
+        assert not (tmp_path / "second").exists()
+        # The classifier was compiled once, when the server started.
+        assert organizer.classifier.loads == 1
+    finally:
+        release.set()
+        organizer.close()
+        set_output(previous)
+
+def test_config_change_reloads_classifier(organizer, config, source, tmp_path):
+    config.write_text(json.dumps({"categories": {"Pictures": [".jpg"]}}))
+    os.utime(config, ns=(1, 1))
+    status, job = request(organizer, "POST", "/jobs", {"source": str(source), "destination": str(tmp_path / "dest")})
+    assert wait_for(organizer, job["id"])[-1]["state"] == DONE
+    assert (tmp_path / "dest" / "Pictures" / "a.jpg").exists()
+    assert organizer.classifier.loads == 2
+
+def test_cross_site_requests_are_refused(organizer, source, tmp_path):
+    body = {"source": str(source), "destination": str(tmp_path / "dest")}
+    # What a web page can send without a preflight.
+    for content_type in ("text/plain", "application/x-www-form-urlencoded", "multipart/form-data"):
+        call = urllib.request.Request(f"http://{organizer.address[0]}:{organizer.address[1]}/jobs",
+                                      data=json.dumps(body).encode(), method="POST",
+                                      headers={"Content-Type": content_type})
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(call, timeout=10)
+        assert error.value.code == 415
+    assert request(organizer, "POST", "/jobs", body, {"Content-Type": "application/json; charset=utf-8"})[0] == 202
+    assert len(organizer.list_jobs()) == 1
+
+def test_foreign_host_header_is_refused(organizer):
+    host, port = organizer.address
+    # A DNS-rebound name resolves to 127.0.0.1 but keeps its own Host header.
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    for method in ("GET", "POST", "DELETE"):
+        connection.request(method, "/jobs", body=b"{}", headers={"Host": f"evil.example:{port}",
+                                                                 "Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 403
+        connection.close()
+    assert request(organizer, "GET", "/health", headers={"Host": f"localhost:{port}"})[0] == 200
+    assert organizer.list_jobs() == []
+
+def test_token_is_required(config, tmp_path):
+    token_path = tmp_path / "token"
+    token_path.write_text("old")
+    token_path.chmod(0o644)
+    previous = set_output(Output(level=QUIET))
+    organizer = OrganizerServer(port=0, config_path=config, token_path=token_path)
+    organizer.start()
+    try:
+        token = token_path.read_text().strip()
+        assert token == organizer.token
+        if os.name == "posix":
+            assert stat.S_IMODE(token_path.stat().st_mode) == 0o600
+        assert request(organizer, "GET", "/health")[0] == 401
+        assert request(organizer, "GET", "/health", headers={"Authorization": "Bearer wrong"})[0] == 401
+        assert request(organizer, "GET", "/health", headers={"Authorization": f"Bearer {token}"})[0] == 200
+    finally:
+        organizer.close()
+        set_output(previous)
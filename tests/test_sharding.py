@@ -0,0 +1,72 @@
+import os
+import sys
+import pytest
+
+# Add src to path to allow importing sharding
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from folder_utils import organize_files_in_destination, format_report
+from sharding import organize_sharded, merge_stats, shard_of
+
+@pytest.fixture
+def tree(tmp_path):
+    source = tmp_path / "source"
+    for folder in ("", "2023", "2024"):
+        (source / folder).mkdir(exist_ok=True)
+    for i in range(60):
+        (source / f"photo{i}.jpg").write_bytes(b"x" * i)
+        (source / f"doc{i}.pdf").write_bytes(b"y" * i)
+    # Same name in two subdirectories: both want Images/cover.jpg.
+    (source / "2023" / "cover.jpg").write_bytes(b"2023")
+    (source / "2024" / "cover.jpg").write_bytes(b"2024")
+    (source / "2024" / "notes.txt").write_bytes(b"notes")
+    return source
+
+def listing(folder):
+    return sorted(str(path.relative_to(folder)) for path in folder.rglob("*") if path.is_file())
+
+def test_shard_of_is_stable():
+    assert shard_of("cover.jpg", 8) == shard_of("cover.jpg", 8)
+    assert {shard_of(f"file{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+def test_merge_stats():
+    total = {"total_files": 1, "files_per_category": {"Images": 1}}
+    merge_stats(total, {"total_files": 2, "files_per_category": {"Images": 1, "Others": 1},
+                        "copy_strategies": {"copy2": {"files": 2, "bytes": 10}}})
+    merge_stats(total, {"total_files": 0, "copy_strategies": {"copy2": {"files": 1, "bytes": 5}}, "cancelled": True})
+    assert total == {
+        "total_files": 3,
+        "files_per_category": {"Images": 2, "Others": 1},
+        "copy_strategies": {"copy2": {"files": 3, "bytes": 15}},
+        "cancelled": True,
+    }
+
+def test_sharded_run_matches_single_process(tree, tmp_path, categories_dict, capsys):
+    expected = organize_files_in_destination(tree, tmp_path / "single", categories_dict, recursive=True)
+    stats = organize_sharded(tree, tmp_path / "sharded", categories_dict, processes=4, recursive=True, workers=2)
+
+    assert listing(tmp_path / "sharded") == listing(tmp_path / "single")
+    for key in ("total_files", "total_size", "files_per_category", "files_per_directory"):
+        assert stats[key] == expected[key]
+    assert "Total files processed: 123" in format_report(stats)
+
+def test_same_name_is_handled_by_one_shard(tree, tmp_path, categories_dict, capsys):
+    organize_sharded(tree, tmp_path / "dest", categories_dict, processes=3, recursive=True, workers=4)
+
+    # The cover that sorts first by relative path wins; the other is skipped.
+    assert (tmp_path / "dest" / "Images" / "cover.jpg").read_bytes() == b"2023"
+    assert len(os.listdir(tmp_path / "dest" / "Images")) == 61
+
+def test_sharded_in_place_move(tree, categories_dict, capsys):
+    stats = organize_sharded(tree, tree, categories_dict, processes=2, same_place=True)
+
+    assert stats["total_files"] == 120
+    assert len(os.listdir(tree / "Images")) == 60
+    assert len(os.listdir(tree / "Documents")) == 60
+    assert sorted(os.listdir(tree)) == ["2023", "2024", "Documents", "Images"]
+
+def test_worker_error_is_reported(tree, tmp_path, categories_dict, capsys):
+    dest = tmp_path / "dest"
+    dest.write_text("not a directory")
+    with pytest.raises(OSError):
+        organize_sharded(tree, dest, categories_dict, processes=2)
@@ -0,0 +1,108 @@
+import pytest
+import sys
+import os
+
+# Add src to path to allow importing sniffer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import sniffer
+from sniffer import SignatureTrie, ContentSniffer, SNIFF_CACHE_NAME
+from folder_utils import organize_files_in_destination, format_report
+
+PDF = b"%PDF-1.7\n" + b"x" * 100
+JPEG = b"\xff\xd8\xff\xe0" + b"x" * 100
+ZIP = b"PK\x03\x04" + b"x" * 100
+
+@pytest.fixture
+def dirs(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    return source, dest
+
+def test_trie_matches_longest_signature_with_wildcards():
+    trie = SignatureTrie()
+    assert trie.match(PDF)[0] == ".pdf"
+    assert trie.match(b"RIFF\x10\x00\x00\x00WAVEfmt ")[0] == ".wav"
+    assert trie.match(b"\x00\x00\x00\x18ftypqt  ")[0] == ".mov"
+    assert trie.match(b"\x00\x00\x00\x18ftypisom")[0] == ".mp4"
+    assert trie.match(b"a" * 257 + b"ustar\x00")[0] == ".tar"
+    assert trie.match(b"plain text") is None
+
+def test_unknown_files_are_identified_by_content(dirs, categories_dict):
+    source, dest = dirs
+    (source / "another_unknown").write_bytes(PDF)
+    (source / "scan.xyz").write_bytes(JPEG)
+    (source / "notes").write_text("just text")
+
+    stats = organize_files_in_destination(source, dest, categories_dict, sniff="unknown")
+
+    assert (dest / "Documents" / "another_unknown").exists()
+    assert (dest / "Images" / "scan.xyz").exists()
+    assert (dest / "Others" / "notes").exists()
+    assert stats["identified_by_content"] == 2
+    assert stats["files_per_category"] == {"Documents": 1, "Images": 1, "Others": 1}
+    assert "Identified by content: 2" in format_report(stats)
+
+def test_known_extensions_are_not_read_without_verify(dirs, categories_dict, monkeypatch):
+    source, dest = dirs
+    (source / "fake.jpg").write_bytes(PDF)
+    monkeypatch.setattr(sniffer, "read_header", lambda path, size=0: pytest.fail(f"read {path}"))
+
+    organize_files_in_destination(source, dest, categories_dict, sniff="unknown")
+
+    assert (dest / "Images" / "fake.jpg").exists()
+
+def test_verify_refiles_mislabeled_files(dirs, categories_dict):
+    source, dest = dirs
+    (source / "fake.jpg").write_bytes(PDF)
+    (source / "real.jpg").write_bytes(JPEG)
+    (source / "report.docx").write_bytes(ZIP)
+
+    stats = organize_files_in_destination(source, dest, categories_dict, sniff="verify")
+
+    assert (dest / "Documents" / "fake.jpg").exists()
+    assert (dest / "Images" / "real.jpg").exists()
+    # A .docx is a zip container; that is not a mislabel.
+    assert (dest / "Documents" / "report.docx").exists()
+    assert stats["mislabeled"] == 1
+
+def test_verify_refiles_into_nested_categories(dirs):
+    source, dest = dirs
+    (source / "x.pdf").write_bytes(JPEG)
+    (source / "y.jpg").write_bytes(PDF)
+
+    stats = organize_files_in_destination(source, dest, {"Docs/PDF": [".pdf"], "Images": [".jpg"]}, sniff="verify")
+
+    assert (dest / "Images" / "x.pdf").exists()
+    assert (dest / "Docs" / "PDF" / "y.jpg").exists()
+    assert not (dest / "Docs" / "Images").exists()
+    assert stats["files_per_category"] == {"Images": 1, "Docs/PDF": 1}
+
+def test_results_are_cached_between_runs(dirs, categories_dict, monkeypatch):
+    source, dest = dirs
+    (source / "another_unknown").write_bytes(PDF)
+    organize_files_in_destination(source, dest, categories_dict, sniff="unknown", dry_run=True)
+    assert (dest / SNIFF_CACHE_NAME).exists()
+
+    monkeypatch.setattr(sniffer, "read_header", lambda path, size=0: pytest.fail(f"read {path}"))
+    stats = organize_files_in_destination(source, dest, categories_dict, sniff="unknown")
+
+    assert stats["identified_by_content"] == 1
+    assert (dest / "Documents" / "another_unknown").exists()
+
+def test_changed_file_is_read_again(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(PDF)
+    content = ContentSniffer(tmp_path / "cache")
+    assert content.sniff_many([str(path)])[str(path)][0][0] == ".pdf"
+    content.save()
+
+    path.write_bytes(JPEG + b"longer")
+    assert ContentSniffer(tmp_path / "cache").sniff_many([str(path)])[str(path)][0][0] == ".jpg"
+
+def test_invalid_mode_is_rejected(dirs, categories_dict):
+    source, dest = dirs
+    with pytest.raises(ValueError, match="Unknown sniff mode"):
+        organize_files_in_destination(source, dest, categories_dict, sniff="always")
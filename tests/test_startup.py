@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+
+# Generous enough for slow CI machines; importing tkinter or the GUI alone is well below it,
+# so this catches heavy imports creeping back rather than measuring exact timings.
+IMPORT_BUDGET_US = 150000
+
+def import_profile(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; import {module}; print('tkinter' in sys.modules)"],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total)
+    return result.stdout.strip() == "True", cumulative
+
+def test_cli_does_not_import_tkinter():
+    imported_tkinter, _ = import_profile("main")
+    assert not imported_tkinter
+
+def test_cli_import_time_budget():
+    _, cumulative = import_profile("main")
+    assert cumulative["main"] < IMPORT_BUDGET_US
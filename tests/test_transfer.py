@@ -0,0 +1,48 @@
+import pytest
+import sys
+import os
+import threading
+
+# Add src to path to allow importing transfer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from transfer import FolderCreator, NameClaims, TransferPool
+from plan import PlannedOperation, COPY
+from events import MISSING
+
+def test_folder_creator_handles_concurrent_requests(tmp_path):
+    folders = FolderCreator()
+    target = tmp_path / "dest" / "Images"
+    threads = [threading.Thread(target=folders.ensure, args=(target,)) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert target.is_dir()
+
+def test_name_claims_only_grant_once(tmp_path):
+    claims = NameClaims()
+    assert claims.claim(tmp_path, "photo.jpeg") is True
+    assert claims.claim(tmp_path, "photo.jpeg") is False
+
+def test_name_claims_respect_existing_files(tmp_path):
+    (tmp_path / "photo.jpeg").touch()
+    claims = NameClaims()
+    assert claims.claim(tmp_path, "photo.jpeg") is False
+    assert claims.claim(tmp_path / "missing", "photo.jpeg") is True
+
+def test_pool_reraises_worker_errors(tmp_path):
+    # A directory where a file was planned cannot be copied.
+    broken = tmp_path / "broken.jpeg"
+    broken.mkdir()
+    pool = TransferPool(workers=2)
+    pool.submit(PlannedOperation(str(broken), str(tmp_path / "Images" / broken.name), COPY, 0, "Images"))
+    with pytest.raises(IsADirectoryError):
+        pool.close()
+
+def test_vanished_source_is_reported_as_missing(tmp_path):
+    missing = tmp_path / "missing.jpeg"
+    events = []
+    with TransferPool(workers=2, on_event=events.append) as pool:
+        pool.submit(PlannedOperation(str(missing), str(tmp_path / "Images" / missing.name), COPY, 0, "Images"))
+    assert [event.kind for event in events] == [MISSING]
@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from watcher import watch_directory, open_change_source, InotifySource, PollingSource
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+@pytest.fixture
+def start_watch(tmp_path, categories_dict):
+    source = tmp_path / "inbox"
+    dest = tmp_path / "sorted"
+    source.mkdir()
+    dest.mkdir()
+    stop = threading.Event()
+    threads = []
+
+    def start(**kwargs):
+        stats = {}
+        batches = []
+        thread = threading.Thread(target=watch_directory, args=(source, dest, categories_dict),
+                                  kwargs=dict(debounce=0.05, settle=0.2, poll_interval=0.05, stats=stats,
+                                              on_event=lambda event: None, on_batch=batches.append, stop=stop, **kwargs))
+        thread.start()
+        threads.append(thread)
+        return source, dest, stats, batches
+
+    yield start
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+
+@pytest.mark.parametrize("use_inotify", [None, False])
+def test_new_files_are_organized(start_watch, use_inotify):
+    source, dest, stats, batches = start_watch(use_inotify=use_inotify)
+    (source / "existing.pdf").write_text("old")
+    assert wait_for(lambda: (dest / "Documents" / "existing.pdf").exists())
+
+    for name in ("a.jpg", "b.jpeg", "c.xyz"):
+        (source / name).write_text(name)
+
+    assert wait_for(lambda: (dest / "Others" / "c.xyz").exists())
+    assert wait_for(lambda: stats["total_files"] == 4)
+    assert stats["files_per_category"] == {"Documents": 1, "Images": 2, "Others": 1}
+    assert (dest / "Images" / "a.jpg").read_text() == "a.jpg"
+
+def test_files_present_at_start_are_organized(tmp_path, start_watch):
+    (tmp_path / "inbox" / "report.docx").write_text("x")
+    source, dest, stats, batches = start_watch()
+    assert wait_for(lambda: (dest / "Documents" / "report.docx").exists())
+
+def test_file_still_being_written_waits(start_watch):
+    source, dest, stats, batches = start_watch(use_inotify=False)
+    with open(source / "growing.zip", "w") as f:
+        for _ in range(5):
+            f.write("data")
+            f.flush()
+            time.sleep(0.1)
+        assert not (dest / "Archives" / "growing.zip").exists()
+    assert wait_for(lambda: (dest / "Archives" / "growing.zip").exists())
+    assert (dest / "Archives" / "growing.zip").read_text() == "data" * 5
+
+def test_burst_is_batched(start_watch):
+    source, dest, stats, batches = start_watch()
+    for number in range(20):
+        (source / f"photo{number}.jpg").write_text("x")
+    assert wait_for(lambda: stats.get("total_files") == 20)
+    assert len(batches) < 20
+
+def test_polling_fallback_when_forced(tmp_path):
+    source = open_change_source(tmp_path, poll_interval=0.01, use_inotify=False)
+    assert isinstance(source, PollingSource)
+    (tmp_path / "new.txt").write_text("x")
+    time.sleep(0.02)
+    assert source.read_changes(0.05) == [("new.txt", False)]
+
+def test_file_deleted_mid_batch_does_not_stop_watching(tmp_path, categories_dict):
+    import watcher
+    from events import COPIED, MISSING
+    source = tmp_path / "inbox"
+    dest = tmp_path / "sorted"
+    source.mkdir()
+    for name in ("a.jpg", "b.jpg"):
+        (source / name).write_text(name)
+    stop = threading.Event()
+    stats = {}
+    kinds = []
+
+    def on_event(event):
+        kinds.append(event.kind)
+        # Another program removes b.jpg after the batch was planned.
+        if event.kind == COPIED and event.operation.source.endswith("a.jpg"):
+            (source / "b.jpg").unlink()
+
+    thread = threading.Thread(target=watcher.watch_directory, args=(source, dest, categories_dict),
+                              kwargs=dict(debounce=0.05, settle=0.1, poll_interval=0.05, stats=stats,
+                                          on_event=on_event, stop=stop))
+    thread.start()
+    try:
+        assert wait_for(lambda: MISSING in kinds)
+        (source / "c.pdf").write_text("c")
+        assert wait_for(lambda: (dest / "Documents" / "c.pdf").exists())
+        assert thread.is_alive()
+        assert stats["missing_files"] == 1
+        assert not (dest / "Images" / "b.jpg").exists()
+    finally:
+        stop.set()
+        thread.join(5)
+
+def test_failed_batch_is_reported_and_watching_goes_on(start_watch, monkeypatch):
+    import watcher
+    real_execute = watcher.execute_operations
+    calls = []
+
+    def execute_once_failing(operations, **kwargs):
+        calls.append(operations)
+        if len(calls) == 1:
+            raise PermissionError(13, "Permission denied", operations[0].target)
+        real_execute(operations, **kwargs)
+
+    monkeypatch.setattr(watcher, "execute_operations", execute_once_failing)
+    source, dest, stats, batches = start_watch()
+    (source / "first.jpg").write_text("x")
+    assert wait_for(lambda: stats.get("failed_batches") == 1)
+    (source / "second.jpg").write_text("y")
+    assert wait_for(lambda: (dest / "Images" / "second.jpg").exists())
+
+def test_watch_rejects_options_it_would_ignore(tmp_path, capsys):
+    import main
+    (tmp_path / "inbox").mkdir()
+    with pytest.raises(SystemExit):
+        main.main_cli(["main.py", str(tmp_path / "inbox"), str(tmp_path / "sorted"), "--watch", "--incremental",
+                       "--dedup", "skip"])
+    assert "--watch cannot be combined with --incremental, --dedup." in capsys.readouterr().out
+    assert not (tmp_path / "sorted").exists()